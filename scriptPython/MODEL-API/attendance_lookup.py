@@ -0,0 +1,231 @@
+""" Table de fréquentation précalculée : estimation instantanée sans XGBoost
+
+    python attendance_lookup.py build     # balaye la grille avec le modèle, écrit la table et le rapport
+    python attendance_lookup.py report    # rapport de précision de la table existante
+
+La table donne la fréquentation (personnes) prédite par le modèle aux nœuds
+d'une grille sur les variables d'entrée; lookup_attendance l'interpole
+(multilinéaire) avec numpy seul, pour les curseurs de simulation et comme
+repli quand xgboost ou le modèle sont indisponibles.
+
+Compromis (voir Models/attendance_lookup_report.json) : une table d'environ
+100 Ko, quatre fois plus petite que le modèle (374 Ko) et sans dépendance à
+xgboost, mais pas plus rapide que lui par ligne (1 à 2 µs dans les deux cas)
+et approchée : écart moyen de l'ordre de 1.5 % de max_crowd, niveau de
+fréquentation identique dans ~93 % des cas.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+LOOKUP_FILE = 'attendance_lookup.npz'
+REPORT_FILE = 'attendance_lookup_report.json'
+
+# Nœuds de la grille par variable, dans l'ordre de Input_Vars. Les valeurs
+# hors grille sont ramenées aux bornes : le modèle ne distingue plus rien
+# au-delà (pluie > 0.33 mm...); la fréquentation n'est publiée qu'entre 08h
+# et 21h. Day (jour de la semaine) et Month déplacent la prédiction de moins
+# de 0.2 % de max_crowd en moyenne : ils ne sont pas des axes de la table et
+# sont fixés à leur moyenne d'entraînement (voir build_lookup).
+DEFAULT_AXES = {
+    'RR1_dm': [0.0, 0.15, 0.35],
+    'T_dm': [18.0, 21.0, 23.0, 25.0, 27.0, 29.0, 32.0, 35.0],
+    'FF_dm': [1.5, 3.0, 4.5, 6.0, 8.0, 12.0],
+    'DD_dm': [150.0, 230.0, 290.0, 340.0],
+    'INS_dm': [0.0, 12.0, 24.0, 36.0, 48.0, 60.0],
+    'Hour': list(np.arange(8.0, 21.75, 0.5)),
+}
+
+# Domaine de Day (jour de la semaine) et Month pour le rapport de précision : la saison de baignade
+CALENDAR_RANGES = {'Day': [1, 7], 'Month': [7, 8]}
+
+
+def build_lookup(model, norm_params, axes=DEFAULT_AXES, chunk_rows=500_000):
+    """
+    Fréquentation prédite par le modèle (personnes, bornée à 0) à chaque nœud
+    de la grille, par lots de chunk_rows lignes. Les variables d'entrée sans
+    axe sont fixées à leur moyenne d'entraînement (X_mean).
+
+    Returns:
+        dict: axes (liste de (variable, nœuds)), values (np.ndarray float32 de
+        forme len(nœuds) par axe) et fixed (variable -> valeur des variables sans axe)
+    """
+    from model_prediction import denormalize_target, normalize_data
+
+    input_vars = list(norm_params['input_vars'])
+    axis_vars = [var for var in input_vars if var in axes]
+    fixed = {var: float(x) for var, x in zip(input_vars, np.ravel(norm_params['X_mean'])) if var not in axes}
+    nodes = [np.asarray(axes[var], dtype=float) for var in axis_vars]
+    shape = tuple(len(n) for n in nodes)
+    values = np.empty(int(np.prod(shape)), dtype=np.float32)
+
+    mean, std = norm_params['normalization']
+    for start in range(0, len(values), chunk_rows):
+        flat = np.arange(start, min(start + chunk_rows, len(values)))
+        grid = pd.DataFrame(np.column_stack([n[i] for n, i in zip(nodes, np.unravel_index(flat, shape))]),
+                            columns=axis_vars).assign(**fixed)
+        block = normalize_data(grid, input_vars, mean, std)
+        predictions = denormalize_target(model.inplace_predict(block), norm_params['y_mean'], norm_params['y_std'])
+        values[flat] = np.clip(predictions, 0, None)
+    return {'axes': list(zip(axis_vars, nodes)), 'values': values.reshape(shape), 'fixed': fixed}
+
+
+def save_lookup(path, lookup, model_hash=None):
+    """Table compressée : valeurs en personnes arrondies (uint16), nœuds, variables fixées et empreinte du modèle en JSON."""
+    header = {'axes': [[var, n.tolist()] for var, n in lookup['axes']], 'fixed': lookup.get('fixed', {}),
+              'model_hash': model_hash}
+    values = np.clip(np.rint(lookup['values']), 0, np.iinfo(np.uint16).max).astype(np.uint16)
+    np.savez_compressed(path, values=values, header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8))
+    return os.path.getsize(path)
+
+
+def load_lookup(path):
+    """Table enregistrée par save_lookup, None si absente."""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        header = json.loads(data['header'].tobytes())
+        values = data['values'].astype(np.float32)
+    return {'axes': [(var, np.asarray(n, dtype=float)) for var, n in header['axes']], 'values': values,
+            'fixed': header.get('fixed', {}), 'model_hash': header.get('model_hash')}
+
+
+def lookup_attendance(lookup, data):
+    """
+    Interpolation multilinéaire de la table aux lignes de data.
+
+    Args:
+        lookup (dict): Table (voir load_lookup)
+        data (pd.DataFrame): Variables d'entrée (colonnes des axes de la table)
+
+    Returns:
+        np.ndarray: Fréquentation estimée (personnes)
+    """
+    values = lookup['values']
+    n_rows = len(data)
+    base = np.zeros(n_rows, dtype=np.int64)
+    corner_offsets = np.zeros(1, dtype=np.int64)
+    corner_weights = np.ones((n_rows, 1))
+    strides = np.cumprod((values.shape + (1,))[::-1])[::-1][1:]
+
+    for (var, nodes), stride in zip(lookup['axes'], strides):
+        x = np.clip(np.asarray(data[var], dtype=float), nodes[0], nodes[-1])
+        i = np.clip(np.searchsorted(nodes, x, side='right') - 1, 0, max(len(nodes) - 2, 0))
+        if len(nodes) == 1:
+            continue
+        t = (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+        base += i * stride
+        if not t.any():
+            continue
+        # Deux coins sur cet axe seulement si une ligne tombe entre deux nœuds
+        corner_offsets = np.concatenate([corner_offsets, corner_offsets + stride])
+        corner_weights = np.concatenate([corner_weights * (1 - t)[:, None], corner_weights * t[:, None]], axis=1)
+
+    corners = values.ravel()[base[:, None] + corner_offsets[None, :]]
+    return (corners * corner_weights).sum(axis=1)
+
+
+def random_inputs(lookup, n_rows=20000, seed=0):
+    """
+    Entrées tirées uniformément dans le domaine de la table (Day, Month
+    entiers). Les variables fixées de la table sont tirées dans CALENDAR_RANGES
+    pour que le rapport compte aussi l'erreur due à leur fixation.
+    """
+    rng = np.random.default_rng(seed)
+    frame = {var: np.full(n_rows, value) for var, value in lookup.get('fixed', {}).items()}
+    ranges = [(var, nodes) for var, nodes in lookup['axes']]
+    ranges += [(var, CALENDAR_RANGES[var]) for var in frame if var in CALENDAR_RANGES]
+    for var, nodes in ranges:
+        if var in ('Day', 'Month'):
+            frame[var] = rng.integers(nodes[0], nodes[-1] + 1, n_rows).astype(float)
+        else:
+            frame[var] = rng.uniform(nodes[0], nodes[-1], n_rows)
+    return pd.DataFrame(frame)
+
+
+def accuracy_report(model, norm_params, lookup, data=None, max_crowd=None, thresholds=None):
+    """
+    Écart entre la table et le modèle sur data (tirage aléatoire dans le
+    domaine de la table par défaut), en % de max_crowd, et accord des niveaux.
+
+    Returns:
+        dict: rows, mae, rmse, p95, max (en %), level_agreement, lookup_us_per_row, model_us_per_row
+    """
+    from model_prediction import S1, S2, S3, S4, denormalize_target, normalize_data
+    from model_prediction import max_crowd as default_max_crowd
+
+    max_crowd = max_crowd or default_max_crowd
+    thresholds = thresholds or (S1, S2, S3, S4)
+    if data is None:
+        data = random_inputs(lookup)
+    input_vars = list(norm_params['input_vars'])
+
+    start = time.perf_counter()
+    estimated = lookup_attendance(lookup, data)
+    lookup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    block = normalize_data(data, input_vars, *norm_params['normalization'])
+    predicted = denormalize_target(model.inplace_predict(block), norm_params['y_mean'], norm_params['y_std'])
+    model_seconds = time.perf_counter() - start
+
+    percent_model = np.clip(predicted / (max_crowd / 100), 0, 100)
+    percent_lookup = np.clip(estimated / (max_crowd / 100), 0, 100)
+    error = np.abs(percent_lookup - percent_model)
+    return {
+        'rows': len(data),
+        'mae': round(float(error.mean()), 3),
+        'rmse': round(float(np.sqrt((error ** 2).mean())), 3),
+        'p95': round(float(np.percentile(error, 95)), 3),
+        'max': round(float(error.max()), 3),
+        'level_agreement': round(float((np.digitize(percent_model, thresholds) ==
+                                        np.digitize(percent_lookup, thresholds)).mean()), 4),
+        'lookup_us_per_row': round(lookup_seconds / len(data) * 1e6, 3),
+        'model_us_per_row': round(model_seconds / len(data) * 1e6, 3),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Table de fréquentation précalculée à partir du modèle XGBoost.")
+    parser.add_argument('command', choices=['build', 'report'],
+                        help="build : balayer la grille et écrire la table; report : rapport de précision")
+    parser.add_argument('--model-dir', default=None, help="Répertoire du modèle (Models par défaut)")
+    parser.add_argument('--rows', type=int, default=20000, help="Nombre de tirages du rapport de précision")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from model_prediction import DEFAULT_MODEL_DIR, check_attendance_model, load_attendance_model
+
+    args = parse_args(argv)
+    model_dir = args.model_dir or DEFAULT_MODEL_DIR
+    path = os.path.join(model_dir, LOOKUP_FILE)
+    if args.command == 'report' and not os.path.exists(path):
+        raise SystemExit(f"Table '{path}' absente : la construire d'abord avec 'python attendance_lookup.py build'")
+    model, norm_params = load_attendance_model(model_dir)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        lookup = build_lookup(model, norm_params)
+        model_hash = check_attendance_model(model, norm_params, model_dir)['model_hash']
+        size = save_lookup(path, lookup, model_hash)
+        print(f"Table {lookup['values'].shape} ({lookup['values'].size} nœuds) écrite dans '{path}' "
+              f"({size} octets, {time.perf_counter() - start:.1f} s)")
+
+    lookup = load_lookup(path)
+    report = accuracy_report(model, norm_params, lookup, random_inputs(lookup, args.rows))
+    report['shape'] = list(lookup['values'].shape)
+    report['model_hash'] = lookup['model_hash']
+    with open(os.path.join(model_dir, REPORT_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+""" Service local de prédiction de fréquentation : modèle XGBoost chargé une seule fois
+
+    python attendance_service.py --port 8765
+
+    GET  /health   -> modèle chargé, variables d'entrée attendues, nombre de requêtes
+    POST /predict  -> {"datetime": [...], "features": {"RR1_dm": [...], ...},
+                       "max_crowd": 2300, "thresholds": [5, 20, 50, 90]}
+                   <- {"attendance": [...], "levels": [...]} (null hors 08h-21h)
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import requests
+
+from model_prediction import (DEFAULT_MODEL_DIR, S1, S2, S3, S4, check_attendance_model, load_attendance_model,
+                              max_crowd, predict_attendance)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+def _to_json_list(values):
+    return [None if np.isnan(v) else float(v) for v in np.asarray(values, dtype=float)]
+
+
+class AttendanceModel:
+    """
+    Modèle de fréquentation et paramètres de normalisation gardés en mémoire,
+    vérifiés au démarrage (ModelHealthError si le modèle est invalide).
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, nthread=None):
+        start = time.perf_counter()
+        self.model_dir = model_dir
+        self.model, self.norm_params = load_attendance_model(model_dir, nthread)
+        self.model_hash = check_attendance_model(self.model, self.norm_params, model_dir)['model_hash']
+        self.load_seconds = time.perf_counter() - start
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def health(self):
+        return {
+            'model_dir': self.model_dir,
+            'model_hash': self.model_hash,
+            'input_vars': list(self.norm_params['input_vars']),
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 4),
+            'requests': self.requests,
+        }
+
+    def predict(self, payload):
+        """Prédiction pour un lot de lignes décrit par payload (voir en-tête du module)."""
+        frame = pd.DataFrame(payload['features'])
+        frame['Datetime'] = pd.to_datetime(payload['datetime'])
+        with self._lock:
+            self.requests += 1
+            predictions, classes = predict_attendance(frame, self.model, self.norm_params,
+                                                      payload.get('max_crowd', max_crowd),
+                                                      tuple(payload.get('thresholds', (S1, S2, S3, S4))))
+        return {'attendance': _to_json_list(predictions), 'levels': _to_json_list(classes)}
+
+
+def make_handler(attendance_model):
+    class AttendanceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, attendance_model.health())
+            else:
+                self._send_json(404, {'error': f"Chemin inconnu: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': f"Chemin inconnu: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length))
+                self._send_json(200, attendance_model.predict(payload))
+            except (KeyError, ValueError) as e:
+                self._send_json(400, {'error': f"Requête invalide: {e}"})
+            except Exception as e:
+                # Toute autre erreur (ex. JSON valide qui n'est pas un objet) : réponse JSON plutôt que connexion coupée
+                self._send_json(500, {'error': f"Erreur interne: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return AttendanceHandler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, model_dir=DEFAULT_MODEL_DIR, nthread=None):
+    """Crée le serveur (le modèle est chargé ici, une seule fois)."""
+    attendance_model = AttendanceModel(model_dir, nthread)
+    server = ThreadingHTTPServer((host, port), make_handler(attendance_model))
+    print(f"Modèle chargé en {attendance_model.load_seconds:.3f} s, service sur http://{host}:{server.server_port}")
+    return server
+
+
+class AttendanceClient:
+    """Client du service : même interface que predict_attendance, sans charger XGBoost."""
+
+    def __init__(self, url, timeout=(2, 30)):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._input_vars = None
+
+    def health(self):
+        response = self.session.get(f"{self.url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def predict(self, combined_data, max_crowd=max_crowd, thresholds=(S1, S2, S3, S4)):
+        """
+        Returns:
+            Tuple (predictions_denormalized, pred_classes) de pd.Series indexées comme combined_data
+        """
+        if self._input_vars is None:
+            self._input_vars = self.health()['input_vars']
+        columns = [v for v in self._input_vars if v in combined_data.columns]
+        payload = {
+            'datetime': combined_data['Datetime'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+            'features': {v: combined_data[v].astype(float).tolist() for v in columns},
+            'max_crowd': max_crowd,
+            'thresholds': list(thresholds),
+        }
+        response = self.session.post(f"{self.url}/predict", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        return (pd.Series(np.array(body['attendance'], dtype=float), index=combined_data.index),
+                pd.Series(np.array(body['levels'], dtype=float), index=combined_data.index))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Service local de prédiction de fréquentation (modèle XGBoost gardé en mémoire).")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR, help="Répertoire du modèle XGBoost et de normalization_params.pkl")
+    parser.add_argument('--nthread', type=int, default=None, help="Nombre de threads de prédiction XGBoost (choix de XGBoost par défaut)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = serve(args.host, args.port, args.model_dir, args.nthread)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
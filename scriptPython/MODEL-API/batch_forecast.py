@@ -0,0 +1,303 @@
+""" Prévision de toutes les plages du registre en une seule exécution """
+
+import argparse
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from forecast_fetch import ForecastCache, fetch_all
+from hazard_physics import compute_refraction, rip_current_hazard, shore_break_hazard, shore_break_profile
+from model_prediction import (DEFAULT_CACHE_DIR, RESULT_COLUMNS, build_features, export_results,
+                              AttendancePredictor, submit_plots,
+                              truncate_at_missing_period)
+from sites import DEFAULT_SITES_FILE, forecast_urls, load_sites
+
+
+def fetch_site_forecasts(sites, base_url=None, cache=None):
+    """
+    Télécharge les prévisions de tous les sites; chaque URL distincte n'est
+    demandée qu'une fois, même si plusieurs sites partagent un point de grille.
+
+    Returns:
+        dict: identifiant du site -> (data1, data2)
+    """
+    urls = {site_id: forecast_urls(site) for site_id, site in sites.items()}
+    unique_urls = list(dict.fromkeys(url for pair in urls.values() for url in pair))
+    print(f"{len(unique_urls)} requêtes Open-Meteo pour {len(sites)} sites")
+
+    responses = dict(zip(unique_urls, fetch_all(unique_urls, base_url=base_url, cache=cache)))
+
+    # truncate_at_missing_period modifie les données : une copie par site
+    return {site_id: truncate_at_missing_period(copy.deepcopy(responses[url_wave]),
+                                                copy.deepcopy(responses[url_weather]))
+            for site_id, (url_wave, url_weather) in urls.items()}
+
+
+def _site_column(sites, section, key):
+    """
+    Paramètre de chaque site en colonne (site x 1), diffusée sur l'axe du
+    temps; un simple scalaire si tous les sites ont la même valeur.
+    """
+    values = [site[section][key] for site in sites]
+    if all(v == values[0] for v in values):
+        return values[0]
+    return np.array(values)[:, None]
+
+
+def hazards_from_arrays(Hs, Tp, Dir, Eta, sites, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Réfraction, courant d'arrachement et shore break en un seul calcul sur
+    des tableaux (site x temps), chaque ligne avec les paramètres de son site.
+
+    Returns:
+        Tuple (U, Uh, ShoreBreak_Index, levels) de tableaux (site x temps)
+    """
+    theta_c = _site_column(sites, 'rip_current', 'theta_c')
+
+    refraction_cache_dir = os.path.join(cache_dir, 'refraction') if cache_dir else None
+    H0brv, _, _ = compute_refraction(Hs, Tp, Dir - theta_c, 10, 0.7, cache_dir=refraction_cache_dir)
+
+    U, Uh = rip_current_hazard(Eta, Hs, Tp, Dir,
+                               _site_column(sites, 'rip_current', 'gamma'),
+                               _site_column(sites, 'rip_current', 'z_bar'),
+                               _site_column(sites, 'rip_current', 'd'),
+                               theta_c,
+                               [site['rip_current']['thresholds'] for site in sites],
+                               H0b=H0brv)
+
+    profiles = [shore_break_profile(site['shore_break']['b'], site['shore_break']['c'], site['shore_break']['dx'])
+                for site in sites]
+    ShoreBreak_Index, levels = shore_break_hazard(Eta, H0brv, Tp, profiles,
+                                                  _site_column(sites, 'shore_break', 'gamma_s'),
+                                                  _site_column(sites, 'shore_break', 'Zl'),
+                                                  _site_column(sites, 'shore_break', 'e'),
+                                                  [site['shore_break']['thresholds'] for site in sites])
+    return U, Uh, ShoreBreak_Index, levels
+
+
+# Prédicteurs de fréquentation déjà chargés dans ce processus, par répertoire de
+# modèle, URL du service et répertoire des caches; partagés entre les sites, qui
+# gardent chacun leurs dernières prédictions (voir AttendancePredictor.last_path)
+_models = {}
+
+
+def _get_model(model_dir, attendance_service=None, cache_dir=None):
+    key = (model_dir, attendance_service, cache_dir)
+    if key not in _models:
+        _models[key] = AttendancePredictor(model_dir, attendance_service, cache_dir=cache_dir)
+    return _models[key]
+
+
+def _init_worker(model_dirs, attendance_service=None, cache_dir=None):
+    """Chargement des modèles une seule fois par processus du pool."""
+    for model_dir in model_dirs:
+        _get_model(model_dir, attendance_service, cache_dir)
+
+
+def forecast_shard(times, inputs, columns, lengths, sites, cache_dir=DEFAULT_CACHE_DIR, attendance_service=None,
+                   site_ids=None):
+    """
+    Fréquentation et risques pour un lot de lignes (sites ou membres
+    d'ensemble), exécuté dans le processus courant ou dans un processus du pool.
+    Entrées et résultats sont des tableaux numpy, transmis entre processus
+    comme de simples tampons binaires.
+
+    Args:
+        times (np.ndarray): Dates (ligne x temps), datetime64
+        inputs (np.ndarray): Variables d'entrée (variable x ligne x temps)
+        columns (list): Noms des variables de inputs
+        lengths (list): Nombre de pas de temps valides de chaque ligne
+        sites (list): Paramètres du site de chaque ligne
+        attendance_service (str): URL du service de fréquentation, modèle chargé localement si None
+        site_ids (list): Identifiant du site de chaque ligne (dernières prédictions
+            de repli par site), None pour les membres d'ensemble
+
+    Returns:
+        Tuple (results, statuses): np.ndarray des résultats (RESULT_COLUMNS x
+        ligne x temps) et état de la prédiction de fréquentation de chaque ligne
+        (AttendancePredictor.status)
+    """
+    results = np.full((len(RESULT_COLUMNS),) + times.shape, np.nan)
+    statuses = []
+    site_ids = site_ids or [None] * len(sites)
+
+    for row, (n, site, site_id) in enumerate(zip(lengths, sites, site_ids)):
+        frame = pd.DataFrame(inputs[:, row, :n].T, columns=columns)
+        frame['Datetime'] = times[row, :n]
+        predict = _get_model(site['model_dir'], attendance_service, cache_dir)
+        predictions, classes, sources = predict(frame, site['attendance']['max_crowd'],
+                                                tuple(site['attendance']['thresholds']), site_id)
+        results[0, row, :n] = predictions
+        results[1, row, :n] = classes
+        results[6, row, :n] = sources
+        # L'état est remis à zéro à chaque appel : copie propre à cette ligne
+        statuses.append(dict(predict.status))
+
+    Hs, Tp, Dir, Eta = (inputs[columns.index(column)] for column in ('Hs', 'Tp', 'Dir', 'Eta'))
+    results[2:6] = hazards_from_arrays(Hs, Tp, Dir, Eta, sites, cache_dir)
+    return results, statuses
+
+
+def forecast_rows(frames, sites, workers=1, cache_dir=DEFAULT_CACHE_DIR, attendance_service=None, site_ids=None):
+    """
+    Fréquentation et risques de chaque ligne (combined_data d'un site ou d'un
+    membre d'ensemble). Avec workers > 1, les lignes sont réparties en lots
+    sur un pool de processus; chaque processus charge les modèles une fois.
+
+    Args:
+        frames (list): combined_data de chaque ligne
+        sites (list): Paramètres du site de chaque ligne
+        workers (int): Nombre de processus (1 : dans le processus courant)
+        attendance_service (str): URL du service de fréquentation, modèle chargé localement si None
+        site_ids (list): Identifiant du site de chaque ligne (voir forecast_shard)
+
+    Returns:
+        Tuple (attendance, hazards): listes de (predictions_denormalized,
+        pred_classes, sources, status) et de dict de compute_hazards, une entrée par ligne
+    """
+    lengths = [len(frame) for frame in frames]
+    columns = [column for column in frames[0].columns
+               if column != 'Datetime' and all(column in frame and pd.api.types.is_numeric_dtype(frame[column])
+                                               for frame in frames)]
+
+    times = np.full((len(frames), max(lengths)), np.datetime64('NaT'), dtype='datetime64[ns]')
+    inputs = np.full((len(columns), len(frames), max(lengths)), np.nan)
+    for row, frame in enumerate(frames):
+        times[row, :lengths[row]] = frame['Datetime'].to_numpy()
+        inputs[:, row, :lengths[row]] = frame[columns].to_numpy(dtype=float).T
+
+    if workers <= 1 or len(frames) == 1:
+        results, statuses = forecast_shard(times, inputs, columns, lengths, sites, cache_dir, attendance_service,
+                                           site_ids)
+    else:
+        results = np.empty((len(RESULT_COLUMNS),) + times.shape)
+        statuses = [None] * len(frames)
+        shards = np.array_split(np.arange(len(frames)), min(workers, len(frames)))
+        model_dirs = list(dict.fromkeys(site['model_dir'] for site in sites))
+        with ProcessPoolExecutor(max_workers=len(shards), initializer=_init_worker,
+                                 initargs=(model_dirs, attendance_service, cache_dir)) as executor:
+            futures = [(rows, executor.submit(forecast_shard, times[rows], inputs[:, rows], columns,
+                                              [lengths[i] for i in rows], [sites[i] for i in rows], cache_dir,
+                                              attendance_service, site_ids and [site_ids[i] for i in rows]))
+                       for rows in shards]
+            for rows, future in futures:
+                results[:, rows], shard_statuses = future.result()
+                for row, status in zip(rows, shard_statuses):
+                    statuses[row] = status
+
+    attendance, hazards = [], []
+    for row, frame in enumerate(frames):
+        n = lengths[row]
+        attendance.append((pd.Series(results[0, row, :n], index=frame.index),
+                           pd.Series(results[1, row, :n], index=frame.index),
+                           results[6, row, :n],
+                           statuses[row]))
+        hazards.append({
+            'Tide_Time': frame['Datetime'].values,
+            'U': results[2, row, :n],
+            'Uh': results[3, row, :n],
+            'ShoreBreak_Index': results[4, row, :n],
+            'levels': results[5, row, :n].astype(int),
+        })
+    return attendance, hazards
+
+
+def run_batch(sites_file=DEFAULT_SITES_FILE, site_ids=None, output_dir='.', cache_dir=DEFAULT_CACHE_DIR,
+              plots_dir=None, api_base_url=None, replay=False, replay_issue=None, workers=1,
+              ensemble_members=0, ensemble_seed=None, attendance_service=None):
+    """
+    Prévision de fréquentation et de risques pour les plages du registre.
+    Les sorties de chaque site sont écrites dans output_dir/<identifiant>.
+    Avec workers > 1, les sites sont répartis sur un pool de processus.
+    Avec ensemble_members > 0, les probabilités des niveaux de risque sont
+    aussi calculées par un ensemble Monte Carlo (voir ensemble_forecast.py).
+    Avec attendance_service, la fréquentation est prédite par le service
+    local (voir attendance_service.py).
+
+    Returns:
+        dict: identifiant du site -> résultats (comme run_pipeline)
+    """
+    sites = load_sites(sites_file, site_ids)
+
+    forecast_cache = None
+    if cache_dir:
+        forecast_cache = ForecastCache(os.path.join(cache_dir, 'openmeteo'), replay=replay, issue=replay_issue)
+    elif replay:
+        raise ValueError("Le rejeu nécessite le cache (--cache-dir)")
+    data = fetch_site_forecasts(sites, base_url=api_base_url, cache=forecast_cache)
+
+    combined = [build_features(*data[site_id], site['tide_csv'], site.get('tide_harmonics'))
+                for site_id, site in sites.items()]
+
+    # Un seul chargement par modèle et par processus, partagé par les sites qui l'utilisent
+    attendance, hazards = forecast_rows(combined, list(sites.values()), workers, cache_dir, attendance_service,
+                                        list(sites))
+
+    results = {}
+    for i, site_id in enumerate(sites):
+        predictions_denormalized, pred_classes, sources, status = attendance[i]
+        print(f"Export des résultats du site {sites[site_id]['name']}")
+        plots_future = None
+        if plots_dir:
+            plots_future = submit_plots(os.path.join(plots_dir, site_id), combined[i],
+                                        predictions_denormalized, pred_classes, hazards[i])
+        export_results(combined[i], predictions_denormalized, pred_classes, hazards[i],
+                       os.path.join(output_dir, site_id), attendance_sources=sources, attendance_status=status)
+        if plots_future is not None:
+            plots_future.result()
+
+        if ensemble_members:
+            from ensemble_forecast import run_ensemble
+            run_ensemble(combined[i], sites[site_id], os.path.join(output_dir, site_id),
+                         n_members=ensemble_members, seed=ensemble_seed, workers=workers)
+
+        results[site_id] = {
+            'combined_data': combined[i],
+            'attendance': predictions_denormalized,
+            'attendance_levels': pred_classes,
+            'attendance_sources': sources,
+            'attendance_status': status,
+            'hazards': hazards[i],
+        }
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prévision de fréquentation et des risques de baignade pour toutes les plages du registre.")
+    parser.add_argument('--sites-file', default=DEFAULT_SITES_FILE, help="Registre des plages (JSON)")
+    parser.add_argument('--site', action='append', dest='sites', help="Identifiant d'un site à prévoir (répétable), tous par défaut")
+    parser.add_argument('--output-dir', default='.', help="Répertoire de sortie, un sous-répertoire par site")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Répertoire des caches")
+    parser.add_argument('--no-cache', action='store_true', help="Désactiver les caches sur disque")
+    parser.add_argument('--api-base-url', default=None, help="Serveur de substitution pour les API Open-Meteo")
+    parser.add_argument('--replay', action='store_true', help="Rejouer les réponses Open-Meteo archivées dans le cache")
+    parser.add_argument('--replay-issue', default=None, help="Créneau d'émission à rejouer (YYYYmmddHH UTC)")
+    parser.add_argument('--workers', type=int, default=1, help="Nombre de processus de calcul (0 : un par cœur)")
+    parser.add_argument('--ensemble', type=int, default=0, help="Nombre de membres de la prévision d'ensemble Monte Carlo (0 : pas d'ensemble)")
+    parser.add_argument('--ensemble-seed', type=int, default=None, help="Graine des perturbations Monte Carlo")
+    parser.add_argument('--plots-dir', default=None, help="Rendre les graphiques en PNG dans ce répertoire (un sous-répertoire par site)")
+    parser.add_argument('--attendance-service', default=None, help="URL du service de fréquentation (ex. http://127.0.0.1:8765), modèle local si absent")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_batch(sites_file=args.sites_file,
+              site_ids=args.sites,
+              output_dir=args.output_dir,
+              cache_dir=None if args.no_cache else args.cache_dir,
+              plots_dir=args.plots_dir,
+              api_base_url=args.api_base_url,
+              replay=args.replay,
+              replay_issue=args.replay_issue,
+              workers=args.workers or os.cpu_count(),
+              ensemble_members=args.ensemble,
+              ensemble_seed=args.ensemble_seed,
+              attendance_service=args.attendance_service)
+
+
+if __name__ == "__main__":
+    main()
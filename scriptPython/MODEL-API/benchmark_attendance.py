@@ -0,0 +1,99 @@
+""" Banc d'essai de la prédiction de fréquentation : DMatrix contre inplace_predict
+
+    python benchmark_attendance.py --horizons 1 7 30 92 --nthread 1
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from model_prediction import DEFAULT_MODEL_DIR, load_attendance_model, normalize_data
+
+# Un horizon d'un jour = 144 pas de 10 minutes; une saison = 92 jours (juin-août)
+STEPS_PER_DAY = 144
+DEFAULT_HORIZONS = (1, 3, 7, 30, 92)
+
+
+def synthetic_features(n_rows, seed=0):
+    """Variables d'entrée plausibles pour un été à Biscarrosse, au pas de 10 minutes."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2025-06-01', periods=n_rows, freq='10min')
+    return pd.DataFrame({
+        'RR1_dm': rng.exponential(0.05, n_rows),
+        'T_dm': rng.normal(24, 3, n_rows),
+        'FF_dm': rng.gamma(3, 1.8, n_rows),
+        'DD_dm': rng.uniform(0, 360, n_rows),
+        'INS_dm': rng.uniform(0, 60, n_rows),
+        'Day': times.dayofweek + 1,
+        'Month': times.month,
+        'Hour': times.hour,
+        'Datetime': times,
+    })
+
+
+def best_time(function, repeat):
+    """Meilleur temps (s) de function sur repeat exécutions."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark(model, norm_params, horizons=DEFAULT_HORIZONS, repeat=10):
+    """
+    Temps de prédiction par horizon (en jours) sur le même bloc normalisé :
+    construction de la DMatrix puis predict, contre inplace_predict.
+
+    Returns:
+        pd.DataFrame: Days, Rows, Build_ms (construction de la DMatrix seule),
+        DMatrix_ms, Inplace_ms, Speedup
+    """
+    input_vars = list(norm_params['input_vars'])
+    rows = []
+    for days in horizons:
+        data = synthetic_features(days * STEPS_PER_DAY)
+        block = normalize_data(data, input_vars, *norm_params['normalization'])
+
+        def build():
+            return xgb.DMatrix(block, feature_names=input_vars)
+
+        def dmatrix_path():
+            return model.predict(build())
+
+        def inplace_path():
+            return model.inplace_predict(block)
+
+        if not np.array_equal(dmatrix_path(), inplace_path()):
+            raise RuntimeError(f"Prédictions différentes entre DMatrix et inplace_predict ({days} jours)")
+        build_s = best_time(build, repeat)
+        dmatrix_s = best_time(dmatrix_path, repeat)
+        inplace_s = best_time(inplace_path, repeat)
+        rows.append({'Days': days, 'Rows': len(data), 'Build_ms': build_s * 1e3, 'DMatrix_ms': dmatrix_s * 1e3,
+                     'Inplace_ms': inplace_s * 1e3, 'Speedup': dmatrix_s / inplace_s})
+    return pd.DataFrame(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare la prédiction de fréquentation par DMatrix et par inplace_predict.")
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR, help="Répertoire du modèle XGBoost et de normalization_params.pkl")
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(DEFAULT_HORIZONS), help="Horizons en jours")
+    parser.add_argument('--repeat', type=int, default=10, help="Nombre d'exécutions par mesure (le meilleur temps est gardé)")
+    parser.add_argument('--nthread', type=int, default=None, help="Nombre de threads de prédiction XGBoost (choix de XGBoost par défaut)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model, norm_params = load_attendance_model(args.model_dir, args.nthread)
+    results = benchmark(model, norm_params, args.horizons, args.repeat)
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+""" Export compact en colonnes des séries de fréquentation et de risques de baignade
+
+Un fichier par exécution, lisible sans analyse ligne à ligne :
+
+    'BHZ1'                      4 octets
+    longueur de l'en-tête       uint32 little-endian
+    en-tête JSON (UTF-8)        complété par des espaces jusqu'à un multiple de 4 octets
+    tableaux little-endian      un par série, chacun aligné sur 4 octets
+
+L'en-tête décrit la grille temporelle (start, step_minutes, length) et, pour
+chaque série, son type (float32 ou uint8) et sa position dans le fichier :
+
+    {"version": 1, "start": "2025-05-01T00:00:00", "step_minutes": 10,
+     "length": 1008, "missing_level": 255,
+     "series": {"Rip_Current_Velocity": {"dtype": "float32", "offset": 512}, ...}}
+
+Côté navigateur, chaque série se lit directement avec
+new Float32Array(buffer, offset, length) ou new Uint8Array(buffer, offset, length).
+Les valeurs manquantes sont NaN en float32 et missing_level en uint8. Si les
+pas de temps ne sont pas réguliers, step_minutes vaut null et la série
+Minutes (uint32) donne l'écart de chaque point à start en minutes.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'BHZ1'
+VERSION = 1
+MISSING_LEVEL = 255
+
+DTYPES = {'float32': np.dtype('<f4'), 'uint8': np.dtype('u1'), 'uint32': np.dtype('<u4')}
+
+
+def _align(n, alignment=4):
+    return -n % alignment
+
+
+def _as_levels(values):
+    """Niveaux de risque (0 à 4, NaN possible) en uint8, NaN -> MISSING_LEVEL."""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), MISSING_LEVEL, values).astype(np.uint8)
+
+
+def write_columnar(path, times, series):
+    """
+    Écrit les séries sur la grille times dans un fichier compact.
+
+    Args:
+        path (str): Fichier de sortie
+        times (array_like): Dates des points (datetime64)
+        series (dict): nom -> (valeurs, 'float32' ou 'uint8'); les niveaux
+            uint8 peuvent contenir des NaN, écrits MISSING_LEVEL
+
+    Returns:
+        int: Taille du fichier en octets
+    """
+    times = np.asarray(times, dtype='datetime64[m]')
+    start = times[0]
+    minutes = (times - start).astype(np.int64)
+
+    steps = np.unique(np.diff(minutes))
+    regular = len(steps) == 1
+
+    arrays = {}
+    for name, (values, dtype) in series.items():
+        if dtype == 'uint8':
+            arrays[name] = _as_levels(values)
+        else:
+            arrays[name] = np.asarray(values, dtype=DTYPES[dtype])
+    if not regular:
+        arrays['Minutes'] = minutes.astype(DTYPES['uint32'])
+
+    header = {
+        'version': VERSION,
+        'start': str(start.astype('datetime64[s]')),
+        'step_minutes': int(steps[0]) if regular else None,
+        'length': len(times),
+        'missing_level': MISSING_LEVEL,
+        'series': {},
+    }
+
+    # Les positions dépendent de la taille de l'en-tête : elle est fixée avec
+    # des positions provisoires plus 16 octets par série pour leurs chiffres
+    def encode(h):
+        return json.dumps(h, ensure_ascii=False).encode('utf-8')
+
+    for name, arr in arrays.items():
+        header['series'][name] = {'dtype': arr.dtype.name, 'offset': 0}
+    header_size = len(encode(header)) + 16 * len(arrays)
+    header_size += _align(8 + header_size)
+
+    offset = 8 + header_size
+    for name, arr in arrays.items():
+        header['series'][name]['offset'] = offset
+        offset += arr.nbytes + _align(arr.nbytes)
+
+    encoded = encode(header)
+    encoded += b' ' * (header_size - len(encoded))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', header_size))
+        f.write(encoded)
+        for arr in arrays.values():
+            f.write(arr.tobytes())
+            f.write(b'\0' * _align(arr.nbytes))
+    os.replace(tmp_path, path)
+    return offset
+
+
+def read_columnar(path):
+    """
+    Relit un fichier écrit par write_columnar.
+
+    Returns:
+        Tuple (times, series): pd.DatetimeIndex et dict nom -> np.ndarray
+        (niveaux en float, MISSING_LEVEL redevenu NaN)
+    """
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    if buffer[:4] != MAGIC:
+        raise ValueError(f"'{path}' n'est pas un export en colonnes ({MAGIC!r} attendu)")
+    header_size, = struct.unpack_from('<I', buffer, 4)
+    header = json.loads(buffer[8:8 + header_size].decode('utf-8'))
+
+    length = header['length']
+    series = {}
+    for name, spec in header['series'].items():
+        arr = np.frombuffer(buffer, dtype=DTYPES[spec['dtype']], count=length, offset=spec['offset'])
+        if spec['dtype'] == 'uint8':
+            arr = np.where(arr == header['missing_level'], np.nan, arr)
+        series[name] = arr
+
+    start = pd.Timestamp(header['start'])
+    if header['step_minutes'] is not None:
+        times = pd.date_range(start, periods=length, freq=f"{header['step_minutes']}min")
+    else:
+        times = start + pd.to_timedelta(series.pop('Minutes').astype(np.int64), unit='min')
+    return pd.DatetimeIndex(times), series
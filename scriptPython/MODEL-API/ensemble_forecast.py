@@ -0,0 +1,123 @@
+""" Prévision d'ensemble : probabilités des niveaux de risque à partir d'entrées perturbées
+
+Les membres sont des perturbations Monte Carlo de la prévision déterministe :
+l'API Marine d'Open-Meteo utilisée par le pipeline ne publie pas de membres
+d'ensemble pour les vagues.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import hazards_from_arrays
+
+HAZARD_INPUTS = ('Hs', 'Tp', 'Dir', 'Eta')
+N_LEVELS = 5
+
+# Écart-type des erreurs de prévision : relatif pour Hs et Tp, en degrés pour
+# Dir et en mètres pour Eta
+DEFAULT_SIGMAS = {'Hs': 0.15, 'Tp': 0.10, 'Dir': 10.0, 'Eta': 0.15}
+RELATIVE = ('Hs', 'Tp')
+
+
+def monte_carlo_members(combined_data, n_members, sigmas=DEFAULT_SIGMAS, seed=None, variables=HAZARD_INPUTS):
+    """
+    Membres perturbés (membre x temps) autour de la prévision déterministe.
+    Le membre 0 est la prévision de contrôle; chaque autre membre porte une
+    erreur constante sur l'horizon, tirée de N(0, sigma) (multiplicative,
+    log-normale, pour Hs et Tp afin de rester positives).
+
+    Returns:
+        dict: variable -> np.ndarray (membre x temps)
+    """
+    rng = np.random.default_rng(seed)
+    members = {}
+    for var in variables:
+        base = combined_data[var].to_numpy(dtype=float)
+        eps = rng.standard_normal((n_members, 1))
+        eps[0] = 0
+        if var in RELATIVE:
+            members[var] = base * np.exp(sigmas[var] * eps)
+        else:
+            members[var] = base + sigmas[var] * eps
+    return members
+
+
+def ensemble_inputs(combined_data, n_members=50, sigmas=DEFAULT_SIGMAS, seed=None):
+    """
+    Entrées des n_members membres : perturbations Monte Carlo de Hs, Tp, Dir
+    et Eta (voir monte_carlo_members).
+
+    Returns:
+        dict: variable -> np.ndarray (membre x temps)
+    """
+    print(f"Ensemble Monte Carlo de {n_members} membres")
+    return monte_carlo_members(combined_data, n_members, sigmas, seed)
+
+
+def level_probabilities(levels, n_levels=N_LEVELS):
+    """Probabilité de chaque niveau à chaque pas de temps (niveau x temps) sur l'axe des membres."""
+    levels = np.asarray(levels)
+    return (levels[None, :, :] == np.arange(n_levels)[:, None, None]).mean(axis=1)
+
+
+def ensemble_hazards(members, site, workers=1, cache_dir=None):
+    """
+    Réfraction, courant d'arrachement et shore break de tous les membres sur
+    des tableaux (membre x temps); avec workers > 1 les membres sont répartis
+    en lots sur un pool de processus.
+
+    Returns:
+        Tuple (U, Uh, ShoreBreak_Index, levels) de tableaux (membre x temps)
+    """
+    n_members = len(members['Hs'])
+    inputs = [members[var] for var in HAZARD_INPUTS]
+
+    if workers <= 1 or n_members == 1:
+        return hazards_from_arrays(*inputs, [site] * n_members, cache_dir)
+
+    shards = np.array_split(np.arange(n_members), min(workers, n_members))
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [executor.submit(hazards_from_arrays, *(x[rows] for x in inputs), [site] * len(rows), cache_dir)
+                   for rows in shards]
+        parts = [future.result() for future in futures]
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(4))
+
+
+def probability_table(times, values, levels):
+    """Moyenne, quantiles 10 %/90 % de la valeur et probabilité de chaque niveau."""
+    with np.errstate(all='ignore'):
+        table = pd.DataFrame({
+            'Datetime': times,
+            'Mean': np.nanmean(values, axis=0),
+            'P10': np.nanpercentile(values, 10, axis=0),
+            'P90': np.nanpercentile(values, 90, axis=0),
+        })
+    for level, probability in enumerate(level_probabilities(levels)):
+        table[f'Prob_Level_{level}'] = probability
+    return table
+
+
+def run_ensemble(combined_data, site, output_dir='.', n_members=50, sigmas=DEFAULT_SIGMAS, seed=None, workers=1):
+    """
+    Prévision d'ensemble d'un site : écrit rip_current_probabilities.csv et
+    shore_break_probabilities.csv dans output_dir.
+
+    Returns:
+        dict avec les tableaux de probabilités 'rip_current' et 'shore_break'
+    """
+    members = ensemble_inputs(combined_data, n_members, sigmas, seed)
+    U, Uh, ShoreBreak_Index, levels = ensemble_hazards(members, site, workers)
+
+    times = combined_data['Datetime'].to_numpy()
+    tables = {
+        'rip_current': probability_table(times, U, Uh),
+        'shore_break': probability_table(times, ShoreBreak_Index, levels),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_csv(os.path.join(output_dir, f"{name}_probabilities.csv"), index=False, float_format='%.4f')
+        print(f"Probabilités d'ensemble exportées dans '{name}_probabilities.csv'")
+    return tables
@@ -0,0 +1,191 @@
+""" Téléchargement des prévisions Open-Meteo (vagues et météo) """
+
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+# Open-Meteo met à jour ses modèles quelques fois par jour : une réponse est
+# considérée valable pour tout le créneau d'émission de ISSUE_HOURS heures
+ISSUE_HOURS = 6
+DEFAULT_TTL_HOURS = 7 * 24
+
+
+def make_session(retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, pool_size=4):
+    """
+    Crée une session HTTP avec un pool de connexions réutilisables et des
+    tentatives bornées avec attente exponentielle (429 et erreurs 5xx).
+    """
+    retry = Retry(total=retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',))
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def with_base_url(url, base_url):
+    """
+    Remplace le schéma et l'hôte de url par ceux de base_url (par ex. un
+    serveur local de substitution pour les tests), en gardant chemin et requête.
+    """
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    base = urlsplit(base_url)
+    path = base.path.rstrip('/') + parts.path
+    return urlunsplit((base.scheme, base.netloc, path, parts.query, parts.fragment))
+
+
+def fetch_json(session, url, timeout=DEFAULT_TIMEOUT):
+    """Télécharge url et renvoie le JSON décodé; lève une exception HTTP en cas d'erreur."""
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+class ForecastCache:
+    """
+    Cache disque des réponses Open-Meteo, indexé par l'URL exacte de la
+    requête et par le créneau d'émission de la prévision.
+
+    - une réponse du créneau courant est réutilisée sans appel réseau;
+    - sinon la dernière réponse connue est revalidée (If-None-Match /
+      If-Modified-Since) et réutilisée si le serveur répond 304;
+    - les entrées plus anciennes que ttl_hours sont supprimées;
+    - en mode replay, les réponses archivées sont rejouées sans réseau
+      (rejoue le créneau issue s'il est donné, sinon le plus récent).
+    """
+
+    def __init__(self, cache_dir, ttl_hours=DEFAULT_TTL_HOURS, issue_hours=ISSUE_HOURS,
+                 replay=False, issue=None):
+        self.cache_dir = cache_dir
+        self.ttl_hours = ttl_hours
+        self.issue_hours = issue_hours
+        self.replay = replay
+        self.issue = issue
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def issue_slot(self, now=None):
+        """Début (UTC, format YYYYmmddHH) du créneau d'émission contenant now."""
+        now = now or datetime.now(timezone.utc)
+        hour = now.hour - now.hour % self.issue_hours
+        return now.strftime('%Y%m%d') + f"{hour:02d}"
+
+    def _prefix(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest()[:16])
+
+    def _path(self, url, slot):
+        return f"{self._prefix(url)}_{slot}.json"
+
+    def _latest(self, url):
+        entries = sorted(glob.glob(f"{self._prefix(url)}_*.json"))
+        return entries[-1] if entries else None
+
+    def _read(self, path):
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def evict(self, now=None):
+        """Supprime les entrées plus anciennes que ttl_hours."""
+        limit = (now or time.time()) - self.ttl_hours * 3600
+        for path in glob.glob(os.path.join(self.cache_dir, '*.json')):
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # déjà supprimée par un autre téléchargement en parallèle
+
+    def fetch_json(self, session, url, timeout=DEFAULT_TIMEOUT, now=None):
+        """Comme fetch_json, en passant par le cache."""
+        if self.replay:
+            path = self._path(url, self.issue) if self.issue else self._latest(url)
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"Aucune réponse archivée pour {url} (créneau {self.issue or 'le plus récent'})")
+            print(f"Rejeu de la réponse archivée '{path}'")
+            return self._read(path)['data']
+
+        slot = self.issue_slot(now)
+        path = self._path(url, slot)
+        if os.path.exists(path):
+            print(f"Prévision lue depuis le cache '{path}'")
+            return self._read(path)['data']
+
+        # Revalidation conditionnelle de la dernière réponse connue
+        headers = {}
+        previous_path = self._latest(url)
+        previous = self._read(previous_path) if previous_path else None
+        if previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+
+        response = session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and previous:
+            data = previous['data']
+        else:
+            response.raise_for_status()
+            data = response.json()
+
+        entry = {
+            'url': url,
+            'issue': slot,
+            'fetched_at': datetime.now(timezone.utc).isoformat(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'data': data,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        self.evict()
+        return data
+
+
+def fetch_all(urls, session=None, timeout=DEFAULT_TIMEOUT, base_url=None, cache=None):
+    """
+    Télécharge plusieurs URLs en parallèle sur une session partagée.
+
+    Args:
+        urls (list): URLs à télécharger
+        session (requests.Session): Session à réutiliser; créée si None
+        timeout (tuple): Délais (connexion, lecture) en secondes
+        base_url (str): Serveur de substitution, voir with_base_url
+        cache (ForecastCache): Cache disque des réponses, aucun si None
+
+    Returns:
+        list: JSON décodés, dans l'ordre des URLs
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_size=max(len(urls), 1))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as executor:
+            fetch = cache.fetch_json if cache is not None else fetch_json
+            futures = [executor.submit(fetch, session, with_base_url(url, base_url), timeout)
+                       for url in urls]
+            return [future.result() for future in futures]
+    finally:
+        if own_session:
+            session.close()
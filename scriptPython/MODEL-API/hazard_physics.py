@@ -0,0 +1,320 @@
+""" Wave physics used by the rip-current and shore-break hazard models """
+
+import glob
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+
+g = 9.81  # gravity [m/s²]
+
+# Refraction results kept on disk: one entry per forecast and site, so a few
+# days of hourly reruns for a batch of sites; older entries are pruned on write
+REFRACTION_CACHE_ENTRIES = 64
+
+
+def dispersion_newton(T, d, precision=1e-4):
+    """
+    Solves the dispersion relation for water waves using Newton-Raphson method.
+    w^2 = g * k * tanh(k * d)
+    """
+    g = 9.81
+    w2 = (2 * np.pi / T)**2
+    k = 0.5  # initial guess
+    precision = abs(precision)
+    dispe = 2 * precision
+
+    while abs(dispe) > precision:
+        tanh_kd = np.tanh(k * d)
+        dispe = w2 - g * k * tanh_kd
+        fdispe = -g * (tanh_kd + k * d * (1 - tanh_kd**2))
+        k -= dispe / fdispe
+
+    return k
+
+
+def dispersion_newton_batch(T, d, precision=1e-4, max_iter=100):
+    """
+    Batch version of dispersion_newton: solves w^2 = g * k * tanh(k * d)
+    for a whole array of periods (and depths) at once.
+
+    Each element follows exactly the same Newton-Raphson iterations as the
+    scalar solver; a per-element mask freezes the elements that have
+    converged so the result matches dispersion_newton element by element.
+
+    Args:
+        T (array_like): Wave periods [s]
+        d (array_like): Water depths [m], scalar or broadcastable to T
+        precision (float): Convergence threshold on the dispersion residual
+        max_iter (int): Safety limit on the number of iterations
+
+    Returns:
+        np.ndarray: Wavenumbers k [rad/m] with the broadcast shape of (T, d)
+    """
+    T, d = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(d, dtype=float))
+    w2 = (2 * np.pi / T)**2
+    k = np.full(T.shape, 0.5)  # initial guess
+    precision = abs(precision)
+
+    # NaN inputs (missing forecast values) are left out of the iterations
+    active = np.isfinite(w2) & np.isfinite(d)
+    k[~active] = np.nan
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        ka, da = k[active], d[active]
+        tanh_kd = np.tanh(ka * da)
+        dispe = w2[active] - g * ka * tanh_kd
+        fdispe = -g * (tanh_kd + ka * da * (1 - tanh_kd**2))
+        k[active] = ka - dispe / fdispe
+
+        # Only the elements whose residual is still above precision keep iterating
+        still_active = np.abs(dispe) > precision
+        active[active] = still_active
+
+    return k
+
+
+def LarsonWaveRefractionAtBreaking(Hs0, Tp0, theta0, h0, gammab):
+    """
+    Larson wave refraction and breaking model.
+    Based on Larson et al. (2010)
+
+    Fully vectorized: Hs0, Tp0 and theta0 may be scalars or arrays covering
+    the whole forecast horizon. Waves travelling offshore (|theta0| > 90) are
+    handled with masks: their breaking angle is clipped to +/-90 and their
+    breaking height set to 0.
+
+    Returns:
+        Tuple (Hsb, thetab, hb) of arrays with the broadcast shape of the inputs
+    """
+    if h0 <= 0:
+        raise ValueError("h0 cannot be negative or equal to 0")
+
+    two_pi = 2 * np.pi
+
+    # Ensure inputs are arrays for vector operations
+    Hs0, Tp0, theta0 = np.broadcast_arrays(np.atleast_1d(np.asarray(Hs0, dtype=float)),
+                                           np.atleast_1d(np.asarray(Tp0, dtype=float)),
+                                           np.atleast_1d(np.asarray(theta0, dtype=float)))
+
+    Hsb = np.full(theta0.shape, np.nan)
+    thetab = np.full(theta0.shape, np.nan)
+    hb = np.full(theta0.shape, np.nan)
+
+    above = theta0 > 90
+    below = theta0 < -90
+    thetab[above] = 90
+    thetab[below] = -90
+    Hsb[above | below] = 0
+
+    # Refraction for the waves reaching the coast (NaN inputs stay NaN)
+    inside = ~(above | below)
+    H, T, theta = Hs0[inside], Tp0[inside], np.radians(theta0[inside])
+
+    k0 = dispersion_newton_batch(T, h0)
+    c0 = two_pi / (k0 * T)
+    cg0 = c0 * (0.5 + k0 * h0 / np.sinh(2 * k0 * h0))
+
+    alpha = (c0 / np.sqrt(g * H))**4 * c0 * gammab**2 / cg0
+    lambdaa = (np.cos(theta) / alpha)**0.4
+    epsi = (np.sin(theta))**2 * lambdaa
+
+    lambda_ = (1 + 0.1649 * epsi + 0.5948 * epsi**2 -
+               1.6787 * epsi**3 + 2.8573 * epsi**4) * lambdaa
+
+    hb[inside] = lambdaa * c0**2 / g
+    Hsb[inside] = hb[inside] * gammab
+    thetab[inside] = np.degrees(np.arcsin(np.sqrt(lambda_) * np.sin(theta)))
+
+    return Hsb, thetab, hb
+
+
+def refraction_cache_key(Hs0, Tp0, theta0, h0, gammab):
+    """SHA-1 cache key built from the refraction inputs and parameters."""
+    digest = hashlib.sha1()
+    for arr in (Hs0, Tp0, theta0):
+        digest.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    digest.update(repr((float(h0), float(gammab))).encode())
+    return digest.hexdigest()
+
+
+def prune_refraction_cache(cache_dir, max_entries=REFRACTION_CACHE_ENTRIES):
+    """Removes all but the max_entries most recently used refraction_*.npz files."""
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, 'refraction_*.npz')):
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            pass  # removed by another run in the meantime
+    for _, path in sorted(entries, reverse=True)[max_entries:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def compute_refraction(Hs0, Tp0, theta0, h0=10, gammab=0.7, cache_dir=None,
+                       max_entries=REFRACTION_CACHE_ENTRIES):
+    """
+    Shared refraction stage: breaking height, angle and depth computed once
+    per forecast and read by both the rip-current and shore-break models.
+
+    Args:
+        Hs0, Tp0, theta0 (array_like): Offshore wave height, period and angle
+            relative to the coastline normal
+        h0 (float): Depth of the offshore wave conditions
+        gammab (float): Breaker parameter
+        cache_dir (str): If given, results are stored in this directory as
+            .npz files keyed by a hash of the inputs and reused on reruns
+        max_entries (int): Number of cache entries kept, the least recently
+            used ones being removed when a new entry is written
+
+    Returns:
+        Tuple (Hsb, thetab, hb), as LarsonWaveRefractionAtBreaking
+    """
+    cache_file = None
+    if cache_dir:
+        key = refraction_cache_key(Hs0, Tp0, theta0, h0, gammab)
+        cache_file = os.path.join(cache_dir, f"refraction_{key}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                print(f"Réfraction lue depuis le cache '{cache_file}'")
+                result = cached['Hsb'], cached['thetab'], cached['hb']
+            os.utime(cache_file)  # most recently used, kept by the pruning
+            return result
+
+    Hsb, thetab, hb = LarsonWaveRefractionAtBreaking(Hs0, Tp0, theta0, h0, gammab)
+
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_file, Hsb=Hsb, thetab=thetab, hb=hb)
+        prune_refraction_cache(cache_dir, max_entries)
+
+    return Hsb, thetab, hb
+
+
+def hazard_levels(values, thresholds):
+    """
+    Discrete hazard levels (0 to len(thresholds)) for an array of values:
+    level n means thresholds[n-1] <= value < thresholds[n].
+
+    thresholds may also be 2-D (one row of thresholds per site) for values
+    stacked as (site x time); NaN values get the top level, as with np.digitize.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    if thresholds.ndim == 1:
+        return np.digitize(values, thresholds)
+
+    values = np.asarray(values, dtype=float)
+    levels = (values[..., None] >= thresholds[:, None, :]).sum(axis=-1)
+    return np.where(np.isnan(values), thresholds.shape[-1], levels)
+
+
+def rip_current_hazard(eta, Hs, Tp, Dir, gamma, z_bar, d, theta_c, thresholds, H0b=None):
+    """
+    Vectorized rip-current forecast model (Castelle et al., 2025, NHESS).
+
+    Args:
+        eta, Hs, Tp, Dir (array_like): Tide elevation, offshore wave height,
+            period and direction for each time step
+        gamma (float): Breaker parameter
+        z_bar (float): Sandbar elevation
+        d (float): Channel depth
+        theta_c (float): Coastline orientation
+            (site parameters may be (site x 1) columns for (site x time) inputs)
+        thresholds (sequence): Velocity thresholds (SR1, SR2, SR3, SR4), or one row per site
+        H0b (array_like): Breaking wave height already computed by
+            compute_refraction; computed here if None
+
+    Returns:
+        Tuple (U, Uh): rip current velocity [m/s] and hazard level (0 to 4)
+    """
+    eta = np.asarray(eta, dtype=float)
+    if H0b is None:
+        H0b, _, _ = compute_refraction(Hs, Tp, np.asarray(Dir, dtype=float) - theta_c)
+    H0 = np.asarray(H0b, dtype=float)
+    h = eta - z_bar
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Bar crest
+        no_break_b = (h <= 0) | (H0 <= gamma * h)
+        Eta_b = np.where(no_break_b, 0, 0.16 * (H0 - gamma * h)**2 / H0)
+
+        # Channel crest
+        no_break_c = ((h + d) <= 0) | (H0 <= gamma * (h + d))
+        Eta_c = np.where(no_break_c, 0, 0.16 * (H0 - gamma * (h + d))**2 / H0)
+
+    # fmax ignores NaN like the former max(0, ...) on scalars
+    Pg = np.fmax(Eta_b - Eta_c, 0)
+    U = np.sqrt(2 * g * Pg)
+
+    Uh = hazard_levels(U, thresholds).astype(float)
+
+    return U, Uh
+
+
+@lru_cache(maxsize=None)
+def shore_break_profile(b, c, dx=2.0, x_max=1000):
+    """
+    Idealized beach profile z = 5 + b * x**c and its slope-versus-elevation
+    lookup table, built once per site.
+
+    Returns:
+        Tuple (elev, slope) with elevations sorted in increasing order so the
+        table can be used directly with np.interp
+    """
+    x = np.arange(0, x_max + dx, dx)  # +dx to include x_max
+    z = 5 + b * x**c
+    slope = -np.diff(z) / dx
+    elev = z[:-1]
+
+    order = np.argsort(elev)
+    return elev[order], slope[order]
+
+
+def shore_break_hazard(eta, H0b, Tp, profile, gamma_s, Zl, e, thresholds):
+    """
+    Vectorized shore-break wave forecast model.
+
+    Args:
+        eta (array_like): Total water level (tide elevation) for each time step
+        H0b (array_like): Breaking wave height from compute_refraction
+        Tp (array_like): Offshore wave period
+        profile (tuple): (elev, slope) lookup from shore_break_profile, or a
+            list of them (one per site) when eta is stacked as (site x time)
+        gamma_s (float): Breaker parameter
+        Zl (float): Terrace elevation
+        e (float): Exponent applied to the breaking wave height
+        thresholds (sequence): Index thresholds (SS1, SS2, SS3, SS4), or one row per site
+
+    Returns:
+        Tuple (ShoreBreak_Index, levels)
+    """
+    eta = np.asarray(eta, dtype=float)
+    H0 = np.asarray(H0b, dtype=float)
+    L0 = g * np.asarray(Tp, dtype=float)**2 / (2 * np.pi)
+
+    # Beach slope at the water level, NaN outside the profile
+    if isinstance(profile, list):
+        Slope_t = np.stack([np.interp(row, elev, slope, left=np.nan, right=np.nan)
+                            for row, (elev, slope) in zip(eta, profile)])
+    else:
+        elev, slope = profile
+        Slope_t = np.interp(eta, elev, slope, left=np.nan, right=np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dry = eta < Zl
+        full_break = ~dry & (eta - H0 / gamma_s > Zl)
+
+        # Otherwise eta - H0 / gamma_s <= Zl: waves partly break on the terrace
+        Hbs = np.where(full_break, H0, H0 - (1 / H0) * (H0 - gamma_s * (eta - Zl))**2)
+        Hbs[dry] = 0
+        Slope_t[dry] = 0
+        Irr = np.where(dry, 0, Slope_t / np.sqrt(Hbs / L0))
+
+        ShoreBreak_Index = Irr * Hbs**e
+
+    return ShoreBreak_Index, hazard_levels(ShoreBreak_Index, thresholds)
@@ -0,0 +1,110 @@
+""" Graphiques des indicateurs de fréquentation et de risque (rendu PNG sans affichage) """
+
+import os
+
+import matplotlib
+matplotlib.use('Agg')  # Backend non interactif : aucune fenêtre, rendu en fichier uniquement
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Color map for hazard levels
+colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
+
+# Create hazard level labels and color mapping
+level_labels = ['Level 0', 'Level 1', 'Level 2', 'Level 3', 'Level 4']
+level_colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
+
+def _save(path):
+    plt.savefig(path)
+    plt.close()
+    print(f"Graphique enregistré dans '{path}'")
+
+def plot_attendance(times, predictions_denormalized, pred_classes, path):
+    plt.figure(figsize=(14, 6))
+    plt.ylim(0, 100)
+    plt.plot(times, predictions_denormalized, label='Predicted Crowd (continuous)', color='dodgerblue', linestyle='-', alpha=0.6)
+
+    # Optional: plot class predictions as scatter with color per class
+    for level in range(5):
+        mask = pred_classes == level
+        plt.scatter(times[mask], predictions_denormalized[mask], 
+                    label=f'Level {level}', color=colors[level], s=30)
+
+    plt.xlabel("Time")
+    plt.ylabel("Beach attendance (%)")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    _save(path)
+
+def plot_rip_current(Tide_Time, U, Uh, thresholds, path):
+    # Plotting rip current hazard
+    plt.figure(figsize=(14, 5))
+
+    # Continuous line for U
+    plt.plot(Tide_Time[:len(U)], U, color='steelblue', label='Rip Current Velocity (U)', zorder=1)
+
+    # Overlay colored circles for hazard levels
+    for level in range(5):  # levels 0 to 4
+        idx = Uh == level
+        plt.scatter(np.array(Tide_Time[:len(U)])[idx], np.array(U)[idx],
+                    color=colors[level], label=f'Hazard Level {level}', edgecolor='k', s=40, zorder=2)
+
+    for threshold in thresholds:
+        plt.axhline(threshold, color='gray', linestyle='--', linewidth=0.7)
+
+    plt.xlabel('Time')
+    plt.ylabel('U (m/s)')
+    plt.title('Rip Current Velocity with Hazard Levels')
+    plt.ylim(0, 2.8)
+    plt.grid(True, linestyle='--', alpha=0.5)
+    plt.legend(loc='upper right', ncol=2)
+    plt.tight_layout()
+    _save(path)
+
+def plot_shore_break(Tide_Time, ShoreBreak_Index, levels, thresholds, path):
+    # Plot shore break hazards
+    plt.figure(figsize=(14, 6))
+
+    # Line for ShoreBreak Index
+    plt.plot(Tide_Time[:len(ShoreBreak_Index)], ShoreBreak_Index, color='black', linewidth=2, label='ShoreBreak Index', zorder=1)
+
+    # Colored hazard-level dots
+    for level in range(5):
+        idx = levels == level
+        plt.scatter(np.array(Tide_Time[:len(ShoreBreak_Index)])[idx], np.array(ShoreBreak_Index)[idx],
+                    color=level_colors[level], label=level_labels[level], edgecolor='k', s=50, zorder=2)
+
+    # Dashed horizontal threshold lines
+    for ss, label in zip(thresholds, ['SS1', 'SS2', 'SS3', 'SS4']):
+        plt.axhline(ss, color='black', linestyle='--', linewidth=0.8, label=label)
+
+    # Final formatting
+    plt.title('ShoreBreak Index with Hazard Levels')
+    plt.xlabel('Time')
+    plt.ylabel('Shore Break Index')
+    plt.ylim(0, 26)
+    plt.legend(ncol=2, loc='upper right')
+    plt.grid(True, linestyle='--', alpha=0.5)
+    plt.tight_layout()
+    _save(path)
+
+def render_plots(plots_dir, times, predictions_denormalized, pred_classes, hazards,
+                 rip_current_thresholds, shore_break_thresholds):
+    """
+    Rend les trois graphiques (fréquentation, courant d'arrachement, shore break)
+    en PNG dans plots_dir. Appelée dans un processus de fond par model_prediction.py.
+
+    Returns:
+        list: Chemins des fichiers PNG écrits
+    """
+    os.makedirs(plots_dir, exist_ok=True)
+    paths = [os.path.join(plots_dir, name) for name in
+             ('beach_attendance.png', 'rip_current.png', 'shore_break.png')]
+
+    plot_attendance(times, predictions_denormalized, pred_classes, paths[0])
+    plot_rip_current(hazards['Tide_Time'], hazards['U'], hazards['Uh'], rip_current_thresholds, paths[1])
+    plot_shore_break(hazards['Tide_Time'], hazards['ShoreBreak_Index'], hazards['levels'],
+                     shore_break_thresholds, paths[2])
+
+    return paths
@@ -0,0 +1,79 @@
+""" Synthèses horaires et journalières des séries de fréquentation et de risques """
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _frame(times, values, levels):
+    df = pd.DataFrame({'Datetime': pd.to_datetime(times), 'Value': values, 'Level': levels})
+    df['Hour'] = df['Datetime'].dt.floor('h')
+    df['Date'] = df['Datetime'].dt.date
+    return df
+
+
+def dominant_levels(keys, levels):
+    """
+    Niveau le plus fréquent de chaque groupe; en cas d'égalité, le plus élevé.
+    Les groupes sans niveau valide sont absents du résultat.
+    """
+    counts = pd.crosstab(keys, levels)
+    return counts.iloc[:, ::-1].idxmax(axis=1)
+
+
+def hourly_summary(times, values, levels):
+    """
+    Synthèse horaire d'une série au pas de 10 minutes.
+
+    Args:
+        times (array_like): Dates des points
+        values (array_like): Valeurs (vitesse, indice ou fréquentation)
+        levels (array_like): Niveaux de risque (0 à 4, NaN possible)
+
+    Returns:
+        pd.DataFrame: Datetime (début de l'heure), Mean, Max, Mean_Level
+        (moyenne des niveaux arrondie au demi supérieur, comme Math.round
+        côté client) et Dominant_Level
+    """
+    df = _frame(times, values, levels)
+    grouped = df.groupby('Hour')
+    # np.floor(x + 0.5) et non round() : pandas arrondit les .5 au pair
+    mean_level = np.floor(grouped['Level'].mean() + 0.5)
+    summary = pd.DataFrame({
+        'Mean': grouped['Value'].mean(),
+        'Max': grouped['Value'].max(),
+        'Mean_Level': mean_level.astype('Int64'),  # NaN -> <NA>
+    })
+    summary['Dominant_Level'] = dominant_levels(df['Hour'], df['Level']).reindex(summary.index).astype('Int64')
+    return summary.rename_axis('Datetime').reset_index()
+
+
+def daily_summary(times, values, levels):
+    """
+    Synthèse journalière : moyenne et maximum de la valeur, niveau maximal
+    atteint dans la journée et heure à laquelle il est atteint pour la première fois.
+
+    Returns:
+        pd.DataFrame: Date, Mean, Max, Peak_Level, Peak_Time
+    """
+    df = _frame(times, values, levels)
+    grouped = df.groupby('Date')
+    summary = pd.DataFrame({
+        'Mean': grouped['Value'].mean(),
+        'Max': grouped['Value'].max(),
+        'Peak_Level': grouped['Level'].max().astype('Int64'),
+    })
+    at_peak = df[df['Level'] == grouped['Level'].transform('max')]
+    summary['Peak_Time'] = at_peak.groupby('Date')['Datetime'].first().dt.strftime('%H:%M')
+    return summary.rename_axis('Date').reset_index()
+
+
+def write_summaries(output_dir, name, times, values, levels):
+    """Écrit <name>_hourly.csv et <name>_daily.csv dans output_dir."""
+    hourly = hourly_summary(times, values, levels)
+    daily = daily_summary(times, values, levels)
+    hourly.to_csv(os.path.join(output_dir, f"{name}_hourly.csv"), index=False, float_format='%.3f')
+    daily.to_csv(os.path.join(output_dir, f"{name}_daily.csv"), index=False, float_format='%.3f')
+    print(f"Synthèses horaires et journalières exportées dans '{name}_hourly.csv' et '{name}_daily.csv'")
+    return hourly, daily
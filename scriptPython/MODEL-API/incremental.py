@@ -0,0 +1,91 @@
+""" Prévision incrémentale : seuls les pas de temps dont les entrées ont changé sont recalculés """
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+def row_fingerprints(df, columns):
+    """Empreinte (uint64) de chaque ligne de df restreinte à columns."""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def config_key(files, params):
+    """
+    Empreinte de la configuration d'une exécution (contenu des fichiers du
+    modèle et paramètres) : si elle change, tous les pas de temps sont recalculés.
+    Un fichier absent compte comme un contenu distinct (le modèle de repli
+    prend alors le relais) plutôt que d'interrompre l'exécution.
+    """
+    digest = hashlib.sha1()
+    for path in files:
+        if not os.path.exists(path):
+            digest.update(f"absent:{os.path.basename(path)}".encode())
+            continue
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+def load_state(path, key):
+    """
+    Résultats de l'exécution précédente (DataFrame indexé par date avec la
+    colonne Fingerprint), ou None s'il n'y en a pas ou si la configuration a changé.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state['config_key'] != key:
+        print("Configuration modifiée depuis la dernière exécution: recalcul complet")
+        return None
+    return state['rows']
+
+
+def save_state(path, key, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'config_key': key, 'rows': rows}, f)
+    os.replace(tmp_path, path)
+
+
+def changed_rows(times, fingerprints, previous):
+    """
+    Masque des pas de temps à recalculer : absents de l'exécution précédente
+    ou dont l'empreinte des entrées a changé.
+    """
+    if previous is None:
+        return np.ones(len(fingerprints), dtype=bool)
+    old = previous['Fingerprint'].reindex(pd.DatetimeIndex(times))
+    return ~(old.notna().to_numpy() & (old.to_numpy() == fingerprints))
+
+
+def splice(times, fingerprints, changed, new_results, previous, columns):
+    """
+    Assemble les résultats complets : nouveaux résultats pour les lignes
+    changées, résultats de l'exécution précédente pour les autres.
+
+    Args:
+        times (array_like): Dates de tous les pas de temps
+        fingerprints (np.ndarray): Empreintes de tous les pas de temps
+        changed (np.ndarray): Masque renvoyé par changed_rows
+        new_results (dict): colonne -> valeurs pour les lignes changées
+        previous (pd.DataFrame): État précédent (None si aucun)
+        columns (list): Colonnes de résultats
+
+    Returns:
+        pd.DataFrame: Résultats indexés par date, avec la colonne Fingerprint
+    """
+    index = pd.DatetimeIndex(times)
+    rows = pd.DataFrame(np.nan, index=index, columns=columns)
+    if previous is not None and (~changed).any():
+        rows.loc[~changed, columns] = previous.loc[index[~changed], columns].to_numpy()
+    if changed.any():
+        rows.loc[changed, columns] = np.column_stack([np.asarray(new_results[c], dtype=float) for c in columns])
+    rows['Fingerprint'] = fingerprints
+    return rows
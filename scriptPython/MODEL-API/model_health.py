@@ -0,0 +1,253 @@
+""" Santé du modèle de fréquentation : vérifications au chargement et prédictions de repli
+
+    python model_health.py manifest       # empreintes des fichiers du modèle (Models/model_manifest.json)
+    python model_health.py climatology    # table de repli Mois x Heure (Models/attendance_climatology.csv)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = 'model_manifest.json'
+CLIMATOLOGY_FILE = 'attendance_climatology.csv'
+
+# Source de la fréquentation de chaque pas de temps (code = position)
+ATTENDANCE_SOURCES = ('model', 'cache', 'climatology', 'lookup')
+
+# Profondeur (jours) des dernières prédictions conservées pour le repli
+LAST_PREDICTIONS_DAYS = 7
+
+
+class ModelHealthError(Exception):
+    """Modèle de fréquentation absent, modifié ou incompatible avec les variables d'entrée."""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(model_dir, files, input_vars):
+    """Enregistre les empreintes SHA-256 des fichiers du modèle et ses variables d'entrée."""
+    manifest = {
+        'files': {name: file_sha256(os.path.join(model_dir, name)) for name in files},
+        'input_vars': list(input_vars),
+    }
+    with open(os.path.join(model_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _stat_key(model_dir, files):
+    """Identité des fichiers sur disque (chemin, taille, date), pour ne pas les relire à chaque exécution."""
+    parts = []
+    for name in files:
+        st = os.stat(os.path.join(model_dir, name))
+        parts.append(f"{os.path.abspath(os.path.join(model_dir, name))}:{st.st_size}:{st.st_mtime_ns}")
+    return '|'.join(parts)
+
+
+def check_model(model, input_vars, model_dir, files, expected_vars=None, cache_path=None):
+    """
+    Vérifie le modèle chargé : empreintes des fichiers contre le manifeste de
+    model_dir (s'il existe), noms et nombre de variables du booster contre
+    input_vars, input_vars contre expected_vars. Une vérification réussie est
+    conservée dans cache_path et n'est pas refaite tant que les fichiers ne
+    changent pas.
+
+    Args:
+        model (xgb.Booster): Modèle chargé
+        input_vars (list): Variables d'entrée des paramètres de normalisation
+        model_dir (str): Répertoire du modèle
+        files (list): Fichiers du modèle dans model_dir (modèle, normalisation)
+        expected_vars (list): Variables produites par le pipeline (Input_Vars)
+        cache_path (str): Fichier JSON des vérifications réussies, None pour ne pas les conserver
+
+    Returns:
+        dict: model_hash, files (empreintes), checked_at, cached
+
+    Raises:
+        ModelHealthError: si une vérification échoue
+    """
+    manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+    key = _stat_key(model_dir, list(files) + ([MANIFEST_FILE] if os.path.exists(manifest_path) else []))
+    checks = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                checks = json.load(f)
+        except ValueError:
+            checks = {}  # fichier illisible : vérifications refaites et réécrites
+        if key in checks:
+            return dict(checks[key], cached=True)
+
+    errors = []
+    hashes = {name: file_sha256(os.path.join(model_dir, name)) for name in files}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        for name, sha in hashes.items():
+            if manifest['files'].get(name) != sha:
+                errors.append(f"empreinte de '{name}' différente du manifeste")
+    else:
+        print(f"Pas de manifeste '{manifest_path}': empreintes du modèle non vérifiées")
+
+    input_vars = list(input_vars)
+    if model.feature_names is not None and list(model.feature_names) != input_vars:
+        errors.append(f"variables du modèle {model.feature_names} différentes de {input_vars}")
+    if model.num_features() != len(input_vars):
+        errors.append(f"le modèle attend {model.num_features()} variables, {len(input_vars)} fournies")
+    if expected_vars is not None and input_vars != list(expected_vars):
+        errors.append(f"variables de normalisation {input_vars} différentes de Input_Vars {list(expected_vars)}")
+    if errors:
+        raise ModelHealthError('; '.join(errors))
+
+    report = {
+        'model_hash': hashlib.sha256(''.join(hashes[name] for name in files).encode()).hexdigest(),
+        'files': hashes,
+        'checked_at': datetime.now(timezone.utc).isoformat(),
+    }
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        checks[key] = report
+        # Écriture atomique : plusieurs processus (batch) peuvent vérifier le modèle en même temps
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checks, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    return dict(report, cached=False)
+
+
+def source_label(sources):
+    """Sources présentes parmi les codes de ATTENDANCE_SOURCES, ex. 'cache+climatology'."""
+    return '+'.join(sorted({ATTENDANCE_SOURCES[int(code)] for code in np.unique(sources)}))
+
+
+def save_last_predictions(path, times, attendance, keep_days=LAST_PREDICTIONS_DAYS):
+    """
+    Conserve la dernière fréquentation prédite par le modèle (personnes),
+    indexée par date. Les nouvelles valeurs sont fusionnées avec celles déjà
+    enregistrées (le mode incrémental ne prédit que les pas de temps modifiés);
+    les dates antérieures de plus de keep_days jours aux nouvelles sont oubliées.
+    """
+    new = pd.Series(np.asarray(attendance, dtype=float), index=pd.DatetimeIndex(times))
+    previous = load_last_predictions(path)
+    if previous is not None and len(new):
+        previous = previous[previous.index >= new.index.min() - pd.Timedelta(days=keep_days)]
+        new = pd.concat([previous[~previous.index.isin(new.index)], new]).sort_index()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(new, f)
+    os.replace(tmp_path, path)
+
+
+def load_last_predictions(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_climatology(path):
+    """Table de repli (Month, Hour, Attendance en personnes), None si absente."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+
+def fallback_attendance(times, last=None, climatology=None, estimate=None):
+    """
+    Fréquentation de repli (personnes) : estimation de la table précalculée
+    (estimate, voir attendance_lookup.py) si elle est fournie, sinon
+    prédictions de l'exécution précédente pour les dates qu'elles couvrent,
+    table climatologique Mois x Heure pour les autres.
+
+    Returns:
+        Tuple (attendance, sources) de np.ndarray, sources étant les codes de
+        ATTENDANCE_SOURCES (NaN si aucune source ne couvre la date)
+    """
+    times = pd.DatetimeIndex(times)
+    attendance = np.full(len(times), np.nan)
+    sources = np.full(len(times), np.nan)
+
+    if estimate is not None:
+        attendance[:] = estimate
+        sources[~np.isnan(attendance)] = ATTENDANCE_SOURCES.index('lookup')
+
+    if last is not None:
+        # Les heures masquées (NaN) de l'exécution précédente sont couvertes aussi
+        found = times.isin(last.index) & np.isnan(sources)
+        attendance[found] = last.reindex(times[found]).to_numpy()
+        sources[found] = ATTENDANCE_SOURCES.index('cache')
+
+    missing = np.isnan(sources)
+    if climatology is not None and missing.any():
+        table = climatology.set_index(['Month', 'Hour'])['Attendance']
+        keys = pd.MultiIndex.from_arrays([times.month[missing], times.hour[missing]])
+        values = table.reindex(keys).to_numpy()
+        found = ~np.isnan(values)
+        idx = np.flatnonzero(missing)[found]
+        attendance[idx] = values[found]
+        sources[idx] = ATTENDANCE_SOURCES.index('climatology')
+    return attendance, sources
+
+
+def build_climatology(model, norm_params, weather=None):
+    """
+    Table Mois x Heure de la fréquentation prédite (personnes) par le modèle
+    pour une météo typique (moyennes de l'entraînement par défaut), moyennée
+    sur les jours de la semaine. Déterministe : même modèle, même table.
+    """
+    from model_prediction import denormalize_target, normalize_data
+
+    input_vars = list(norm_params['input_vars'])
+    mean, std = norm_params['normalization']
+    if weather is None:
+        weather = dict(zip(input_vars, np.ravel(norm_params['X_mean'])))
+
+    grid = pd.MultiIndex.from_product([range(1, 13), range(1, 8), range(24)], names=['Month', 'Day', 'Hour'])
+    frame = grid.to_frame(index=False)
+    for var in input_vars:
+        if var not in frame:
+            frame[var] = weather[var]
+    predictions = model.inplace_predict(normalize_data(frame, input_vars, mean, std))
+    frame['Attendance'] = np.clip(denormalize_target(predictions, norm_params['y_mean'], norm_params['y_std']), 0, None)
+    return frame.groupby(['Month', 'Hour'], as_index=False)['Attendance'].mean()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fichiers de contrôle du modèle de fréquentation.")
+    parser.add_argument('command', choices=['manifest', 'climatology'],
+                        help="manifest : empreintes des fichiers du modèle; climatology : table de repli Mois x Heure")
+    parser.add_argument('--model-dir', default=None, help="Répertoire du modèle (Models par défaut)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from model_prediction import DEFAULT_MODEL_DIR, Input_Vars, load_attendance_model, model_filename, norm_filename
+
+    args = parse_args(argv)
+    model_dir = args.model_dir or DEFAULT_MODEL_DIR
+    model, norm_params = load_attendance_model(model_dir)
+    if args.command == 'manifest':
+        write_manifest(model_dir, [model_filename, norm_filename], Input_Vars)
+        print(f"Manifeste écrit dans '{os.path.join(model_dir, MANIFEST_FILE)}'")
+    else:
+        table = build_climatology(model, norm_params)
+        table.to_csv(os.path.join(model_dir, CLIMATOLOGY_FILE), index=False, float_format='%.2f')
+        print(f"Table climatologique écrite dans '{os.path.join(model_dir, CLIMATOLOGY_FILE)}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,144 @@
 import pandas as pd
-import xgboost as xgb
 import os
 import pickle
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.interpolate import interp1d
-import requests
 import json
-from datetime import datetime, timedelta
-import matplotlib.dates as mdates
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import xgboost as xgb
+except ImportError:
+    # Mode dégradé : fréquentation estimée par la table précalculée (attendance_lookup.py)
+    xgb = None
+from forecast_fetch import DEFAULT_TIMEOUT, ForecastCache, fetch_all
+from tide_curve import interpolate_tide
+from tide_harmonics import load_harmonics, predict_tide
+from columnar_export import write_columnar
+from hazard_summary import write_summaries
+import incremental
+from model_health import (ATTENDANCE_SOURCES, ModelHealthError, check_model, fallback_attendance,
+                          load_climatology, load_last_predictions, save_last_predictions, source_label,
+                          CLIMATOLOGY_FILE)
+from attendance_lookup import LOOKUP_FILE, load_lookup, lookup_attendance
+from hazard_physics import (compute_refraction, rip_current_hazard, shore_break_hazard,
+                            shore_break_profile)
 
 """ Constant URL parameters """
 URL_GET_WAVE = 'https://marine-api.open-meteo.com/v1/marine?latitude=44.446321&longitude=-1.256297&hourly=wave_height,wave_direction,wave_period&timezone=auto'
 URL_GET_WEATHER = 'https://api.open-meteo.com/v1/forecast?latitude=44.458336&longitude=-1.2916565&hourly=temperature_2m,precipitation,cloud_cover,wind_speed_10m,wind_direction_10m&timezone=auto&wind_speed_unit=ms'
 
-# Obtenir les données des API
-r1 = requests.get(URL_GET_WAVE)
-r2 = requests.get(URL_GET_WEATHER)
-data1 = r1.json()
-data2 = r2.json()
-
-# Trouver le premier indice où swell_wave_peak_period est null
-first_null_idx = -1
-for i, val in enumerate(data1['hourly']['wave_period']):
-    if val is None:
-        first_null_idx = i
-        break
-
-# Si on a trouvé un indice où swell_wave_peak_period est null,
-# on va limiter les données de l'API jusqu'à cet indice
-if first_null_idx != -1:
-    print(f"swell_wave_peak_period devient null à l'indice {first_null_idx}, timestamp: {data1['hourly']['time'][first_null_idx]}")
-    cutoff_date = pd.to_datetime(data1['hourly']['time'][first_null_idx])
-    
-    # Limiter les données des deux APIs
-    for key in data1['hourly']:
-        data1['hourly'][key] = data1['hourly'][key][:first_null_idx]
-    
-    # Limiter également les données météo au même timestamp
-    weather_cutoff_idx = -1
-    for i, time_str in enumerate(data2['hourly']['time']):
-        if pd.to_datetime(time_str) >= cutoff_date:
-            weather_cutoff_idx = i
+# Répertoire du script : les fichiers d'entrée par défaut sont cherchés à partir d'ici
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+## Interpolation time step in minutes
+dt = 10
+
+################################
+# Model parameters 
+################################
+
+# Beach user count
+# See Castelle et al. (submitted, O&CM) for details
+S1, S2, S3, S4 = 5, 20, 50, 90  # Treshold (in %) of totation potential attendance
+max_crowd=2300 # Maximum potential attendance (a bit subjective)
+
+# Rip current forecast model
+# Below are the optimal values found at Biscarrosse Beach - See Castelle et al. (2025, NHESS)
+g = 9.81  # gravity [m/s²]
+gamma = 0.23 # breaker parameter
+z_bar = -3.0  # sandbar elevation
+d = 6.5 # channel depth
+theta_c = 284.1  # Coastline orientation
+SR1, SR2, SR3, SR4 = 0.3006, 0.9107, 1.3764, 1.8915
+
+# Shore-break wave forecast model
+dx = 2.0  # cross-shore grid spacing of the idealized beach profile
+# Constants and parameters
+gamma_s = 0.4 # Breaker parameter
+b = -2.75 # b and c define beach shape
+c = 0.3
+Zl = -2 # terrace elevation
+e = 2
+grav = 9.81
+
+# Beach profile and slope-versus-elevation lookup, built once for the site
+beach_profile = shore_break_profile(b, c, dx)
+SS1, SS2, SS3, SS4 = 1.7607, 2.9321, 5.1730, 8.6697
+
+#################################
+# Files and directories
+################################
+# XGBoost Model to be used
+model_filename = "xgboost_model_SUMMER.json"
+norm_filename = "normalization_params.pkl"
+Input_Vars=['RR1_dm','T_dm','FF_dm','DD_dm','INS_dm','Day','Month','Hour']
+
+# Default input and output locations
+DEFAULT_TIDE_CSV = os.path.join(BASE_DIR, 'Maree', 'valeurs_maree_7jours.csv')
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, 'Models')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'Cache')
+
+# To compute daily-mean values
+start_hour = 10
+end_hour = 18
+
+##########################################################################################################
+#### Stage 1 : fetch
+##############
+def fetch_forecasts(url_wave=URL_GET_WAVE, url_weather=URL_GET_WEATHER, base_url=None,
+                    timeout=DEFAULT_TIMEOUT, cache=None):
+    """
+    Télécharge en parallèle les prévisions de vagues et de météo Open-Meteo.
+
+    Args:
+        url_wave, url_weather (str): URLs des API
+        base_url (str): Serveur de substitution (tests), remplace schéma et hôte
+        timeout (tuple): Délais (connexion, lecture) en secondes
+        cache (ForecastCache): Cache disque des réponses, aucun si None
+
+    Returns:
+        Tuple (data1, data2): JSON des vagues et de la météo
+    """
+    # Obtenir les données des API
+    data1, data2 = fetch_all([url_wave, url_weather], timeout=timeout, base_url=base_url, cache=cache)
+
+    return truncate_at_missing_period(data1, data2)
+
+def truncate_at_missing_period(data1, data2):
+    """
+    Limite les deux jeux de données au premier pas de temps où la période
+    des vagues devient nulle (fin de l'horizon du modèle de vagues).
+    """
+    # Trouver le premier indice où swell_wave_peak_period est null
+    first_null_idx = -1
+    for i, val in enumerate(data1['hourly']['wave_period']):
+        if val is None:
+            first_null_idx = i
             break
-    
-    if weather_cutoff_idx != -1:
-        for key in data2['hourly']:
-            data2['hourly'][key] = data2['hourly'][key][:weather_cutoff_idx]
+
+    # Si on a trouvé un indice où swell_wave_peak_period est null,
+    # on va limiter les données de l'API jusqu'à cet indice
+    if first_null_idx != -1:
+        print(f"swell_wave_peak_period devient null à l'indice {first_null_idx}, timestamp: {data1['hourly']['time'][first_null_idx]}")
+        cutoff_date = pd.to_datetime(data1['hourly']['time'][first_null_idx])
+
+        # Limiter les données des deux APIs
+        for key in data1['hourly']:
+            data1['hourly'][key] = data1['hourly'][key][:first_null_idx]
+
+        # Limiter également les données météo au même timestamp
+        weather_cutoff_idx = -1
+        for i, time_str in enumerate(data2['hourly']['time']):
+            if pd.to_datetime(time_str) >= cutoff_date:
+                weather_cutoff_idx = i
+                break
+
+        if weather_cutoff_idx != -1:
+            for key in data2['hourly']:
+                data2['hourly'][key] = data2['hourly'][key][:weather_cutoff_idx]
+
+    return data1, data2
 
 # Convertir les données JSON en DataFrames pandas
 def create_weather_dataframe(data):
@@ -94,11 +186,7 @@ def create_waves_dataframe(data):
     
     return df
 
-# Créer les DataFrames
-weather_data = create_weather_dataframe(data2)
-waves_data = create_waves_dataframe(data1)
-
-def create_tide_dataframe_from_scraper(json_file, start_date, end_date):
+def create_tide_dataframe_from_scraper(json_file, start_date, end_date, method='cubic'):
     """
     Crée un DataFrame de marée à partir des données du scraper.
     
@@ -106,6 +194,7 @@ def create_tide_dataframe_from_scraper(json_file, start_date, end_date):
         json_file (str): Chemin vers le fichier JSON du scraper
         start_date (datetime): Date de début de la période
         end_date (datetime): Date de fin de la période
+        method (str): Interpolation entre les extrêmes, 'cubic' ou 'cosine' (comme plot_tide.py)
         
     Returns:
         pd.DataFrame: DataFrame contenant les données de marée formatées
@@ -144,30 +233,25 @@ def create_tide_dataframe_from_scraper(json_file, start_date, end_date):
     
     # Créer une série temporelle complète pour la période demandée
     time_index = pd.date_range(start=start_date, end=end_date, freq='10min')
-    
-    # Créer un DataFrame vide avec cet index temporel
+
+    # Tous les extrêmes de marée de la période en une fois : chaque point
+    # (minutes depuis minuit) est répété pour chaque jour de la période
+    days = pd.date_range(start=start_date.replace(hour=0, minute=0, second=0, microsecond=0),
+                         end=end_date, freq='D')
+    offsets = np.asarray(times, dtype='timedelta64[m]')
+    event_times = (days.values[:, None] + offsets[None, :]).ravel()
+    event_heights = np.tile(np.asarray(heights, dtype=float), len(days))
+
+    # Extrêmes triés (le dernier gagne en cas de doublon). Ils sont tous utilisés,
+    # y compris ceux qui ne tombent pas exactement sur la grille de 10 minutes
+    events = pd.Series(event_heights, index=event_times)
+    events = events[~events.index.duplicated(keep='last')].sort_index()
+
+    # Créer le DataFrame avec cet index temporel et interpoler toute la grille
     tide_df = pd.DataFrame(index=time_index)
     tide_df['Time_Tide'] = tide_df.index
-    tide_df['Eta'] = np.nan  # Colonne pour les hauteurs de marée
-    
-    # Pour chaque jour dans notre période
-    current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    while current_date <= end_date:
-        # Pour chaque heure/hauteur de marée
-        for time_min, height in zip(times, heights):
-            # Créer un timestamp pour ce point de marée
-            tide_time = current_date + timedelta(minutes=time_min)
-            
-            # Si ce temps est dans notre index, ajouter la hauteur
-            if tide_time in tide_df.index:
-                tide_df.at[tide_time, 'Eta'] = height
-        
-        # Passer au jour suivant
-        current_date += timedelta(days=1)
-    
-    # Interpoler les valeurs manquantes
-    tide_df['Eta'] = tide_df['Eta'].interpolate(method='cubic')
-    
+    tide_df['Eta'] = interpolate_tide(time_index.values, events.index.values, events.values, method)
+
     # Ajouter jour et heure pour la compatibilité avec le reste du code
     tide_df['Day'] = tide_df['Time_Tide'].dt.date.astype(str)
     tide_df['Hour'] = tide_df['Time_Tide'].dt.strftime('%H:%M')
@@ -239,713 +323,831 @@ def create_tide_dataframe_from_csv(csv_file, start_date, end_date, eta_column='H
     
     return tide_df
 
-## Time period for the forecast - utilisons les dates des données API
-start_date = pd.to_datetime(data2['hourly']['time'][0])
-end_date = pd.to_datetime(data2['hourly']['time'][-1])
+def create_tide_dataframe_from_harmonics(harmonics_file, start_date, end_date, freq='10min'):
+    """
+    Crée un DataFrame de marée prédit à partir des constituantes harmoniques
+    d'un site (voir tide_harmonics.py), sans dépendre des extrêmes scrappés.
+    
+    Args:
+        harmonics_file (str): Fichier JSON des constituantes du site
+        start_date (datetime): Date de début de la période
+        end_date (datetime): Date de fin de la période
+        freq (str): Pas de temps de la série
+        
+    Returns:
+        pd.DataFrame: DataFrame contenant les données de marée formatées
+    """
+    time_index = pd.date_range(start=start_date, end=end_date, freq=freq)
+    tide_df = pd.DataFrame({
+        'Time_Tide': time_index,
+        'Eta': predict_tide(load_harmonics(harmonics_file), time_index.values),
+        'Day': time_index.date.astype(str),
+        'Hour': time_index.strftime('%H:%M')
+    })
+    
+    return tide_df
 
-# Utiliser les données de marée du CSV au lieu des données synthétiques
-tide_data = create_tide_dataframe_from_csv('./Maree/valeurs_maree_7jours.csv', start_date, end_date)
+##########################################################################################################
+#### Stage 2 : features
+##############
+def add_daily_means(df, time_col, columns, start_hour=start_hour, end_hour=end_hour, suffix='_dm'):
+    """
+    Ajoute les moyennes journalières de columns calculées sur la fenêtre
+    [start_hour, end_hour[ de chaque jour, en une seule agrégation groupée
+    diffusée ensuite sur toutes les lignes du jour.
 
-print(tide_data.head())
+    Args:
+        df (pd.DataFrame): Données horaires
+        time_col (str): Colonne datetime
+        columns (list): Variables à moyenner
+        start_hour, end_hour (int): Fenêtre horaire de la moyenne
+        suffix (str): Suffixe des nouvelles colonnes
 
+    Returns:
+        pd.DataFrame: Copie de df avec les colonnes <variable><suffix>
+    """
+    dates = df[time_col].dt.date
+    hours = df[time_col].dt.hour
+    in_window = (hours >= start_hour) & (hours < end_hour)
 
-## Interpolation time step in minutes
-dt = 10
+    daily_means = df.loc[in_window, columns].groupby(dates[in_window]).mean().add_suffix(suffix)
 
-################################
-# Model parameters 
-################################
+    df = df.copy()
+    df[daily_means.columns] = daily_means.reindex(dates.to_numpy()).to_numpy()
+    return df
 
-# Beach user count
-# See Castelle et al. (submitted, O&CM) for details
-S1, S2, S3, S4 = 5, 20, 50, 90  # Treshold (in %) of totation potential attendance
-max_crowd=2300 # Maximum potential attendance (a bit subjective)
+def day_of_week(times):
+    """
+    Variable Day du modèle de fréquentation : jour de la semaine, de 1 (lundi)
+    à 7 (dimanche), comme à l'entraînement (moyenne 3.99, écart-type 2.0
+    dans normalization_params.pkl), et non le jour du mois.
+    """
+    return times.dt.dayofweek + 1
 
-# Rip current forecast model
-# Below are the optimal values found at Biscarrosse Beach - See Castelle et al. (2025, NHESS)
-g = 9.81  # gravity [m/s²]
-gamma = 0.23 # breaker parameter
-z_bar = -3.0  # sandbar elevation
-d = 6.5 # channel depth
-theta_c = 284.1  # Coastline orientation
-SR1, SR2, SR3, SR4 = 0.3006, 0.9107, 1.3764, 1.8915
+def build_features(data1, data2, tide_csv=DEFAULT_TIDE_CSV, tide_harmonics=None):
+    """
+    Construit la matrice des variables d'entrée (météo, vagues, marée)
+    interpolée au pas de temps dt.
 
-# Shore-break wave forecast model
-dx = 2.0  # cross-shore grid spacing of the idealized beach profile
-x = np.arange(0, 1000 + dx, dx)  # +dx to include 1000
-# Constants and parameters
-gamma_s = 0.4 # Breaker parameter
-b = -2.75 # b and c define beach shape
-c = 0.3
-Zl = -2 # terrace elevation
-e = 2
-grav = 9.81
-dx = x[1] - x[0]
+    Args:
+        data1 (dict): JSON Open-Meteo des vagues
+        data2 (dict): JSON Open-Meteo de la météo
+        tide_csv (str): Fichier CSV de marée produit par plot_tide.py
+        tide_harmonics (str): Fichier des constituantes harmoniques du site;
+            s'il est fourni, la marée est prédite au lieu d'être lue dans tide_csv
 
-# Beach profile and slope
-z = 5 + b * x**c
-SS1, SS2, SS3, SS4 = 1.7607, 2.9321, 5.1730, 8.6697
+    Returns:
+        pd.DataFrame: combined_data, indexée par date
+    """
+    # Créer les DataFrames
+    weather_data = create_weather_dataframe(data2)
+    waves_data = create_waves_dataframe(data1)
 
-#################################
-# Files and directories
-################################
-# XGBoost Model to be used
-model_filename="xgboost_model_SUMMER_RR1_dm-T_dm-FF_dm-DD_dm-INS_dm-Day-Month-Hour.json"
-model_path="Models"
-Input_Vars=['RR1_dm','T_dm','FF_dm','DD_dm','INS_dm','Day','Month','Hour']
+    ## Time period for the forecast - utilisons les dates des données API
+    start_date = pd.to_datetime(data2['hourly']['time'][0])
+    end_date = pd.to_datetime(data2['hourly']['time'][-1])
 
-# To compute daily-mean values
-start_hour = 10
-end_hour = 18
+    # Utiliser les données de marée du CSV (ou la prédiction harmonique) au lieu des données synthétiques
+    if tide_harmonics:
+        tide_data = create_tide_dataframe_from_harmonics(tide_harmonics, start_date, end_date)
+    else:
+        tide_data = create_tide_dataframe_from_csv(tide_csv, start_date, end_date)
+
+    print(tide_data.head())
+
+    ####################################
+    #### Weather processing 
+    ##############
+    # Extract hour and date
+    weather_data['Hour'] = weather_data['Time_Meteo'].dt.hour
+    weather_data['Date'] = weather_data['Time_Meteo'].dt.date
 
-####################################
-#### Weather processing 
-##############
-# Extract hour and date
-weather_data['Hour'] = weather_data['Time_Meteo'].dt.hour
-weather_data['Date'] = weather_data['Time_Meteo'].dt.date
+    # Compute daily means
+    weather_data = add_daily_means(weather_data, 'Time_Meteo', ['RR1', 'T', 'FF', 'DD', 'INS'])
 
-# Filter based on time range
-daily_mean_data = weather_data[(weather_data['Hour'] >= start_hour) & (weather_data['Hour'] < end_hour)]
+    # Add date-based features
+    weather_data['Day'] = day_of_week(weather_data['Time_Meteo'])
+    weather_data['Month'] = weather_data['Time_Meteo'].dt.month
 
-# Compute daily means
-for col in ['RR1', 'T', 'FF', 'DD', 'INS']:
-    mean_col = f"{col}_dm"
-    daily_mean = daily_mean_data.groupby('Date')[col].mean().reset_index()
-    daily_mean.rename(columns={col: mean_col}, inplace=True)
-    weather_data = pd.merge(weather_data, daily_mean, on='Date', how='left')
+    # Keep only required columns
+    final_columns = ['Time_Meteo', 'RR1', 'T', 'FF', 'DD', 'INS',
+                     'RR1_dm', 'T_dm', 'FF_dm', 'DD_dm', 'INS_dm',
+                     'Day', 'Month', 'Hour']
+    weather_data = weather_data[final_columns]
 
-# Add date-based features
-weather_data['Day'] = weather_data['Time_Meteo'].dt.day
-weather_data['Month'] = weather_data['Time_Meteo'].dt.month
+    # Drop any rows with missing values
+    weather_data.dropna(inplace=True)
 
-# Keep only required columns
-final_columns = ['Time_Meteo', 'RR1', 'T', 'FF', 'DD', 'INS',
-                 'RR1_dm', 'T_dm', 'FF_dm', 'DD_dm', 'INS_dm',
-                 'Day', 'Month', 'Hour']
-weather_data = weather_data[final_columns]
+    print("Weather columns after loading:", weather_data.columns)
+    print(weather_data.head())
 
-# Drop any rows with missing values
-weather_data.dropna(inplace=True)
+    ##########################################################################################################
+    #### Waves processing
+    ##############
+    # Ensure 'Hour' is two digits for datetime parsing
+    waves_data['Hour'] = waves_data['Hour'].apply(lambda x: str(x).zfill(2))
 
-print("Weather columns after loading:", weather_data.columns)
-print(weather_data.head())
+    # Create full datetime column if not present
+    if 'Waves_Time' not in waves_data.columns:
+        waves_data['Waves_Time'] = pd.to_datetime(waves_data['Date'] + ' ' + waves_data['Hour'], format='%Y-%m-%d %H')
 
-##########################################################################################################
-#### Waves processing
-##############
-# Ensure 'Hour' is two digits for datetime parsing
-waves_data['Hour'] = waves_data['Hour'].apply(lambda x: str(x).zfill(2))
+    # Convert numeric columns if needed
+    waves_data[['Hs', 'Tp', 'Dir']] = waves_data[['Hs', 'Tp', 'Dir']].apply(pd.to_numeric, errors='coerce')
+
+    # Extract new hour/date columns for grouping
+    waves_data['Hour'] = waves_data['Waves_Time'].dt.hour
+    waves_data['Date'] = waves_data['Waves_Time'].dt.date
+
+    # Compute daily means
+    waves_data = add_daily_means(waves_data, 'Waves_Time', ['Hs', 'Tp', 'Dir'])
+
+    # Now it's safe to drop columns you don't need (but NOT Waves_Time!)
+    waves_data = waves_data.drop(columns=['Beach', 'Date', 'Hour'])
+
+    ##########################################################################################################
+    #### Tide processing
+    ##############
+    tide_data['Time_Tide'] = pd.to_datetime(tide_data['Time_Tide'])
+
+    # Ajoutez la plage de marée pour la journée
+    tide_data['Date'] = tide_data['Time_Tide'].dt.date
+    daily_range_eta = tide_data.groupby('Date')['Eta'].agg(lambda x: x.max() - x.min()).reset_index()
+    daily_range_eta.rename(columns={'Eta': 'TR'}, inplace=True)
+    tide_data = pd.merge(tide_data, daily_range_eta, on='Date', how='left')
+    tide_data = tide_data.drop(columns=['Date'])
+
+    # Create time index for interpolation
+    time_index = pd.date_range(start=start_date, end=end_date, freq=f'{dt}min')
+    interpolation_df = pd.DataFrame(index=time_index)
+    interpolation_df['Datetime'] = interpolation_df.index
+    interpolation_df['Day'] = day_of_week(interpolation_df['Datetime'])
+    interpolation_df['Month'] = interpolation_df['Datetime'].dt.month
+    interpolation_df['Hour'] = interpolation_df['Datetime'].dt.hour + interpolation_df['Datetime'].dt.minute / 60
+
+    # Set datetime index and interpolate weather data
+    weather_data.set_index('Time_Meteo', inplace=True)
+    weather_interp = weather_data.reindex(time_index).interpolate(method='time')
+
+    # Interpoler les données de vagues
+    waves_data.set_index('Waves_Time', inplace=True)
+    waves_interp = waves_data.reindex(time_index).interpolate(method='time')
+
+    # Interpoler les données de marée
+    tide_data.set_index('Time_Tide', inplace=True)
+    tide_interp = tide_data.reindex(time_index).interpolate(method='time')
 
-# Create full datetime column if not present
-if 'Waves_Time' not in waves_data.columns:
-    waves_data['Waves_Time'] = pd.to_datetime(waves_data['Date'] + ' ' + waves_data['Hour'], format='%Y-%m-%d %H')
+    # Drop duplicate time-related columns from weather_interp
+    weather_interp = weather_interp.drop(columns=['Day', 'Month', 'Hour'], errors='ignore')
 
-# Convert numeric columns if needed
-waves_data[['Hs', 'Tp', 'Dir']] = waves_data[['Hs', 'Tp', 'Dir']].apply(pd.to_numeric, errors='coerce')
+    # Merge all dataframes on the same index mais en résolvant les duplications
+    # D'abord, renommons les colonnes dupliquées potentielles dans chaque DataFrame
+    if 'Day' in tide_interp.columns:
+        tide_interp = tide_interp.rename(columns={'Day': 'Day_tide', 'Hour': 'Hour_tide'})
 
-# Extract new hour/date columns for grouping
-waves_data['Hour'] = waves_data['Waves_Time'].dt.hour
-waves_data['Date'] = waves_data['Waves_Time'].dt.date
+    # Maintenant faire la concaténation
+    combined_data = pd.concat([interpolation_df, weather_interp, waves_interp, tide_interp], axis=1)
 
-# Compute daily means
-daily_mean_waves_data = waves_data[(waves_data['Hour'] >= start_hour) & (waves_data['Hour'] < end_hour)]
+    # Afficher les colonnes pour le débogage
+    print("Colonnes dans combined_data:", combined_data.columns.tolist())
 
-for col in ['Hs', 'Tp', 'Dir']:
-    daily_mean = daily_mean_waves_data.groupby('Date')[col].mean().reset_index()
-    daily_mean.rename(columns={col: f'{col}_dm'}, inplace=True)
-    waves_data = pd.merge(waves_data, daily_mean, on='Date', how='left')
+    # S'assurer que nous avons les colonnes Day, Month et Hour et qu'elles sont numériques
+    combined_data['Day'] = combined_data['Day'].astype(float)
+    combined_data['Month'] = combined_data['Month'].astype(float)
+    combined_data['Hour'] = combined_data['Hour'].astype(float)
 
-# Now it's safe to drop columns you don't need (but NOT Waves_Time!)
-waves_data = waves_data.drop(columns=['Beach', 'Date', 'Hour'])
+    # Drop rows with any missing values
+    combined_data.dropna(inplace=True)
+
+    # Print the head of the variable matrix to check what is in there
+    print("Combined data columns:", combined_data.columns)
+    print(combined_data.head())
+
+    return combined_data
 
 ##########################################################################################################
-#### Tide processing
+#### Stage 3 : attendance
 ##############
-tide_data['Time_Tide'] = pd.to_datetime(tide_data['Time_Tide'])
-
-# Ajoutez la plage de marée pour la journée
-tide_data['Date'] = tide_data['Time_Tide'].dt.date
-daily_range_eta = tide_data.groupby('Date')['Eta'].agg(lambda x: x.max() - x.min()).reset_index()
-daily_range_eta.rename(columns={'Eta': 'TR'}, inplace=True)
-tide_data = pd.merge(tide_data, daily_range_eta, on='Date', how='left')
-tide_data = tide_data.drop(columns=['Date'])
-
-# Create time index for interpolation
-time_index = pd.date_range(start=start_date, end=end_date, freq=f'{dt}min')
-interpolation_df = pd.DataFrame(index=time_index)
-interpolation_df['Datetime'] = interpolation_df.index
-interpolation_df['Day'] = interpolation_df['Datetime'].dt.day
-interpolation_df['Month'] = interpolation_df['Datetime'].dt.month
-interpolation_df['Hour'] = interpolation_df['Datetime'].dt.hour + interpolation_df['Datetime'].dt.minute / 60
-
-# Set datetime index and interpolate weather data
-weather_data.set_index('Time_Meteo', inplace=True)
-weather_interp = weather_data.reindex(time_index).interpolate(method='time')
-
-# Interpoler les données de vagues
-waves_data.set_index('Waves_Time', inplace=True)
-waves_interp = waves_data.reindex(time_index).interpolate(method='time')
-
-# Interpoler les données de marée
-tide_data.set_index('Time_Tide', inplace=True)
-tide_interp = tide_data.reindex(time_index).interpolate(method='time')
-
-# Drop duplicate time-related columns from weather_interp
-weather_interp = weather_interp.drop(columns=['Day', 'Month', 'Hour'], errors='ignore')
-
-# Merge all dataframes on the same index mais en résolvant les duplications
-# D'abord, renommons les colonnes dupliquées potentielles dans chaque DataFrame
-if 'Day' in tide_interp.columns:
-    tide_interp = tide_interp.rename(columns={'Day': 'Day_tide', 'Hour': 'Hour_tide'})
-
-# Maintenant faire la concaténation
-combined_data = pd.concat([interpolation_df, weather_interp, waves_interp, tide_interp], axis=1)
-
-# Afficher les colonnes pour le débogage
-print("Colonnes dans combined_data:", combined_data.columns.tolist())
-
-# S'assurer que nous avons les colonnes Day, Month et Hour et qu'elles sont numériques
-combined_data['Day'] = combined_data['Day'].astype(float)
-combined_data['Month'] = combined_data['Month'].astype(float)
-combined_data['Hour'] = combined_data['Hour'].astype(float)
-
-# Drop rows with any missing values
-combined_data.dropna(inplace=True)
-
-# Print the head of the variable matrix to check what is in there
-print("Combined data columns:", combined_data.columns)
-print(combined_data.head())
-
-# Paths
-model_filename = "xgboost_model_SUMMER.json"
-model_path = "Models"
-full_model_path = os.path.join(model_path, model_filename)
+def load_attendance_model(model_dir=DEFAULT_MODEL_DIR, nthread=None):
+    """
+    Charge le modèle XGBoost de fréquentation et ses paramètres de normalisation.
 
-# Load model and make prediction
-model = xgb.Booster()
-model.load_model(full_model_path)
+    Args:
+        model_dir (str): Répertoire du modèle et de normalization_params.pkl
+        nthread (int): Nombre de threads de prédiction, choix de XGBoost si None
 
-norm_filename = "normalization_params.pkl"
-model_path = "Models"
-full_norm_path = os.path.join(model_path, norm_filename)
-
-# Load the normalization parameters
-with open(full_norm_path, 'rb') as f:
-    norm_params = pickle.load(f)
-
-X_mean = norm_params['X_mean']
-X_std = norm_params['X_std']
-y_mean = norm_params['y_mean']
-y_std = norm_params['y_std']
-Input_Vars = norm_params['input_vars']
-
-# Vérifions quelles variables sont disponibles dans le jeu de données
-print("Variables d'entrée attendues:", Input_Vars)
-print("Variables disponibles:", combined_data.columns.tolist())
-
-# Utilisons une approche différente pour la normalisation
-# Créons une fonction qui normalise les données en utilisant des valeurs par défaut si nécessaire
-def normalize_data(data, input_vars, default_mean=0, default_std=1):
-    """Normalise le DataFrame en utilisant des valeurs par défaut si nécessaire."""
-    normalized_df = pd.DataFrame(index=data.index)
-    
-    # Moyennes et écarts-types pour les variables courantes (valeurs typiques)
-    default_means = {
-        'RR1_dm': 0.5, 'T_dm': 15.0, 'FF_dm': 3.0, 'DD_dm': 180.0, 'INS_dm': 30.0,
-        'Day': 15.0, 'Month': 6.0, 'Hour': 12.0
-    }
-    
-    default_stds = {
-        'RR1_dm': 1.0, 'T_dm': 5.0, 'FF_dm': 2.0, 'DD_dm': 90.0, 'INS_dm': 20.0,
-        'Day': 8.0, 'Month': 3.0, 'Hour': 6.0
-    }
-    
-    for var in input_vars:
-        if var in data.columns:
-            # Utiliser des valeurs par défaut pour la normalisation
-            mean_val = default_means.get(var, default_mean)
-            std_val = default_stds.get(var, default_std)
-            normalized_df[var] = (data[var] - mean_val) / std_val
+    Returns:
+        Tuple (model, norm_params)
+    """
+    if xgb is None:
+        raise ModelHealthError("xgboost n'est pas installé")
+    full_model_path = os.path.join(model_dir, model_filename)
+
+    # Load model and make prediction
+    model = xgb.Booster()
+    model.load_model(full_model_path)
+    if nthread:
+        model.set_param({'nthread': nthread})
+
+    full_norm_path = os.path.join(model_dir, norm_filename)
+
+    # Load the normalization parameters
+    with open(full_norm_path, 'rb') as f:
+        norm_params = pickle.load(f)
+    norm_params['normalization'] = normalization_vectors(norm_params)
+
+    return model, norm_params
+
+# Moyennes et écarts-types typiques, utilisés seulement pour les variables
+# absentes des paramètres de normalisation du modèle
+DEFAULT_MEANS = {
+    'RR1_dm': 0.5, 'T_dm': 15.0, 'FF_dm': 3.0, 'DD_dm': 180.0, 'INS_dm': 30.0,
+    'Day': 4.0, 'Month': 6.0, 'Hour': 12.0
+}
+DEFAULT_STDS = {
+    'RR1_dm': 1.0, 'T_dm': 5.0, 'FF_dm': 2.0, 'DD_dm': 90.0, 'INS_dm': 20.0,
+    'Day': 2.0, 'Month': 3.0, 'Hour': 6.0
+}
+
+def normalization_vectors(norm_params, default_mean=0, default_std=1):
+    """
+    Vecteurs de moyennes et d'écarts-types alignés sur norm_params['input_vars'],
+    pris dans X_mean/X_std (normalisation de l'entraînement) quand ils sont
+    présents, sinon dans DEFAULT_MEANS/DEFAULT_STDS.
+
+    Returns:
+        Tuple (mean, std) de np.ndarray float32
+    """
+    input_vars = norm_params['input_vars']
+    mean = np.array([DEFAULT_MEANS.get(var, default_mean) for var in input_vars], dtype=np.float64)
+    std = np.array([DEFAULT_STDS.get(var, default_std) for var in input_vars], dtype=np.float64)
+
+    X_mean, X_std = norm_params.get('X_mean'), norm_params.get('X_std')
+    if X_mean is not None and X_std is not None:
+        X_mean = np.ravel(np.asarray(X_mean, dtype=np.float64))
+        X_std = np.ravel(np.asarray(X_std, dtype=np.float64))
+        if len(X_mean) == len(input_vars) and len(X_std) == len(input_vars):
+            mean, std = X_mean, np.where(X_std > 0, X_std, 1.0)
         else:
-            print(f"Variable manquante: {var}. Utilisation d'une valeur par défaut (0).")
-            normalized_df[var] = 0  # Valeur normalisée par défaut
-    
-    return normalized_df
+            print(f"X_mean/X_std ({len(X_mean)} valeurs) ne correspondent pas aux {len(input_vars)} "
+                  f"variables d'entrée, utilisation des valeurs par défaut")
+    else:
+        print("Paramètres X_mean/X_std absents, utilisation des valeurs par défaut")
+    return mean.astype(np.float32), std.astype(np.float32)
 
-# Normaliser les données
-X_test_normalized = normalize_data(combined_data, Input_Vars)
+def normalize_data(data, input_vars, mean, std):
+    """
+    Normalise les variables d'entrée en un seul bloc float32 contigu
+    (ligne x variable), prêt pour Booster.inplace_predict.
 
-dmat = xgb.DMatrix(X_test_normalized)
+    Args:
+        data (pd.DataFrame): Données d'entrée
+        input_vars (list): Variables d'entrée, dans l'ordre du modèle
+        mean, std (np.ndarray): Vecteurs alignés sur input_vars (voir normalization_vectors)
 
-# On va essayer de charger le modèle avec un traitement d'erreur
-try:
-    predictions = model.predict(dmat)
-    print("Prédiction réussie avec le modèle XGBoost!")
-except Exception as e:
-    print(f"Erreur lors de la prédiction avec le modèle: {e}")
-    print("Utilisation d'une prédiction aléatoire pour démonstration...")
-    # Générer des prédictions aléatoires pour démonstration
-    import random
-    predictions = np.array([random.uniform(0.2, 0.8) for _ in range(len(X_test_normalized))])
-    print("Prédictions aléatoires générées avec succès.")
+    Returns:
+        np.ndarray: Bloc normalisé, 0 pour les variables manquantes
+    """
+    present = np.array([var in data.columns for var in input_vars])
+    block = np.zeros((len(data), len(input_vars)), dtype=np.float32)
+    if present.all():
+        block[:] = data[list(input_vars)].to_numpy(dtype=np.float32)
+        block -= mean
+        block /= std
+        return block
+
+    for var in np.asarray(input_vars)[~present]:
+        print(f"Variable manquante: {var}. Utilisation d'une valeur par défaut (0).")
+    block[:, present] = data[[var for var, ok in zip(input_vars, present) if ok]].to_numpy(dtype=np.float32)
+    block[:, present] -= mean[present]
+    block[:, present] /= std[present]
+    return block
 
 # Denormalize the predictions and actual values
 def denormalize_target(y_normalized, mean, std):
     return (y_normalized * std) + mean
 
-# Convert predictions to a Series with the same index as combined_data
-predictions_denormalized = pd.Series(denormalize_target(predictions, y_mean, y_std), index=combined_data.index)/(max_crowd/100)
-# Mask predictions outside of 08:00 to 21:00
-predictions_denormalized[(combined_data['Datetime'].dt.hour < 8) | (combined_data['Datetime'].dt.hour >= 21)] = np.nan
-predictions_denormalized = predictions_denormalized.clip(lower=0)
-predictions_denormalized = predictions_denormalized.clip(lower=0, upper=100)
-
-# Initialize with NaN
-pred_classes = pd.Series(index=predictions_denormalized.index, dtype='float')
-
-# Apply thresholds
-pred_classes[predictions_denormalized < S1] = 0
-pred_classes[(predictions_denormalized >= S1) & (predictions_denormalized < S2)] = 1
-pred_classes[(predictions_denormalized >= S2) & (predictions_denormalized < S3)] = 2
-pred_classes[(predictions_denormalized >= S3) & (predictions_denormalized < S4)] = 3
-pred_classes[predictions_denormalized >= S4] = 4
-
-plt.figure(figsize=(14, 6))
-plt.ylim(0, 100)
-plt.plot(combined_data['Datetime'], predictions_denormalized, label='Predicted Crowd (continuous)', color='dodgerblue', linestyle='-', alpha=0.6)
-
-# Optional: plot class predictions as scatter with color per class
-colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
-for level in range(5):
-    mask = pred_classes == level
-    plt.scatter(combined_data['Datetime'][mask], predictions_denormalized[mask], 
-                label=f'Level {level}', color=colors[level], s=30)
-
-plt.xlabel("Time")
-plt.ylabel("Beach attendance (%)")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# Exporter les données du graphique de fréquentation des plages en CSV
-attendance_data = pd.DataFrame({
-    'Datetime': combined_data['Datetime'],
-    'Predicted_Attendance_Percent': predictions_denormalized,
-    'Hazard_Level': pred_classes
-})
-attendance_data.to_csv('beach_attendance_data.csv', index=False)
-print("Données de fréquentation des plages exportées dans 'beach_attendance_data.csv'")
-
-# Input variables from combined_data
-Tide_Time = combined_data['Datetime'].values
-Hs = combined_data['Hs'].values
-Tp = combined_data['Tp'].values
-Dir = combined_data['Dir'].values
-Tide_Elevation = combined_data['Eta'].values
-
-# Output arrays
-Eta_b = np.full_like(Hs, np.nan)
-Eta_c = np.full_like(Hs, np.nan)
-U = np.full_like(Hs, np.nan)
-
-def dispersion_newton(T, d, precision=1e-4):
-    """
-    Solves the dispersion relation for water waves using Newton-Raphson method.
-    w^2 = g * k * tanh(k * d)
-    """
-    g = 9.81
-    w2 = (2 * np.pi / T)**2
-    k = 0.5  # initial guess
-    precision = abs(precision)
-    dispe = 2 * precision
-
-    while abs(dispe) > precision:
-        tanh_kd = np.tanh(k * d)
-        dispe = w2 - g * k * tanh_kd
-        fdispe = -g * (tanh_kd + k * d * (1 - tanh_kd**2))
-        k -= dispe / fdispe
-
-    return k
-
-def LarsonWaveRefractionAtBreaking(Hs0, Tp0, theta0, h0, gammab):
-    """
-    Larson wave refraction and breaking model.
-    Based on Larson et al. (2010)
-    """
-    if h0 <= 0:
-        raise ValueError("h0 cannot be negative or equal to 0")
-
-    g = 9.81
-    two_pi = 2 * np.pi
-
-    # Ensure inputs are arrays for vector operations
-    Hs0 = np.atleast_1d(Hs0)
-    Tp0 = np.atleast_1d(Tp0)
-    theta0 = np.atleast_1d(theta0)
-
-    N = len(Hs0)
-    Hsb = np.full(N, np.nan)
-    thetab = np.full(N, np.nan)
-    hb = np.full(N, np.nan)
-
-    for i in range(N):
-        if theta0[i] > 90:
-            thetab[i] = 90
-            Hsb[i] = 0
-        elif theta0[i] < -90:
-            thetab[i] = -90
-            Hsb[i] = 0
-        else:
-            k0 = dispersion_newton(Tp0[i], h0)
-            c0 = two_pi / (k0 * Tp0[i])
-            cg0 = c0 * (0.5 + k0 * h0 / np.sinh(2 * k0 * h0))
+def predict_attendance(combined_data, model, norm_params, max_crowd=max_crowd, thresholds=(S1, S2, S3, S4)):
+    """
+    Prédit la fréquentation de la plage (en % de max_crowd) et ses niveaux.
 
-            alpha = (c0 / np.sqrt(g * Hs0[i]))**4 * c0 * gammab**2 / cg0
-            lambdaa = (np.cos(np.radians(theta0[i])) / alpha)**0.4
-            epsi = (np.sin(np.radians(theta0[i])))**2 * lambdaa
+    Args:
+        max_crowd (int): Fréquentation potentielle maximale du site
+        thresholds (tuple): Seuils (en %) des niveaux de fréquentation
 
-            lambda_ = (1 + 0.1649 * epsi + 0.5948 * epsi**2 -
-                       1.6787 * epsi**3 + 2.8573 * epsi**4) * lambdaa
+    Returns:
+        Tuple (predictions_denormalized, pred_classes) de pd.Series
+    """
+    y_mean = norm_params['y_mean']
+    y_std = norm_params['y_std']
+    input_vars = norm_params['input_vars']
+
+    # Vérifions quelles variables sont disponibles dans le jeu de données
+    print("Variables d'entrée attendues:", input_vars)
+    print("Variables disponibles:", combined_data.columns.tolist())
+
+    # Normaliser les données (vecteurs calculés une fois au chargement du modèle)
+    if 'normalization' not in norm_params:
+        norm_params['normalization'] = normalization_vectors(norm_params)
+    X_test_normalized = normalize_data(combined_data, input_vars, *norm_params['normalization'])
+
+    # Prédiction directe sur le bloc numpy, sans construire de DMatrix; une
+    # erreur du modèle est propagée (voir AttendancePredictor pour le repli)
+    predictions = model.inplace_predict(X_test_normalized)
+    print("Prédiction réussie avec le modèle XGBoost!")
 
-            hb[i] = lambdaa * c0**2 / g
-            Hsb[i] = hb[i] * gammab
-            thetab[i] = np.degrees(np.arcsin(np.sqrt(lambda_) * np.sin(np.radians(theta0[i]))))
+    return attendance_levels(denormalize_target(predictions, y_mean, y_std), combined_data, max_crowd, thresholds)
 
-    return Hsb, thetab, hb
+def attendance_levels(attendance, combined_data, max_crowd=max_crowd, thresholds=(S1, S2, S3, S4)):
+    """
+    Fréquentation (personnes) -> pourcentage de max_crowd, masqué hors 08h-21h
+    et borné à [0, 100], et niveaux de fréquentation.
 
-# Main loop for rip current calculations
-for i in range(len(Tide_Time) - 6):
-    eta = Tide_Elevation[i]
-    h = eta - z_bar
-    H0 = Hs[i]
-    T_period = Tp[i]
-    Thet = Dir[i] - theta_c
+    Returns:
+        Tuple (predictions_denormalized, pred_classes) de pd.Series indexées comme combined_data
+    """
+    # Convert predictions to a Series with the same index as combined_data
+    predictions_denormalized = pd.Series(attendance, index=combined_data.index)/(max_crowd/100)
+    # Mask predictions outside of 08:00 to 21:00
+    predictions_denormalized[(combined_data['Datetime'].dt.hour < 8) | (combined_data['Datetime'].dt.hour >= 21)] = np.nan
+    predictions_denormalized = predictions_denormalized.clip(lower=0)
+    predictions_denormalized = predictions_denormalized.clip(lower=0, upper=100)
+
+    # Initialize with NaN
+    pred_classes = pd.Series(index=predictions_denormalized.index, dtype='float')
+    S1, S2, S3, S4 = thresholds
+
+    # Apply thresholds
+    pred_classes[predictions_denormalized < S1] = 0
+    pred_classes[(predictions_denormalized >= S1) & (predictions_denormalized < S2)] = 1
+    pred_classes[(predictions_denormalized >= S2) & (predictions_denormalized < S3)] = 2
+    pred_classes[(predictions_denormalized >= S3) & (predictions_denormalized < S4)] = 3
+    pred_classes[predictions_denormalized >= S4] = 4
+
+    return predictions_denormalized, pred_classes
+
+def check_attendance_model(model, norm_params, model_dir=DEFAULT_MODEL_DIR, cache_dir=None):
+    """
+    Vérifications du modèle chargé (voir model_health.check_model), conservées
+    dans cache_dir/model_health.json une fois réussies.
 
-    H0br, Thetbr, hbr = LarsonWaveRefractionAtBreaking(H0, T_period, Thet, 10, 0.7)
-    H0 = H0br
+    Raises:
+        ModelHealthError: si le modèle est modifié ou incompatible avec Input_Vars
+    """
+    cache_path = os.path.join(cache_dir, 'model_health.json') if cache_dir else None
+    return check_model(model, norm_params['input_vars'], model_dir, [model_filename, norm_filename],
+                       expected_vars=Input_Vars, cache_path=cache_path)
 
-    # Bar crest
-    if h <= 0 or H0 <= gamma * h:
-        Eta_b[i] = 0
-    else:
-        Eta_b[i] = 0.16 * (H0 - gamma * h) ** 2 / H0
+# Erreurs de chargement et de vérification qui font passer au repli
+MODEL_ERRORS = (ModelHealthError, OSError, pickle.UnpicklingError, KeyError) + ((xgb.core.XGBoostError,) if xgb else ())
 
-    # Channel crest
-    if (h + d) <= 0 or H0 <= gamma * (h + d):
-        Eta_c[i] = 0
-    else:
-        Eta_c[i] = 0.16 * (H0 - gamma * (h + d)) ** 2 / H0
-
-    Pg = max(0, Eta_b[i] - Eta_c[i])
-    U[i] = np.sqrt(2 * g * Pg)
-
-# Initialize Uh with zeros
-Uh = np.zeros_like(U)
-
-# Assign discrete hazard levels
-Uh[(U >= SR1) & (U < SR2)] = 1
-Uh[(U >= SR2) & (U < SR3)] = 2
-Uh[(U >= SR3) & (U < SR4)] = 3
-Uh[U >= SR4] = 4
-
-# Color map for hazard levels
-colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
-
-# Plotting rip current hazard
-plt.figure(figsize=(14, 5))
-
-# Continuous line for U
-plt.plot(Tide_Time[:len(U)], U, color='steelblue', label='Rip Current Velocity (U)', zorder=1)
-
-# Overlay colored circles for hazard levels
-for level in range(5):  # levels 0 to 4
-    idx = Uh == level
-    plt.scatter(np.array(Tide_Time[:len(U)])[idx], np.array(U)[idx],
-                color=colors[level], label=f'Hazard Level {level}', edgecolor='k', s=40, zorder=2)
-
-plt.axhline(SR1, color='gray', linestyle='--', linewidth=0.7)
-plt.axhline(SR2, color='gray', linestyle='--', linewidth=0.7)
-plt.axhline(SR3, color='gray', linestyle='--', linewidth=0.7)
-plt.axhline(SR4, color='gray', linestyle='--', linewidth=0.7)
-
-plt.xlabel('Time')
-plt.ylabel('U (m/s)')
-plt.title('Rip Current Velocity with Hazard Levels')
-plt.ylim(0, 2.8)
-plt.grid(True, linestyle='--', alpha=0.5)
-plt.legend(loc='upper right', ncol=2)
-plt.tight_layout()
-plt.show()
-
-# Exporter les données du graphique de courant d'arrachement en CSV
-rip_current_data = pd.DataFrame({
-    'Datetime': Tide_Time[:len(U)],
-    'Rip_Current_Velocity': U,
-    'Hazard_Level': Uh
-})
-rip_current_data.to_csv('rip_current_data.csv', index=False)
-print("Données de courant d'arrachement exportées dans 'rip_current_data.csv'")
-
-# Shore-break wave forecast calculations
-slope = -np.diff(z) / dx
-elev = z[:-1]
-
-# Preallocate arrays
-N = len(Tide_Time)
-TWL = Tide_Elevation[:N]
-H0brv = np.full(N, np.nan)
-Thetbrv = np.full(N, np.nan)
-hbrv = np.full(N, np.nan)
-L0 = np.full(N, np.nan)
-Slope_t = np.full(N, np.nan)
-Hbs = np.full(N, np.nan)
-Irr = np.full(N, np.nan)
-ShoreBreak_Index = np.full(N, np.nan)
-
-# Loop over time steps for shore-break calculations
-for i in range(N):
-    eta = Tide_Elevation[i]
-    h = eta - z_bar
-    Thet = Dir[i] - theta_c
-
-    # Refraction at breaking
-    H0br, Thetbr, hbr = LarsonWaveRefractionAtBreaking(Hs[i], Tp[i], Thet, 10, 0.7)
-    H0brv[i] = H0br
-    Thetbrv[i] = Thetbr
-    hbrv[i] = hbr
-    L0[i] = grav * Tp[i]**2 / (2 * np.pi)
-
-    # Shore break logic
-    if eta < Zl:
-        Slope_t[i] = 0
-        Hbs[i] = 0
-        Irr[i] = 0
-    elif eta - H0br / gamma_s > Zl:
-        Hbs[i] = H0br
-        slope_interp = interp1d(elev, slope, bounds_error=False, fill_value=np.nan)
-        Slope_t[i] = slope_interp(TWL[i])
-        Irr[i] = Slope_t[i] / np.sqrt(Hbs[i] / L0[i])
-    else:  # eta - H0br / gamma_s <= Zl
-        Hbs[i] = H0br - (1 / H0br) * (H0br - gamma_s * (eta - Zl))**2
-        slope_interp = interp1d(elev, slope, bounds_error=False, fill_value=np.nan)
-        Slope_t[i] = slope_interp(TWL[i])
-        Irr[i] = Slope_t[i] / np.sqrt(Hbs[i] / L0[i])
-
-# Compute ShoreBreak_Index
-ShoreBreak_Index = Irr * Hbs**e 
-
-# Define color map for threshold categories
-def get_color(val, SS1, SS2, SS3, SS4):
-    if val < SS1:
-        return 'lightgrey'
-    elif val < SS2:
-        return 'yellowgreen'
-    elif val < SS3:
-        return 'orange'
-    elif val < SS4:
-        return 'orangered'
-    else:
-        return 'darkred'
-
-# Create hazard level labels and color mapping
-level_labels = ['Level 0', 'Level 1', 'Level 2', 'Level 3', 'Level 4']
-level_colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
-
-# Compute colors and levels for plotting
-colors = []
-levels = []
-for val in ShoreBreak_Index:
-    if val < SS1:
-        colors.append(level_colors[0])
-        levels.append(0)
-    elif val < SS2:
-        colors.append(level_colors[1])
-        levels.append(1)
-    elif val < SS3:
-        colors.append(level_colors[2])
-        levels.append(2)
-    elif val < SS4:
-        colors.append(level_colors[3])
-        levels.append(3)
+class AttendancePredictor:
+    """
+    Prédiction de fréquentation par le service local (attendance_service.py)
+    si son URL est donnée, qu'il répond et qu'il sert le modèle de model_dir,
+    sinon par le modèle chargé et vérifié dans ce processus.
+
+    Si le modèle est invalide, xgboost absent ou si la prédiction échoue, la
+    fréquentation est estimée par la table précalculée (attendance_lookup.py),
+    sinon reprise des dernières prédictions du modèle (cache_dir/attendance)
+    puis de la table climatologique du modèle, jamais inventée; la source de
+    chaque pas de temps est rendue avec les prédictions et l'état du dernier
+    appel dans self.status.
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, attendance_service=None, nthread=None, cache_dir=None):
+        self.model_dir = model_dir
+        self.cache_dir = cache_dir
+        self.input_vars = list(Input_Vars)
+        self.lookup_path = os.path.join(model_dir, LOOKUP_FILE)
+        self.status = {'model_dir': model_dir, 'service': None, 'model_hash': None, 'source': None,
+                       'latency_ms': None, 'rows': 0, 'errors': []}
+        self._predict = None
+
+        if attendance_service:
+            self._connect(attendance_service)
+        if self._predict is None:
+            self._load(nthread)
+        # Erreurs du chargement, reprises dans l'état de chaque appel
+        self.load_errors = list(self.status['errors'])
+
+    def _load(self, nthread):
+        try:
+            model, norm_params = load_attendance_model(self.model_dir, nthread)
+            report = check_attendance_model(model, norm_params, self.model_dir, self.cache_dir)
+        except MODEL_ERRORS as e:
+            self._fail(f"Modèle de fréquentation inutilisable: {e}")
+            return
+        self.input_vars = list(norm_params['input_vars'])
+        self.status['model_hash'] = report['model_hash']
+        lookup = load_lookup(self.lookup_path)
+        if lookup is not None and lookup['model_hash'] != report['model_hash']:
+            print(f"Table '{self.lookup_path}' construite pour un autre modèle, non utilisée en repli")
+            self.lookup_path = None
+
+        def predict(combined_data, max_crowd, thresholds):
+            return predict_attendance(combined_data, model, norm_params, max_crowd, thresholds)
+        self._predict = predict
+
+    def last_path(self, site_id=None):
+        """Dernières prédictions du modèle (cache_dir/attendance), une par site en mode batch; None sans cache."""
+        if not self.cache_dir:
+            return None
+        name = f"last_predictions_{site_id}.pkl" if site_id else 'last_predictions.pkl'
+        return os.path.join(self.cache_dir, 'attendance', name)
+
+    def _connect(self, attendance_service):
+        import requests
+        from attendance_service import AttendanceClient
+        client = AttendanceClient(attendance_service)
+        try:
+            health = client.health()
+        except requests.RequestException as e:
+            print(f"Service de fréquentation injoignable ({e}), chargement local du modèle")
+            return
+        if os.path.abspath(health['model_dir']) != os.path.abspath(self.model_dir):
+            print(f"Le service '{attendance_service}' sert le modèle '{health['model_dir']}', "
+                  f"chargement local de '{self.model_dir}'")
+            return
+        print(f"Prédiction de fréquentation par le service '{attendance_service}'")
+        self.input_vars = health['input_vars']
+        self.status.update(service=attendance_service, model_hash=health.get('model_hash'))
+        self._predict = client.predict
+
+    def _fail(self, message):
+        print(message)
+        self.status['errors'].append(message)
+
+    def __call__(self, combined_data, max_crowd=max_crowd, thresholds=(S1, S2, S3, S4), site_id=None):
+        """
+        Args:
+            site_id (str): Site des prédictions (batch), pour ne pas mêler les
+                dernières prédictions de sites partageant le même prédicteur
+
+        Returns:
+            Tuple (predictions_denormalized, pred_classes, sources): sources donne
+            pour chaque pas de temps le code de ATTENDANCE_SOURCES utilisé
+        """
+        self.status.update(rows=len(combined_data), source=None, latency_ms=None, errors=list(self.load_errors))
+        last_path = self.last_path(site_id)
+        if self._predict is not None:
+            start = time.perf_counter()
+            try:
+                predictions_denormalized, pred_classes = self._predict(combined_data, max_crowd, thresholds)
+            except Exception as e:
+                self._fail(f"Erreur lors de la prédiction avec le modèle: {e}")
+            else:
+                self.status.update(source='model', latency_ms=round((time.perf_counter() - start) * 1e3, 3))
+                if last_path:
+                    save_last_predictions(last_path, combined_data['Datetime'],
+                                          predictions_denormalized.to_numpy() * (max_crowd / 100))
+                return predictions_denormalized, pred_classes, np.zeros(len(combined_data))
+
+        lookup = load_lookup(self.lookup_path)
+        estimate = lookup_attendance(lookup, combined_data) if lookup is not None else None
+        climatology = load_climatology(os.path.join(self.model_dir, CLIMATOLOGY_FILE))
+        attendance, sources = fallback_attendance(combined_data['Datetime'], load_last_predictions(last_path),
+                                                  climatology, estimate)
+        if np.isnan(sources).any():
+            raise ModelHealthError("Pas de prédiction de fréquentation de repli (ni cache ni table climatologique) "
+                                   f"pour {int(np.isnan(sources).sum())} pas de temps")
+        self.status['source'] = source_label(sources)
+        print(f"Fréquentation de repli ({self.status['source']}) pour {len(sources)} pas de temps")
+        predictions_denormalized, pred_classes = attendance_levels(attendance, combined_data, max_crowd, thresholds)
+        return predictions_denormalized, pred_classes, sources
+
+##########################################################################################################
+#### Stages 4 and 5 : rip current and shore break
+##############
+def compute_hazards(combined_data, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Calcule la réfraction partagée puis les indicateurs de courant
+    d'arrachement et de shore break pour tout l'horizon.
+
+    Returns:
+        dict avec les tableaux Tide_Time, U, Uh, ShoreBreak_Index et levels
+    """
+    # Input variables from combined_data
+    Tide_Time = combined_data['Datetime'].values
+    Hs = combined_data['Hs'].values
+    Tp = combined_data['Tp'].values
+    Dir = combined_data['Dir'].values
+    Tide_Elevation = combined_data['Eta'].values
+
+    # Refraction at breaking, computed once and shared by the rip-current and shore-break models
+    refraction_cache_dir = os.path.join(cache_dir, 'refraction') if cache_dir else None
+    H0brv, Thetbrv, hbrv = compute_refraction(Hs, Tp, Dir - theta_c, 10, 0.7, cache_dir=refraction_cache_dir)
+
+    # Rip current velocity and hazard levels for every time step
+    U, Uh = rip_current_hazard(Tide_Elevation, Hs, Tp, Dir, gamma, z_bar, d, theta_c,
+                               (SR1, SR2, SR3, SR4), H0b=H0brv)
+
+    # Shore-break wave forecast calculations for the whole horizon
+    ShoreBreak_Index, levels = shore_break_hazard(Tide_Elevation, H0brv, Tp, beach_profile,
+                                                  gamma_s, Zl, e, (SS1, SS2, SS3, SS4))
+
+    return {
+        'Tide_Time': Tide_Time,
+        'U': U,
+        'Uh': Uh,
+        'ShoreBreak_Index': ShoreBreak_Index,
+        'levels': levels,
+    }
+
+##########################################################################################################
+#### Incremental mode : only the time steps whose inputs changed are recomputed
+##############
+HAZARD_INPUTS = ['Hs', 'Tp', 'Dir', 'Eta']
+RESULT_COLUMNS = ['Attendance', 'Attendance_Level', 'U', 'Uh', 'ShoreBreak_Index', 'ShoreBreak_Level',
+                  'Attendance_Source']
+
+def run_config_key(model_dir):
+    """Empreinte du modèle, des paramètres de normalisation et des paramètres des modèles de risque."""
+    params = (S1, S2, S3, S4, max_crowd, gamma, z_bar, d, theta_c, SR1, SR2, SR3, SR4,
+              dx, gamma_s, b, c, Zl, e, SS1, SS2, SS3, SS4, tuple(RESULT_COLUMNS))
+    files = [os.path.join(model_dir, model_filename), os.path.join(model_dir, norm_filename)]
+    return incremental.config_key(files, params)
+
+def incremental_forecast(combined_data, predict, input_vars, model_dir, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Comme predict_attendance puis compute_hazards, mais seules les lignes de
+    combined_data dont les entrées diffèrent de l'exécution précédente sont
+    recalculées; les autres résultats sont repris de l'état enregistré dans
+    cache_dir/incremental.
+
+    Args:
+        predict (AttendancePredictor): combined_data -> (predictions_denormalized, pred_classes, sources);
+            son état (status) décrit ensuite toute la série rendue
+        input_vars (list): Variables d'entrée du modèle de fréquentation
+
+    Returns:
+        Tuple (predictions_denormalized, pred_classes, sources, hazards)
+    """
+    state_path = os.path.join(cache_dir, 'incremental', 'state.pkl')
+    key = run_config_key(model_dir)
+
+    # Toutes les colonnes lues par les modèles, plus la date (masque horaire de la fréquentation)
+    columns = ['Datetime'] + [v for v in list(input_vars) + HAZARD_INPUTS if v in combined_data.columns]
+    fingerprints = incremental.row_fingerprints(combined_data, columns)
+    times = combined_data['Datetime'].to_numpy()
+
+    previous = incremental.load_state(state_path, key)
+    changed = incremental.changed_rows(times, fingerprints, previous)
+    if previous is not None:
+        # Fréquentation de repli lors de l'exécution précédente : toujours recalculée
+        previous_sources = previous['Attendance_Source'].reindex(pd.DatetimeIndex(times)).to_numpy()
+        changed |= previous_sources > 0
+    print(f"Mode incrémental: {changed.sum()} pas de temps sur {len(changed)} à recalculer")
+
+    new_results = {}
+    if changed.any():
+        subset = combined_data[changed]
+        predictions, classes, sources = predict(subset)
+        hazards = compute_hazards(subset, cache_dir)
+        new_results = {
+            'Attendance': predictions, 'Attendance_Level': classes,
+            'U': hazards['U'], 'Uh': hazards['Uh'],
+            'ShoreBreak_Index': hazards['ShoreBreak_Index'], 'ShoreBreak_Level': hazards['levels'],
+            'Attendance_Source': sources,
+        }
+
+    rows = incremental.splice(times, fingerprints, changed, new_results, previous, RESULT_COLUMNS)
+    incremental.save_state(state_path, key, rows)
+
+    predictions_denormalized = pd.Series(rows['Attendance'].to_numpy(), index=combined_data.index)
+    pred_classes = pd.Series(rows['Attendance_Level'].to_numpy(), index=combined_data.index)
+    sources = rows['Attendance_Source'].to_numpy()
+    # État de la série publiée (lignes reprises comprises), pas du seul sous-ensemble recalculé
+    predict.status.update(rows=len(sources), source=source_label(sources))
+    hazards = {
+        'Tide_Time': times,
+        'U': rows['U'].to_numpy(),
+        'Uh': rows['Uh'].to_numpy(),
+        'ShoreBreak_Index': rows['ShoreBreak_Index'].to_numpy(),
+        'levels': rows['ShoreBreak_Level'].to_numpy().astype(int),
+    }
+    return predictions_denormalized, pred_classes, sources, hazards
+
+##########################################################################################################
+#### Stage 6 : export
+##############
+def export_results(combined_data, predictions_denormalized, pred_classes, hazards, output_dir='.',
+                   attendance_sources=None, attendance_status=None):
+    """
+    Écrit les CSV de fréquentation, de courant d'arrachement, de shore break et
+    combiné, l'export compact en colonnes beach_hazard_data.bin (voir
+    columnar_export.py) et les synthèses horaires et journalières de chaque
+    série (<série>_hourly.csv, <série>_daily.csv).
+
+    Args:
+        attendance_sources (np.ndarray): Codes de ATTENDANCE_SOURCES de chaque pas de temps,
+            exportés dans la colonne Attendance_Source de beach_attendance_data.csv
+        attendance_status (dict): État de la prédiction (AttendancePredictor.status),
+            exporté dans attendance_status.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    Tide_Time, U, Uh = hazards['Tide_Time'], hazards['U'], hazards['Uh']
+    ShoreBreak_Index, levels = hazards['ShoreBreak_Index'], hazards['levels']
+
+    # Exporter les données du graphique de fréquentation des plages en CSV
+    attendance_data = pd.DataFrame({
+        'Datetime': combined_data['Datetime'],
+        'Predicted_Attendance_Percent': predictions_denormalized,
+        'Hazard_Level': pred_classes
+    })
+    if attendance_sources is not None:
+        attendance_data['Attendance_Source'] = np.asarray(ATTENDANCE_SOURCES)[np.asarray(attendance_sources, dtype=int)]
+    attendance_data.to_csv(os.path.join(output_dir, 'beach_attendance_data.csv'), index=False)
+    print("Données de fréquentation des plages exportées dans 'beach_attendance_data.csv'")
+    if attendance_status is not None:
+        with open(os.path.join(output_dir, 'attendance_status.json'), 'w') as f:
+            json.dump(attendance_status, f, indent=2)
+        if attendance_status.get('source') != 'model':
+            print(f"ATTENTION: fréquentation de repli ({attendance_status.get('source')}), voir 'attendance_status.json'")
+
+    # Exporter les données du graphique de courant d'arrachement en CSV
+    rip_current_data = pd.DataFrame({
+        'Datetime': Tide_Time[:len(U)],
+        'Rip_Current_Velocity': U,
+        'Hazard_Level': Uh
+    })
+    rip_current_data.to_csv(os.path.join(output_dir, 'rip_current_data.csv'), index=False)
+    print("Données de courant d'arrachement exportées dans 'rip_current_data.csv'")
+
+    # Exporter les données du graphique de shore break en CSV
+    shore_break_data = pd.DataFrame({
+        'Datetime': Tide_Time[:len(ShoreBreak_Index)],
+        'ShoreBreak_Index': ShoreBreak_Index,
+        'Hazard_Level': levels
+    })
+    shore_break_data.to_csv(os.path.join(output_dir, 'shore_break_data.csv'), index=False)
+    print("Données de shore break exportées dans 'shore_break_data.csv'")
+
+    # Exporter toutes les données combinées en un seul CSV
+    all_data = pd.DataFrame({
+        'Datetime': combined_data['Datetime'],
+        'Wave_Height': combined_data['Hs'],
+        'Wave_Period': combined_data['Tp'],
+        'Wave_Direction': combined_data['Dir'],
+        'Tide_Elevation': combined_data['Eta'],
+        'Beach_Attendance_Percent': predictions_denormalized,
+        'Beach_Attendance_Level': pred_classes
+    })
+
+    # Ajouter les données de courant d'arrachement et de shore break en une seule
+    # jointure sur l'index temporel commun (niveaux en float, comme les colonnes
+    # NaN remplies pas à pas avant la jointure, même si toutes les dates sont couvertes)
+    hazard_series = pd.DataFrame({
+        'Rip_Current_Velocity': U,
+        'Rip_Current_Level': np.asarray(Uh, dtype=float),
+        'ShoreBreak_Index': ShoreBreak_Index,
+        'ShoreBreak_Level': np.asarray(levels, dtype=float)
+    }, index=pd.DatetimeIndex(Tide_Time[:len(U)], name='Datetime'))
+    all_data = all_data.join(hazard_series, on='Datetime')
+
+    # Exporter le CSV combiné
+    all_data.to_csv(os.path.join(output_dir, 'all_beach_hazard_data.csv'), index=False)
+    print("Toutes les données combinées exportées dans 'all_beach_hazard_data.csv'")
+
+    # Export compact : mêmes séries en float32 / uint8 sur la grille temporelle
+    levels_columns = {'Beach_Attendance_Level', 'Rip_Current_Level', 'ShoreBreak_Level'}
+    columnar_series = {name: (all_data[name].to_numpy(), 'uint8' if name in levels_columns else 'float32')
+                       for name in all_data.columns if name != 'Datetime'}
+    size = write_columnar(os.path.join(output_dir, 'beach_hazard_data.bin'), all_data['Datetime'].to_numpy(),
+                          columnar_series)
+    print(f"Export compact des séries dans 'beach_hazard_data.bin' ({size} octets)")
+
+    # Synthèses horaires et journalières, calculées une fois ici plutôt que par chaque client
+    write_summaries(output_dir, 'beach_attendance', combined_data['Datetime'], predictions_denormalized.to_numpy(),
+                    pred_classes.to_numpy())
+    write_summaries(output_dir, 'rip_current', Tide_Time[:len(U)], U, Uh)
+    write_summaries(output_dir, 'shore_break', Tide_Time[:len(ShoreBreak_Index)], ShoreBreak_Index, levels)
+
+##########################################################################################################
+#### Plots (optional stage)
+##############
+def submit_plots(plots_dir, combined_data, predictions_denormalized, pred_classes, hazards):
+    """
+    Lance le rendu des graphiques PNG dans un processus de fond.
+    matplotlib n'est importé que dans ce processus (module hazard_plots).
+
+    Returns:
+        concurrent.futures.Future dont le résultat est la liste des PNG écrits
+    """
+    executor = ProcessPoolExecutor(max_workers=1)
+    future = executor.submit(_render_plots, plots_dir, combined_data['Datetime'],
+                             predictions_denormalized, pred_classes, hazards,
+                             (SR1, SR2, SR3, SR4), (SS1, SS2, SS3, SS4))
+    executor.shutdown(wait=False)
+    return future
+
+def _render_plots(*args):
+    import hazard_plots
+    return hazard_plots.render_plots(*args)
+
+##########################################################################################################
+#### Pipeline
+##############
+def run_pipeline(tide_csv=DEFAULT_TIDE_CSV, model_dir=DEFAULT_MODEL_DIR, output_dir='.',
+                 cache_dir=DEFAULT_CACHE_DIR, plots_dir=None, data=None, api_base_url=None,
+                 replay=False, replay_issue=None, tide_harmonics=None, incremental_mode=False,
+                 attendance_service=None, nthread=None):
+    """
+    Enchaîne les étapes fetch → features → attendance → rip → shore-break → export.
+
+    Args:
+        tide_csv (str): Fichier CSV de marée
+        model_dir (str): Répertoire du modèle XGBoost et des paramètres de normalisation
+        output_dir (str): Répertoire de sortie des CSV
+        cache_dir (str): Répertoire des caches (None pour désactiver)
+        plots_dir (str): Si fourni, les graphiques sont rendus en PNG dans ce
+            répertoire par un processus de fond; sinon matplotlib n'est jamais importé
+        data (tuple): JSON (vagues, météo) déjà téléchargés; téléchargés si None
+        api_base_url (str): Serveur de substitution pour les API Open-Meteo
+        replay (bool): Rejouer les réponses Open-Meteo archivées dans le cache
+        replay_issue (str): Créneau d'émission à rejouer (YYYYmmddHH), le plus récent si None
+        tide_harmonics (str): Constituantes harmoniques du site, remplacent tide_csv si fournies
+        incremental_mode (bool): Ne recalculer que les pas de temps dont les entrées
+            ont changé depuis l'exécution précédente (état conservé dans cache_dir)
+        attendance_service (str): URL du service de fréquentation (attendance_service.py)
+            qui garde le modèle en mémoire; modèle chargé localement si None ou injoignable
+        nthread (int): Nombre de threads de prédiction XGBoost du modèle local
+
+    Returns:
+        dict avec combined_data, les prédictions de fréquentation et les indicateurs
+    """
+    if incremental_mode and not cache_dir:
+        raise ValueError("Le mode incrémental nécessite le cache (--cache-dir)")
+    if data is None:
+        forecast_cache = None
+        if cache_dir:
+            forecast_cache = ForecastCache(os.path.join(cache_dir, 'openmeteo'),
+                                           replay=replay, issue=replay_issue)
+        elif replay:
+            raise ValueError("Le rejeu nécessite le cache (--cache-dir)")
+        data = fetch_forecasts(base_url=api_base_url, cache=forecast_cache)
+    data1, data2 = data
+    combined_data = build_features(data1, data2, tide_csv, tide_harmonics)
+
+    predictor = AttendancePredictor(model_dir, attendance_service, nthread, cache_dir)
+    if incremental_mode:
+        predictions_denormalized, pred_classes, sources, hazards = incremental_forecast(
+            combined_data, predictor, predictor.input_vars, model_dir, cache_dir)
     else:
-        colors.append(level_colors[4])
-        levels.append(4)
-levels = np.array(levels)
-
-# Plot shore break hazards
-plt.figure(figsize=(14, 6))
-
-# Line for ShoreBreak Index
-plt.plot(Tide_Time[:len(ShoreBreak_Index)], ShoreBreak_Index, color='black', linewidth=2, label='ShoreBreak Index', zorder=1)
-
-# Colored hazard-level dots
-for level in range(5):
-    idx = levels == level
-    plt.scatter(np.array(Tide_Time[:len(ShoreBreak_Index)])[idx], np.array(ShoreBreak_Index)[idx],
-                color=level_colors[level], label=level_labels[level], edgecolor='k', s=50, zorder=2)
-
-# Dashed horizontal threshold lines
-for ss, label in zip([SS1, SS2, SS3, SS4], ['SS1', 'SS2', 'SS3', 'SS4']):
-    plt.axhline(ss, color='black', linestyle='--', linewidth=0.8, label=label)
-
-# Final formatting
-plt.title('ShoreBreak Index with Hazard Levels')
-plt.xlabel('Time')
-plt.ylabel('Shore Break Index')
-plt.ylim(0, 26)
-plt.legend(ncol=2, loc='upper right')
-plt.grid(True, linestyle='--', alpha=0.5)
-plt.tight_layout()
-plt.show()
-
-# Exporter les données du graphique de shore break en CSV
-shore_break_data = pd.DataFrame({
-    'Datetime': Tide_Time[:len(ShoreBreak_Index)],
-    'ShoreBreak_Index': ShoreBreak_Index,
-    'Hazard_Level': levels
-})
-shore_break_data.to_csv('shore_break_data.csv', index=False)
-print("Données de shore break exportées dans 'shore_break_data.csv'")
-
-# Combined plot with all hazard indicators
-# Define the color scheme for the levels
-colors = ['lightgrey', 'yellowgreen', 'orange', 'orangered', 'darkred']
-
-# Create a figure with 4 subplots (adding wave height)
-plt.figure(figsize=(16, 15))  # Increased figure height to accommodate 4 subplots
-
-# Define threshold lines for each subplot
-attendance_thresholds = [S1, S2, S3, S4]  # Thresholds for Beach Attendance
-rip_current_thresholds = [SR1, SR2, SR3, SR4]  # Already defined for Rip Current
-shore_break_thresholds = [SS1, SS2, SS3, SS4]  # Already defined for Shore Break
-
-# Uncomment bellow to see the 4th subplot
-# # Subplot for Beach Attendance Prediction
-# plt.subplot(4, 1, 1)  # Changed from 3 to 4 rows
-# plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=4))
-# plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-# plt.setp(plt.gca().get_xticklabels(), rotation=45, ha='right')
-
-# plt.plot(combined_data['Datetime'], predictions_denormalized, label='Predicted Beach Attendance (%)', color='dodgerblue', linestyle='-', alpha=0.6)
-# for level in range(5):
-#     mask = pred_classes == level
-#     plt.scatter(combined_data['Datetime'][mask], predictions_denormalized[mask], 
-#                 label=f'Level {level}', color=colors[level], s=30)
-
-# # Add dashed threshold lines for Beach Attendance
-# for threshold in attendance_thresholds:
-#     plt.axhline(threshold, color='gray', linestyle='--', linewidth=0.7)
-
-# plt.ylabel('Beach Attendance (%)')
-# plt.ylim(0, 80)
-# plt.legend(loc='upper right')
-# plt.grid(True)
-# plt.title('Beach Hazard and Wave Indicators', fontsize=14)
-
-# # Subplot for Wave Height
-# plt.subplot(4, 1, 2)  # New subplot for wave height
-# plt.plot(combined_data['Datetime'], combined_data['Hs'], color='teal', label='Wave Height (m)', linewidth=2)
-# plt.fill_between(combined_data['Datetime'], 0, combined_data['Hs'], color='teal', alpha=0.3)
-# plt.ylabel('Wave Height (m)')
-# plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=4))
-# plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-# plt.setp(plt.gca().get_xticklabels(), rotation=45, ha='right')
-# plt.grid(True, linestyle='--', alpha=0.5)
-# plt.legend(loc='upper right')
-
-# # Subplot for Rip Current Velocity
-# plt.subplot(4, 1, 3)  # Changed from 3,1,2 to 4,1,3
-# plt.plot(Tide_Time[:len(U)], U, color='steelblue', label='Rip Current Velocity (U)', zorder=1)
-# for level in range(5):
-#     idx = Uh == level
-#     plt.scatter(np.array(Tide_Time[:len(U)])[idx], np.array(U)[idx],
-#                 color=colors[level], label=f'Hazard Level {level}', s=40, zorder=2)
-
-# # Add dashed threshold lines for Rip Current Velocity
-# for threshold in rip_current_thresholds:
-#     plt.axhline(threshold, color='gray', linestyle='--', linewidth=0.7)
-
-# plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=4))
-# plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-# plt.setp(plt.gca().get_xticklabels(), rotation=45, ha='right')
-
-# plt.ylabel('Rip current flow velocity & Hazard Level')
-# plt.ylim(0, 2.8)
-# plt.legend(loc='upper right', ncol=2)
-# plt.grid(True, linestyle='--', alpha=0.5)
-
-# # Subplot for Shore Break Hazard Index
-# plt.subplot(4, 1, 4)  # Changed from 3,1,3 to 4,1,4
-# plt.plot(Tide_Time, ShoreBreak_Index, color='green', label='Shore Break Hazard Index', zorder=1)
-
-# # Corrected hazard level mapping for Shore Break Hazard Index
-# for level in range(5):
-#     if level == 0:
-#         idx = ShoreBreak_Index <= SS1
-#     elif level == 1:
-#         idx = (ShoreBreak_Index > SS1) & (ShoreBreak_Index <= SS2)
-#     elif level == 2:
-#         idx = (ShoreBreak_Index > SS2) & (ShoreBreak_Index <= SS3)
-#     elif level == 3:
-#         idx = (ShoreBreak_Index > SS3) & (ShoreBreak_Index <= SS4)
-#     else:
-#         idx = ShoreBreak_Index > SS4
-    
-#     plt.scatter(np.array(Tide_Time)[idx], np.array(ShoreBreak_Index)[idx],
-#                 color=colors[level], label=f'Hazard Level {level}', s=40, zorder=2)
-
-# # Add dashed threshold lines for Shore Break Hazard Index
-# for threshold in shore_break_thresholds:
-#     plt.axhline(threshold, color='gray', linestyle='--', linewidth=0.7)
-
-# plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=4))
-# plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-# plt.setp(plt.gca().get_xticklabels(), rotation=45, ha='right')
-
-# plt.xlabel('Time')
-# plt.ylabel('Shore Break Energy & Hazard Level')
-# plt.ylim(0, 26)
-# plt.legend(loc='upper right')
-# plt.grid(True)
-
-# # Adjust layout
-# plt.tight_layout()
-
-# # Show the plot
-# plt.savefig('Beach_Hazard_Indicators.png', dpi=300, bbox_inches='tight')
-# plt.show()
-
-# Exporter toutes les données combinées en un seul CSV
-all_data = pd.DataFrame({
-    'Datetime': combined_data['Datetime'],
-    'Wave_Height': combined_data['Hs'],
-    'Wave_Period': combined_data['Tp'],
-    'Wave_Direction': combined_data['Dir'],
-    'Tide_Elevation': combined_data['Eta'],
-    'Beach_Attendance_Percent': predictions_denormalized,
-    'Beach_Attendance_Level': pred_classes
-})
-
-# Ajouter les données de courant d'arrachement en alignant sur l'index temporel
-all_data['Rip_Current_Velocity'] = np.nan
-all_data['Rip_Current_Level'] = np.nan
-for i, time in enumerate(Tide_Time[:len(U)]):
-    idx = (all_data['Datetime'] == time)
-    if idx.any():
-        all_data.loc[idx, 'Rip_Current_Velocity'] = U[i]
-        all_data.loc[idx, 'Rip_Current_Level'] = Uh[i]
-
-# Ajouter les données de shore break en alignant sur l'index temporel
-all_data['ShoreBreak_Index'] = np.nan
-all_data['ShoreBreak_Level'] = np.nan
-for i, time in enumerate(Tide_Time[:len(ShoreBreak_Index)]):
-    idx = (all_data['Datetime'] == time)
-    if idx.any():
-        all_data.loc[idx, 'ShoreBreak_Index'] = ShoreBreak_Index[i]
-        all_data.loc[idx, 'ShoreBreak_Level'] = levels[i]
-
-# Exporter le CSV combiné
-all_data.to_csv('all_beach_hazard_data.csv', index=False)
-print("Toutes les données combinées exportées dans 'all_beach_hazard_data.csv'")
\ No newline at end of file
+        predictions_denormalized, pred_classes, sources = predictor(combined_data)
+        hazards = compute_hazards(combined_data, cache_dir)
+
+    # Les graphiques sont rendus en parallèle des exports, dans un autre processus
+    plots_future = None
+    if plots_dir:
+        plots_future = submit_plots(plots_dir, combined_data, predictions_denormalized, pred_classes, hazards)
+
+    export_results(combined_data, predictions_denormalized, pred_classes, hazards, output_dir,
+                   attendance_sources=sources, attendance_status=predictor.status)
+
+    if plots_future is not None:
+        plots_future.result()
+
+    return {
+        'combined_data': combined_data,
+        'attendance': predictions_denormalized,
+        'attendance_levels': pred_classes,
+        'attendance_sources': sources,
+        'attendance_status': predictor.status,
+        'hazards': hazards,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prévision de fréquentation et des risques de baignade (courant d'arrachement, shore break).")
+    parser.add_argument('--tide-csv', default=DEFAULT_TIDE_CSV, help="Fichier CSV de marée (sortie de plot_tide.py)")
+    parser.add_argument('--tide-harmonics', default=None, help="Constituantes harmoniques du site (tide_harmonics.py fit), remplacent --tide-csv")
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR, help="Répertoire du modèle XGBoost et de normalization_params.pkl")
+    parser.add_argument('--output-dir', default='.', help="Répertoire où écrire les CSV")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Répertoire des caches")
+    parser.add_argument('--no-cache', action='store_true', help="Désactiver les caches sur disque")
+    parser.add_argument('--api-base-url', default=None, help="Serveur de substitution pour les API Open-Meteo (ex. http://127.0.0.1:8000)")
+    parser.add_argument('--replay', action='store_true', help="Rejouer les réponses Open-Meteo archivées dans le cache, sans réseau")
+    parser.add_argument('--replay-issue', default=None, help="Créneau d'émission à rejouer (YYYYmmddHH UTC), le plus récent par défaut")
+    parser.add_argument('--attendance-service', default=None, help="URL du service de fréquentation (ex. http://127.0.0.1:8765), modèle local si absent")
+    parser.add_argument('--nthread', type=int, default=None, help="Nombre de threads de prédiction XGBoost (choix de XGBoost par défaut)")
+    parser.add_argument('--incremental', action='store_true', help="Ne recalculer que les pas de temps dont les entrées ont changé depuis la dernière exécution")
+    parser.add_argument('--plots-dir', default=None, help="Rendre les graphiques en PNG dans ce répertoire (processus de fond)")
+    parser.add_argument('--no-plots', action='store_true', help="Mode sans graphiques (par défaut si --plots-dir est absent)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_pipeline(tide_csv=args.tide_csv,
+                 model_dir=args.model_dir,
+                 output_dir=args.output_dir,
+                 cache_dir=None if args.no_cache else args.cache_dir,
+                 plots_dir=None if args.no_plots else args.plots_dir,
+                 api_base_url=args.api_base_url,
+                 replay=args.replay,
+                 replay_issue=args.replay_issue,
+                 tide_harmonics=args.tide_harmonics,
+                 incremental_mode=args.incremental,
+                 attendance_service=args.attendance_service,
+                 nthread=args.nthread)
+
+if __name__ == "__main__":
+    main()
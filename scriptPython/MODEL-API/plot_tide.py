@@ -10,6 +10,8 @@ import re
 import os
 import csv
 
+from tide_curve import cosine_interpolation
+
 def extraire_heures_minutes(heure_str):
     """Extraire les heures et minutes d'une chaîne au format 'HHhMM'"""
     match = re.match(r"(\d+)h(\d+)", heure_str)
@@ -26,6 +28,18 @@ def convertir_hauteur(hauteur_str):
         return float(f"{partie_entiere}.{partie_decimale}")
     return 0.0
 
+def grille_temporelle(temps_debut, temps_fin, intervalle_minutes=10, inclure_fin=False):
+    """
+    Grille de temps régulière (datetime64) de temps_debut à temps_fin exclu
+    (inclus si inclure_fin et que temps_fin tombe sur la grille).
+    """
+    debut = np.datetime64(temps_debut, 'us')
+    fin = np.datetime64(temps_fin, 'us')
+    pas = np.timedelta64(intervalle_minutes, 'm')
+    if inclure_fin:
+        fin = fin + np.timedelta64(1, 'us')
+    return np.arange(debut, fin, pas)
+
 def calculer_courbe_maree(temps_marees, hauteurs_marees, date_reference=None):
     """
     Calculer une courbe de marée continue à partir des points de pleine et basse mer.
@@ -48,64 +62,19 @@ def calculer_courbe_maree(temps_marees, hauteurs_marees, date_reference=None):
     temps_fin = date_reference + timedelta(hours=23, minutes=59)  # 23h59
     
     # Générer des points toutes les 10 minutes
-    temps_courbe = []
-    temps_courant = temps_debut
-    while temps_courant <= temps_fin:
-        temps_courbe.append(temps_courant)
-        temps_courant += timedelta(minutes=10)
-    
-    # Interpoler les hauteurs de marée
-    hauteurs_courbe = []
-    
-    for t in temps_courbe:
-        # Trouver entre quels points de marée nous sommes
-        if t < temps_marees[0]:
-            # Avant le premier point, on utilise une interpolation entre
-            # le dernier point de la veille et le premier point du jour
-            dernier_point = temps_marees[-1] - timedelta(days=1)
-            premier_point = temps_marees[0]
-            duree_totale = (premier_point - dernier_point).total_seconds()
-            position_relative = (t - dernier_point).total_seconds() / duree_totale
-            
-            hauteur_debut = hauteurs_marees[-1]
-            hauteur_fin = hauteurs_marees[0]
-            
-            # Interpolation sinusoïdale
-            hauteur = hauteur_debut + (hauteur_fin - hauteur_debut) * (1 - np.cos(np.pi * position_relative)) / 2
-            hauteurs_courbe.append(hauteur)
-            
-        elif t > temps_marees[-1]:
-            # Après le dernier point, on utilise une interpolation entre
-            # le dernier point du jour et le premier point du lendemain
-            dernier_point = temps_marees[-1]
-            premier_point = temps_marees[0] + timedelta(days=1)
-            duree_totale = (premier_point - dernier_point).total_seconds()
-            position_relative = (t - dernier_point).total_seconds() / duree_totale
-            
-            hauteur_debut = hauteurs_marees[-1]
-            hauteur_fin = hauteurs_marees[0]
-            
-            # Interpolation sinusoïdale
-            hauteur = hauteur_debut + (hauteur_fin - hauteur_debut) * (1 - np.cos(np.pi * position_relative)) / 2
-            hauteurs_courbe.append(hauteur)
-            
-        else:
-            # Entre deux points de marée
-            for i in range(len(temps_marees) - 1):
-                if temps_marees[i] <= t < temps_marees[i+1]:
-                    duree_totale = (temps_marees[i+1] - temps_marees[i]).total_seconds()
-                    position_relative = (t - temps_marees[i]).total_seconds() / duree_totale
-                    
-                    hauteur_debut = hauteurs_marees[i]
-                    hauteur_fin = hauteurs_marees[i+1]
-                    
-                    # Interpolation sinusoïdale (plus réaliste pour les marées)
-                    hauteur = hauteur_debut + (hauteur_fin - hauteur_debut) * (1 - np.cos(np.pi * position_relative)) / 2
-                    hauteurs_courbe.append(hauteur)
-                    break
-            else:
-                # Si on arrive ici, c'est qu'on est exactement sur le dernier point
-                hauteurs_courbe.append(hauteurs_marees[-1])
+    grille = grille_temporelle(temps_debut, temps_fin, 10, inclure_fin=True)
+    
+    # Avant le premier point, on interpole entre le dernier point de la veille
+    # et le premier point du jour; après le dernier point, entre le dernier point
+    # du jour et le premier point du lendemain
+    temps_etendus = [temps_marees[-1] - timedelta(days=1)] + list(temps_marees) + [temps_marees[0] + timedelta(days=1)]
+    hauteurs_etendues = [hauteurs_marees[-1]] + list(hauteurs_marees) + [hauteurs_marees[0]]
+    
+    # Interpolation sinusoïdale (plus réaliste pour les marées) sur toute la grille
+    hauteurs_courbe = cosine_interpolation(grille, np.array(temps_etendus, dtype='datetime64[us]'), hauteurs_etendues)
+    
+    temps_courbe = grille.astype(datetime).tolist()
+    hauteurs_courbe = hauteurs_courbe.tolist()
     
     return temps_courbe, hauteurs_courbe
 
@@ -193,40 +162,14 @@ def graphique_multi_jours(donnees_semaine, niveau_base=2.4, jours_a_afficher=3,
     temps_fin = date_reference + timedelta(days=jours_a_traiter, hours=0)
     
     # Générer des points toutes les 10 minutes sur toute la période
-    temps_courbe = []
-    temps_courant = temps_debut
-    while temps_courant < temps_fin:
-        temps_courbe.append(temps_courant)
-        temps_courant += timedelta(minutes=10)
-    
-    # Interpoler les hauteurs de marée
-    hauteurs_courbe = []
-    
-    for t in temps_courbe:
-        # Trouver entre quels points de marée nous sommes
-        if t < temps_marees_global[0]:
-            # Avant le premier point, extrapoler
-            hauteurs_courbe.append(hauteurs_marees_global[0])
-        elif t > temps_marees_global[-1]:
-            # Après le dernier point, extrapoler
-            hauteurs_courbe.append(hauteurs_marees_global[-1])
-        else:
-            # Entre deux points de marée
-            for i in range(len(temps_marees_global) - 1):
-                if temps_marees_global[i] <= t < temps_marees_global[i+1]:
-                    duree_totale = (temps_marees_global[i+1] - temps_marees_global[i]).total_seconds()
-                    position_relative = (t - temps_marees_global[i]).total_seconds() / duree_totale
-                    
-                    hauteur_debut = hauteurs_marees_global[i]
-                    hauteur_fin = hauteurs_marees_global[i+1]
-                    
-                    # Interpolation sinusoïdale (plus réaliste pour les marées)
-                    hauteur = hauteur_debut + (hauteur_fin - hauteur_debut) * (1 - np.cos(np.pi * position_relative)) / 2
-                    hauteurs_courbe.append(hauteur)
-                    break
-            else:
-                # Si on arrive ici, c'est qu'on est exactement sur le dernier point
-                hauteurs_courbe.append(hauteurs_marees_global[-1])
+    grille = grille_temporelle(temps_debut, temps_fin, 10)
+    
+    # Interpolation sinusoïdale (plus réaliste pour les marées) sur toute la grille,
+    # hauteur constante avant le premier et après le dernier point
+    hauteurs_courbe = cosine_interpolation(grille, np.array(temps_marees_global, dtype='datetime64[us]'),
+                                           hauteurs_marees_global)
+    temps_courbe = grille.astype(datetime).tolist()
+    hauteurs_courbe = hauteurs_courbe.tolist()
     
     # Transformer les hauteurs pour qu'elles soient relatives au niveau de base
     hauteurs_courbe_relatives = [h - niveau_base for h in hauteurs_courbe]
@@ -346,39 +289,14 @@ def calculer_courbe_maree_globale(donnees_semaine, niveau_base=2.4, intervalle_m
     temps_fin = date_reference + timedelta(days=nb_jours)
     
     # Générer des points à intervalles réguliers
-    temps_courbe = []
-    temps_courant = temps_debut
-    while temps_courant < temps_fin:
-        temps_courbe.append(temps_courant)
-        temps_courant += timedelta(minutes=intervalle_minutes)
-    
-    # Interpoler les hauteurs de marée
-    hauteurs_courbe = []
-    
-    for t in temps_courbe:
-        if t < temps_marees_global[0]:
-            # Avant le premier point, extrapoler
-            hauteurs_courbe.append(hauteurs_marees_global[0])
-        elif t > temps_marees_global[-1]:
-            # Après le dernier point, extrapoler
-            hauteurs_courbe.append(hauteurs_marees_global[-1])
-        else:
-            # Entre deux points de marée
-            for i in range(len(temps_marees_global) - 1):
-                if temps_marees_global[i] <= t < temps_marees_global[i+1]:
-                    duree_totale = (temps_marees_global[i+1] - temps_marees_global[i]).total_seconds()
-                    position_relative = (t - temps_marees_global[i]).total_seconds() / duree_totale
-                    
-                    hauteur_debut = hauteurs_marees_global[i]
-                    hauteur_fin = hauteurs_marees_global[i+1]
-                    
-                    # Interpolation sinusoïdale (plus réaliste pour les marées)
-                    hauteur = hauteur_debut + (hauteur_fin - hauteur_debut) * (1 - np.cos(np.pi * position_relative)) / 2
-                    hauteurs_courbe.append(hauteur)
-                    break
-            else:
-                # Si on arrive ici, c'est qu'on est exactement sur le dernier point
-                hauteurs_courbe.append(hauteurs_marees_global[-1])
+    grille = grille_temporelle(temps_debut, temps_fin, intervalle_minutes)
+    
+    # Interpoler les hauteurs de marée : chaque point de la grille est situé entre
+    # ses deux extrêmes encadrants par recherche dichotomique (np.searchsorted)
+    hauteurs_courbe = cosine_interpolation(grille, np.array(temps_marees_global, dtype='datetime64[us]'),
+                                           hauteurs_marees_global)
+    temps_courbe = grille.astype(datetime).tolist()
+    hauteurs_courbe = hauteurs_courbe.tolist()
     
     # Calculer les hauteurs relatives au niveau de base
     hauteurs_courbe_relatives = [h - niveau_base for h in hauteurs_courbe]
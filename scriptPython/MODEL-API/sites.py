@@ -0,0 +1,50 @@
+""" Registre des plages : coordonnées des prévisions et paramètres des modèles par site """
+
+import json
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SITES_FILE = os.path.join(BASE_DIR, 'sites.json')
+
+WAVE_URL_TEMPLATE = ('https://marine-api.open-meteo.com/v1/marine?latitude={lat}&longitude={lon}'
+                     '&hourly=wave_height,wave_direction,wave_period&timezone=auto')
+WEATHER_URL_TEMPLATE = ('https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}'
+                        '&hourly=temperature_2m,precipitation,cloud_cover,wind_speed_10m,wind_direction_10m'
+                        '&timezone=auto&wind_speed_unit=ms')
+
+
+def load_sites(path=DEFAULT_SITES_FILE, site_ids=None):
+    """
+    Charge le registre des plages.
+
+    Args:
+        path (str): Fichier JSON du registre
+        site_ids (list): Identifiants des sites à garder, tous si None
+
+    Returns:
+        dict: identifiant -> paramètres du site, les chemins relatifs
+        (tide_csv, tide_harmonics, model_dir) étant résolus par rapport au registre
+    """
+    with open(path, 'r') as f:
+        sites = json.load(f)
+
+    if site_ids:
+        unknown = [s for s in site_ids if s not in sites]
+        if unknown:
+            raise KeyError(f"Sites inconnus dans '{path}': {', '.join(unknown)}")
+        sites = {s: sites[s] for s in site_ids}
+
+    root = os.path.dirname(os.path.abspath(path))
+    for site in sites.values():
+        for key in ('tide_csv', 'tide_harmonics', 'model_dir'):
+            if site.get(key):
+                site[key] = os.path.join(root, site[key])
+    return sites
+
+
+def forecast_urls(site):
+    """URLs Open-Meteo (vagues, météo) d'un site."""
+    wave_lat, wave_lon = site['wave_point']
+    weather_lat, weather_lon = site['weather_point']
+    return (WAVE_URL_TEMPLATE.format(lat=wave_lat, lon=wave_lon),
+            WEATHER_URL_TEMPLATE.format(lat=weather_lat, lon=weather_lon))
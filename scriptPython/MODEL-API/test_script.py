@@ -0,0 +1,941 @@
+import copy
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import interp1d
+
+from forecast_fetch import ForecastCache, fetch_all, make_session, with_base_url
+from tide_curve import interpolate_tide
+from tide_harmonics import fit_harmonics, predict_tide, resolvable_constituents
+from columnar_export import MISSING_LEVEL, read_columnar, write_columnar
+from hazard_summary import daily_summary, hourly_summary
+import incremental
+from hazard_physics import (LarsonWaveRefractionAtBreaking, compute_refraction,
+                            dispersion_newton, dispersion_newton_batch, g,
+                            refraction_cache_key,
+                            rip_current_hazard, shore_break_hazard,
+                            shore_break_profile)
+
+
+def test_dispersion_newton_batch_matches_scalar():
+    """Le solveur vectorisé doit donner le même k que la version scalaire."""
+    precision = 1e-4
+    T = np.linspace(2.0, 20.0, 200)
+    d = np.linspace(1.0, 30.0, 200)
+
+    k_batch = dispersion_newton_batch(T, d, precision)
+    k_scalar = np.array([dispersion_newton(t, h, precision) for t, h in zip(T, d)])
+
+    assert k_batch.shape == T.shape
+    assert np.all(np.abs(k_batch - k_scalar) <= precision)
+
+
+def test_dispersion_newton_batch_scalar_depth_and_nan():
+    """Profondeur scalaire diffusée sur le tableau, NaN propagé sans bloquer les autres."""
+    T = np.array([8.0, np.nan, 12.0])
+    k = dispersion_newton_batch(T, 10)
+
+    assert np.isnan(k[1])
+    assert abs(k[0] - dispersion_newton(8.0, 10)) <= 1e-4
+    assert abs(k[2] - dispersion_newton(12.0, 10)) <= 1e-4
+
+
+def _larson_scalar(Hs0, Tp0, theta0, h0, gammab):
+    """Version de référence élément par élément (boucle d'origine)."""
+    if theta0 > 90:
+        return 0, 90, np.nan
+    if theta0 < -90:
+        return 0, -90, np.nan
+    k0 = dispersion_newton(Tp0, h0)
+    c0 = 2 * np.pi / (k0 * Tp0)
+    cg0 = c0 * (0.5 + k0 * h0 / np.sinh(2 * k0 * h0))
+    alpha = (c0 / np.sqrt(g * Hs0))**4 * c0 * gammab**2 / cg0
+    lambdaa = (np.cos(np.radians(theta0)) / alpha)**0.4
+    epsi = (np.sin(np.radians(theta0)))**2 * lambdaa
+    lambda_ = (1 + 0.1649 * epsi + 0.5948 * epsi**2 -
+               1.6787 * epsi**3 + 2.8573 * epsi**4) * lambdaa
+    hb = lambdaa * c0**2 / g
+    thetab = np.degrees(np.arcsin(np.sqrt(lambda_) * np.sin(np.radians(theta0))))
+    return hb * gammab, thetab, hb
+
+
+def test_larson_refraction_vectorized_matches_loop():
+    """Le modèle de Larson vectorisé reproduit la boucle d'origine, y compris |theta0| > 90."""
+    rng = np.random.default_rng(0)
+    Hs0 = rng.uniform(0.3, 4.0, 500)
+    Tp0 = rng.uniform(4.0, 16.0, 500)
+    theta0 = rng.uniform(-120.0, 120.0, 500)
+
+    Hsb, thetab, hb = LarsonWaveRefractionAtBreaking(Hs0, Tp0, theta0, 10, 0.7)
+    expected = np.array([_larson_scalar(*args, 10, 0.7) for args in zip(Hs0, Tp0, theta0)])
+
+    np.testing.assert_allclose(Hsb, expected[:, 0], rtol=1e-10)
+    np.testing.assert_allclose(thetab, expected[:, 1], rtol=1e-10)
+    np.testing.assert_allclose(hb, expected[:, 2], rtol=1e-10)
+
+
+def test_compute_refraction_cache(tmp_path):
+    """La réfraction partagée est relue depuis le cache disque pour les mêmes entrées."""
+    Hs0, Tp0, theta0 = np.array([1.0, 2.0]), np.array([8.0, 10.0]), np.array([5.0, 100.0])
+
+    first = compute_refraction(Hs0, Tp0, theta0, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.glob('refraction_*.npz'))) == 1
+
+    second = compute_refraction(Hs0, Tp0, theta0, cache_dir=str(tmp_path))
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+    compute_refraction(Hs0 + 0.1, Tp0, theta0, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.glob('refraction_*.npz'))) == 2
+
+
+def test_compute_refraction_cache_evicts_old_entries(tmp_path):
+    """Au-delà de max_entries, les entrées les moins récemment utilisées sont supprimées."""
+    Hs0, Tp0, theta0 = np.array([1.0, 2.0]), np.array([8.0, 10.0]), np.array([5.0, 100.0])
+    keys = [refraction_cache_key(Hs0 + i, Tp0, theta0, 10, 0.7) for i in range(4)]
+
+    for i in range(3):
+        compute_refraction(Hs0 + i, Tp0, theta0, cache_dir=str(tmp_path), max_entries=2)
+        path = tmp_path / f"refraction_{keys[i]}.npz"
+        os.utime(path, (1000 + i, 1000 + i))
+    assert sorted(p.name for p in tmp_path.glob('refraction_*.npz')) == sorted(f"refraction_{k}.npz" for k in keys[1:3])
+
+    # Une lecture rafraîchit l'entrée, c'est la plus ancienne non relue qui part
+    compute_refraction(Hs0 + 1, Tp0, theta0, cache_dir=str(tmp_path), max_entries=2)
+    compute_refraction(Hs0 + 3, Tp0, theta0, cache_dir=str(tmp_path), max_entries=2)
+    assert sorted(p.name for p in tmp_path.glob('refraction_*.npz')) == sorted(f"refraction_{keys[i]}.npz" for i in (1, 3))
+
+
+def test_rip_current_hazard_matches_loop():
+    """Le moteur courant d'arrachement reproduit la boucle scalaire sur toutes les lignes."""
+    rng = np.random.default_rng(1)
+    n = 300
+    eta = rng.uniform(-2.5, 2.5, n)
+    H0b = rng.uniform(0.0, 3.0, n)
+    gamma, z_bar, d = 0.23, -3.0, 6.5
+    thresholds = (0.3006, 0.9107, 1.3764, 1.8915)
+
+    U, Uh = rip_current_hazard(eta, None, None, None, gamma, z_bar, d, 284.1, thresholds, H0b=H0b)
+
+    for i in range(n):
+        h = eta[i] - z_bar
+        H0 = H0b[i]
+        eta_b = 0 if (h <= 0 or H0 <= gamma * h) else 0.16 * (H0 - gamma * h)**2 / H0
+        eta_c = 0 if ((h + d) <= 0 or H0 <= gamma * (h + d)) else 0.16 * (H0 - gamma * (h + d))**2 / H0
+        u = np.sqrt(2 * g * max(0, eta_b - eta_c))
+        assert np.isclose(U[i], u)
+        assert Uh[i] == sum(u >= s for s in thresholds)
+    assert not np.isnan(U).any()
+
+
+def test_shore_break_hazard_matches_interp1d_loop():
+    """La table pente/altitude + np.interp reproduit la boucle interp1d d'origine."""
+    rng = np.random.default_rng(2)
+    n = 300
+    eta = rng.uniform(-3.0, 3.0, n)
+    H0b = rng.uniform(0.2, 3.0, n)
+    Tp = rng.uniform(4.0, 16.0, n)
+    b, c, dx, gamma_s, Zl, e = -2.75, 0.3, 2.0, 0.4, -2, 2
+    thresholds = (1.7607, 2.9321, 5.1730, 8.6697)
+
+    index, levels = shore_break_hazard(eta, H0b, Tp, shore_break_profile(b, c, dx),
+                                       gamma_s, Zl, e, thresholds)
+
+    x = np.arange(0, 1000 + dx, dx)
+    z = 5 + b * x**c
+    slope_interp = interp1d(z[:-1], -np.diff(z) / dx, bounds_error=False, fill_value=np.nan)
+    for i in range(n):
+        L0 = g * Tp[i]**2 / (2 * np.pi)
+        if eta[i] < Zl:
+            expected = 0
+        else:
+            if eta[i] - H0b[i] / gamma_s > Zl:
+                Hbs = H0b[i]
+            else:
+                Hbs = H0b[i] - (1 / H0b[i]) * (H0b[i] - gamma_s * (eta[i] - Zl))**2
+            expected = slope_interp(eta[i]) / np.sqrt(Hbs / L0) * Hbs**e
+        np.testing.assert_allclose(index[i], expected, rtol=1e-9, atol=1e-12)
+    assert levels.dtype.kind == 'i' and levels.min() >= 0 and levels.max() <= 4
+
+
+class _StandInOpenMeteo(BaseHTTPRequestHandler):
+    """Serveur local de substitution : /v1/marine échoue une fois (503) puis répond."""
+    calls = []
+
+    def do_GET(self):
+        _StandInOpenMeteo.calls.append(self.path)
+        if self.path.startswith('/v1/marine') and _StandInOpenMeteo.calls.count(self.path) == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'path': self.path.split('?')[0]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fetch_all_stand_in_server_with_retry():
+    """Les deux flux sont téléchargés sur le serveur local, avec une nouvelle tentative après 503."""
+    server = HTTPServer(('127.0.0.1', 0), _StandInOpenMeteo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        urls = ['https://marine-api.open-meteo.com/v1/marine?latitude=44.4',
+                'https://api.open-meteo.com/v1/forecast?latitude=44.4']
+        data1, data2 = fetch_all(urls, session=make_session(backoff_factor=0), timeout=(1, 2),
+                                 base_url=base_url)
+    finally:
+        server.shutdown()
+
+    assert data1 == {'path': '/v1/marine'}
+    assert data2 == {'path': '/v1/forecast'}
+    assert _StandInOpenMeteo.calls.count('/v1/marine?latitude=44.4') == 2
+    assert with_base_url(urls[1], None) == urls[1]
+
+
+class _StandInWithETag(BaseHTTPRequestHandler):
+    """Serveur local qui gère If-None-Match (304 si la prévision n'a pas changé)."""
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            _StandInWithETag.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        _StandInWithETag.statuses.append(200)
+        body = json.dumps({'hourly': {'time': ['2025-05-01T00:00']}}).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_forecast_cache_fresh_revalidate_and_replay(tmp_path):
+    """Cache : réutilisation dans le créneau, revalidation 304 au créneau suivant, rejeu hors ligne."""
+    server = HTTPServer(('127.0.0.1', 0), _StandInWithETag)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/marine?latitude=44.4"
+    cache = ForecastCache(str(tmp_path))
+    session = make_session()
+    morning = datetime(2025, 5, 1, 7, tzinfo=timezone.utc)
+    noon = datetime(2025, 5, 1, 13, tzinfo=timezone.utc)
+    try:
+        first = cache.fetch_json(session, url, now=morning)
+        again = cache.fetch_json(session, url, now=morning)
+        later = cache.fetch_json(session, url, now=noon)
+    finally:
+        server.shutdown()
+
+    assert first == again == later
+    assert _StandInWithETag.statuses == [200, 304]
+    assert sorted(p.name.split('_')[1] for p in tmp_path.glob('*.json')) == ['2025050106.json', '2025050112.json']
+
+    replayed = ForecastCache(str(tmp_path), replay=True, issue='2025050106').fetch_json(None, url)
+    assert replayed == first
+
+
+def test_add_daily_means_single_pass():
+    """Moyennes journalières sur la fenêtre horaire, diffusées à toutes les heures du jour."""
+    from model_prediction import add_daily_means
+
+    times = pd.date_range('2025-05-01 00:00', '2025-05-02 23:00', freq='h')
+    df = pd.DataFrame({'Time': times, 'A': np.arange(len(times), dtype=float), 'B': 1.0})
+
+    out = add_daily_means(df, 'Time', ['A', 'B'], start_hour=10, end_hour=18)
+
+    assert list(out.columns) == ['Time', 'A', 'B', 'A_dm', 'B_dm']
+    assert (out.loc[out['Time'].dt.day == 1, 'A_dm'] == np.mean(np.arange(10, 18))).all()
+    assert (out.loc[out['Time'].dt.day == 2, 'A_dm'] == np.mean(np.arange(34, 42))).all()
+    assert (out['B_dm'] == 1.0).all()
+    assert 'A_dm' not in df.columns
+
+
+def _old_loop_join(all_data, Tide_Time, U, Uh, ShoreBreak_Index, levels):
+    """Alignement d'origine (boucle par pas de temps) des séries de risque sur all_data."""
+    all_data = all_data.copy()
+    all_data['Rip_Current_Velocity'] = np.nan
+    all_data['Rip_Current_Level'] = np.nan
+    for i, time in enumerate(Tide_Time[:len(U)]):
+        idx = (all_data['Datetime'] == time)
+        if idx.any():
+            all_data.loc[idx, 'Rip_Current_Velocity'] = U[i]
+            all_data.loc[idx, 'Rip_Current_Level'] = Uh[i]
+    all_data['ShoreBreak_Index'] = np.nan
+    all_data['ShoreBreak_Level'] = np.nan
+    for i, time in enumerate(Tide_Time[:len(ShoreBreak_Index)]):
+        idx = (all_data['Datetime'] == time)
+        if idx.any():
+            all_data.loc[idx, 'ShoreBreak_Index'] = ShoreBreak_Index[i]
+            all_data.loc[idx, 'ShoreBreak_Level'] = levels[i]
+    return all_data
+
+
+def test_export_results_join_matches_loop(tmp_path):
+    """CSV combiné identique à l'ancienne boucle, y compris pour les dates absentes d'un côté ou de l'autre."""
+    from model_prediction import export_results
+
+    rng = np.random.default_rng(5)
+    times = pd.date_range('2025-07-01 08:00', periods=30, freq='10min')
+    combined = pd.DataFrame({'Datetime': times, 'Hs': rng.uniform(0.5, 2, 30), 'Tp': rng.uniform(7, 12, 30),
+                             'Dir': rng.uniform(260, 310, 30), 'Eta': rng.uniform(-1, 1, 30)})
+    attendance = pd.Series(rng.uniform(0, 100, 30))
+    classes = pd.Series(rng.integers(0, 5, 30))
+
+    # Grille de marée : commence 4 pas avant, s'arrête 5 pas avant la fin, saute deux dates
+    tide = pd.date_range('2025-07-01 07:20', periods=29, freq='10min')
+    cases = {'partial': tide.delete([10, 17]), 'full': times}
+    for name, tide_time in cases.items():
+        n = len(tide_time)
+        hazards = {'Tide_Time': tide_time, 'U': rng.uniform(0, 1, n), 'Uh': rng.integers(0, 5, n),
+                   'ShoreBreak_Index': rng.uniform(0, 30, n), 'levels': rng.integers(0, 5, n)}
+        export_results(combined, attendance, classes, hazards, output_dir=str(tmp_path / name))
+
+        base = pd.DataFrame({
+            'Datetime': combined['Datetime'], 'Wave_Height': combined['Hs'], 'Wave_Period': combined['Tp'],
+            'Wave_Direction': combined['Dir'], 'Tide_Elevation': combined['Eta'],
+            'Beach_Attendance_Percent': attendance, 'Beach_Attendance_Level': classes,
+        })
+        expected = _old_loop_join(base, tide_time, hazards['U'], hazards['Uh'], hazards['ShoreBreak_Index'],
+                                  hazards['levels'])
+        assert (tmp_path / name / 'all_beach_hazard_data.csv').read_text() == expected.to_csv(index=False)
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _open_meteo_responses(start='2025-05-01 00:00', hours=48, seed=0):
+    """Réponses JSON Open-Meteo (vagues, météo) synthétiques, sur la période du CSV de marée du dépôt."""
+    rng = np.random.default_rng(seed)
+    times = [t.strftime('%Y-%m-%dT%H:%M') for t in pd.date_range(start, periods=hours, freq='h')]
+    wave = {'hourly': {'time': times, 'wave_height': list(rng.uniform(0.5, 2.5, hours)),
+                       'wave_direction': list(rng.uniform(260, 310, hours)),
+                       'wave_period': list(rng.uniform(7, 13, hours))}}
+    weather = {'hourly': {'time': times, 'temperature_2m': list(rng.uniform(15, 28, hours)),
+                          'precipitation': list(rng.exponential(0.05, hours)),
+                          'cloud_cover': list(rng.uniform(0, 100, hours)),
+                          'wind_speed_10m': list(rng.uniform(1, 10, hours)),
+                          'wind_direction_10m': list(rng.uniform(0, 360, hours))}}
+    return wave, weather
+
+
+def test_build_features_scaled_within_training_range(tmp_path):
+    """Day est le jour de la semaine (1 = lundi) : variables normalisées dans le domaine de l'entraînement."""
+    from model_prediction import Input_Vars, build_features, load_attendance_model, normalize_data
+    from tide_harmonics import write_tide_csv
+
+    tide_times = pd.date_range('2025-07-26', '2025-08-04', freq='10min')
+    write_tide_csv(tide_times, 2 * np.cos(2 * np.pi * np.arange(len(tide_times)) / 74.5), str(tmp_path / 'tide.csv'))
+    # Du dimanche 27 juillet au samedi 2 août
+    combined = build_features(*_open_meteo_responses('2025-07-27 00:00', 7 * 24), tide_csv=str(tmp_path / 'tide.csv'))
+    assert combined['Day'].iloc[0] == 7 and sorted(combined['Day'].unique()) == list(range(1, 8))
+
+    _, norm_params = load_attendance_model()
+    block = normalize_data(combined, Input_Vars, *norm_params['normalization'])
+    assert np.abs(block[:, Input_Vars.index('Day')]).max() < 2
+    assert np.abs(block).max() < 4
+
+
+def test_import_model_prediction_has_no_side_effects(tmp_path):
+    """Importer model_prediction ne télécharge rien et n'écrit aucun fichier."""
+    import subprocess
+    import sys
+
+    code = (
+        "import socket\n"
+        "def refuse(*args, **kwargs):\n"
+        "    raise AssertionError('accès réseau à l import')\n"
+        "socket.socket.connect = refuse\n"
+        "socket.create_connection = refuse\n"
+        "import model_prediction\n"
+    )
+    before = sorted(os.listdir(MODULE_DIR))
+    env = dict(os.environ, PYTHONPATH=MODULE_DIR, PYTHONDONTWRITEBYTECODE='1')
+    subprocess.run([sys.executable, '-c', code], cwd=str(tmp_path), env=env, check=True)
+    assert os.listdir(tmp_path) == []
+    assert sorted(os.listdir(MODULE_DIR)) == before
+
+
+def test_run_pipeline_writes_outputs_from_given_data(tmp_path):
+    """run_pipeline(data=...) sans réseau ni cache : tous les exports dans output_dir."""
+    from model_prediction import run_pipeline
+
+    results = run_pipeline(output_dir=str(tmp_path), cache_dir=None, data=_open_meteo_responses())
+
+    expected = {'beach_attendance_data.csv', 'rip_current_data.csv', 'shore_break_data.csv',
+                'all_beach_hazard_data.csv', 'beach_hazard_data.bin', 'attendance_status.json'}
+    expected |= {f"{name}_{period}.csv" for name in ('beach_attendance', 'rip_current', 'shore_break')
+                 for period in ('hourly', 'daily')}
+    assert {p.name for p in tmp_path.iterdir()} == expected
+
+    combined = pd.read_csv(tmp_path / 'all_beach_hazard_data.csv')
+    assert len(combined) == len(results['combined_data']) == 47 * 6 + 1
+    assert json.loads((tmp_path / 'attendance_status.json').read_text())['source'] == 'model'
+
+
+def test_run_pipeline_without_plots_never_imports_matplotlib(tmp_path):
+    """Sans plots_dir, matplotlib n'est jamais importé par le pipeline."""
+    import subprocess
+    import sys
+
+    (tmp_path / 'data.json').write_text(json.dumps(_open_meteo_responses()))
+    code = (
+        "import json, sys\n"
+        "from model_prediction import run_pipeline\n"
+        "data = json.load(open('data.json'))\n"
+        "run_pipeline(output_dir='out', cache_dir=None, data=tuple(data))\n"
+        "assert 'matplotlib' not in sys.modules, 'matplotlib importé'\n"
+    )
+    env = dict(os.environ, PYTHONPATH=MODULE_DIR)
+    subprocess.run([sys.executable, '-c', code], cwd=str(tmp_path), env=env, check=True, capture_output=True)
+    assert (tmp_path / 'out' / 'all_beach_hazard_data.csv').exists()
+
+
+def test_run_pipeline_surfaces_plot_worker_errors(tmp_path):
+    """Une erreur du processus de rendu des graphiques remonte de run_pipeline, après les exports."""
+    import pytest
+    from model_prediction import run_pipeline
+
+    plots_dir = tmp_path / 'plots'
+    plots_dir.write_text('fichier à la place du répertoire')
+    with pytest.raises(FileExistsError):
+        run_pipeline(output_dir=str(tmp_path / 'out'), cache_dir=None, plots_dir=str(plots_dir),
+                     data=_open_meteo_responses())
+    assert (tmp_path / 'out' / 'all_beach_hazard_data.csv').exists()
+
+
+def test_interpolate_tide_cubic_and_cosine():
+    """Spline cubique identique à pandas.interpolate, sinusoïde passant par les extrêmes."""
+    grid = pd.date_range('2025-05-01', periods=300, freq='10min')
+    event_times = grid[[5, 40, 80, 115, 150, 190, 230, 260]]
+    event_heights = np.array([0.3, 4.4, 0.5, 4.3, 0.6, 4.2, 0.4, 4.5])
+
+    expected = pd.Series(np.nan, index=grid)
+    expected[event_times] = event_heights
+    expected = expected.interpolate(method='cubic')
+    cubic = interpolate_tide(grid.values, event_times.values, event_heights, 'cubic')
+    np.testing.assert_allclose(cubic, expected.values, atol=1e-9)
+
+    cosine = interpolate_tide(grid.values, event_times.values, event_heights, 'cosine')
+    np.testing.assert_allclose(cosine[[5, 40, 80, 260]], event_heights[[0, 1, 2, 7]])
+    assert (cosine[:5] == event_heights[0]).all() and (cosine[260:] == event_heights[-1]).all()
+    assert np.isclose(cosine[60], (4.4 + 0.5) / 2)
+
+
+def test_calculer_courbe_maree_wraps_around_midnight():
+    """Avant le premier et après le dernier extrême, la courbe relie le jour à la veille et au lendemain."""
+    from datetime import timedelta
+    from plot_tide import calculer_courbe_maree
+
+    jour = datetime(2025, 7, 1)
+    temps = [jour + timedelta(hours=3, minutes=12), jour + timedelta(hours=9, minutes=30),
+             jour + timedelta(hours=15, minutes=40), jour + timedelta(hours=22)]
+    hauteurs = [4.1, 1.2, 4.3, 1.0]
+    temps_courbe, hauteurs_courbe = calculer_courbe_maree(temps, hauteurs, jour)
+
+    assert len(temps_courbe) == 144 and temps_courbe[0] == jour and isinstance(temps_courbe[-1], datetime)
+    assert np.isclose(hauteurs_courbe[temps_courbe.index(temps[2])], 4.3)
+    assert np.isclose(hauteurs_courbe[temps_courbe.index(temps[3])], 1.0)
+    # Minuit : 2h après la basse mer de la veille (22h00), sur les 5h12 qui la séparent de 3h12
+    position = 2 / 5.2
+    assert np.isclose(hauteurs_courbe[0], 1.0 + 3.1 * (1 - np.cos(np.pi * position)) / 2)
+
+
+def test_harmonic_fit_recovers_constituents():
+    """Ajustement sur 30 jours synthétiques : constituantes retrouvées et prédiction au-delà de la série."""
+    times = pd.date_range('2025-05-01', periods=30 * 144, freq='10min')
+    truth = {'z0': 0.1, 'constituents': {
+        'M2': {'speed': 28.9841042, 'amplitude': 1.3, 'phase': 120.0},
+        'S2': {'speed': 30.0, 'amplitude': 0.45, 'phase': 150.0},
+        'K1': {'speed': 15.0410686, 'amplitude': 0.07, 'phase': 60.0},
+        'O1': {'speed': 13.9430356, 'amplitude': 0.06, 'phase': 310.0},
+    }}
+    heights = predict_tide(truth, times.values)
+
+    fitted = fit_harmonics(times.values, heights, constituents=('M2', 'S2', 'K1', 'O1'), timezone=None)
+    assert np.isclose(fitted['z0'], 0.1) and fitted['rms_residual'] < 1e-9
+    for name, c in truth['constituents'].items():
+        assert np.isclose(fitted['constituents'][name]['amplitude'], c['amplitude'])
+        assert np.isclose(fitted['constituents'][name]['phase'], c['phase'])
+
+    later = pd.date_range('2025-08-01', periods=1000, freq='10min')
+    np.testing.assert_allclose(predict_tide(fitted, later.values), predict_tide(truth, later.values), atol=1e-9)
+
+    # Sur 7 jours, M2 et S2 (resp. K1 et O1) ne sont pas séparables
+    assert resolvable_constituents(('M2', 'S2', 'K1', 'O1'), 7 * 24) == ['M2', 'K1']
+
+
+def test_harmonic_fit_across_daylight_saving_change():
+    """Série en heure légale à cheval sur le passage à l'heure d'été : phases ajustées en UTC, sans biais."""
+    truth = {'z0': 0.0, 'timezone': 'UTC', 'constituents': {
+        'M2': {'speed': 28.9841042, 'amplitude': 1.3, 'phase': 120.0},
+        'S2': {'speed': 30.0, 'amplitude': 0.45, 'phase': 150.0},
+    }}
+    utc = pd.date_range('2025-03-15', periods=30 * 144, freq='10min', tz='UTC')
+    local = utc.tz_convert('Europe/Paris').tz_localize(None)
+    heights = predict_tide(truth, utc)
+
+    fitted = fit_harmonics(local.values, heights, constituents=('M2', 'S2'))
+    assert fitted['timezone'] == 'Europe/Paris' and fitted['rms_residual'] < 1e-9
+    for name, c in truth['constituents'].items():
+        assert np.isclose(fitted['constituents'][name]['phase'], c['phase'])
+
+    # Temps naïfs pris comme UTC : l'heure de décalage biaise l'ajustement
+    naive = fit_harmonics(local.values, heights, constituents=('M2', 'S2'), timezone=None)
+    assert naive['rms_residual'] > 0.1
+
+    # Prédiction sur une grille locale : mêmes hauteurs qu'aux instants UTC correspondants
+    grid = pd.date_range('2025-10-25', '2025-10-27', freq='10min')
+    expected = predict_tide(truth, grid.tz_localize('Europe/Paris', ambiguous=np.zeros(len(grid), dtype=bool)))
+    np.testing.assert_allclose(predict_tide(fitted, grid.values), expected, atol=1e-9)
+
+
+def test_columnar_export_round_trip(tmp_path):
+    """Séries float32 / uint8 relues à l'identique, grille régulière ou non."""
+    times = pd.date_range('2025-07-01', periods=50, freq='10min')
+    velocity = np.linspace(0, 1.2, 50)
+    levels = np.r_[np.nan, np.arange(49) % 5]
+    series = {'Rip_Current_Velocity': (velocity, 'float32'), 'Rip_Current_Level': (levels, 'uint8')}
+
+    path = str(tmp_path / 'beach_hazard_data.bin')
+    size = write_columnar(path, times.values, series)
+    assert size == len(open(path, 'rb').read()) and size % 4 == 0
+
+    read_times, read_series = read_columnar(path)
+    assert (read_times == times).all()
+    np.testing.assert_allclose(read_series['Rip_Current_Velocity'], velocity, rtol=1e-6)
+    np.testing.assert_array_equal(read_series['Rip_Current_Level'], levels)
+    header_size = int.from_bytes(open(path, 'rb').read()[4:8], 'little')
+    assert json.loads(open(path, 'rb').read()[8:8 + header_size])['missing_level'] == MISSING_LEVEL
+
+    # Trous dans la grille (lignes supprimées par dropna) : écarts en minutes
+    gappy = times.delete([10, 11, 30])
+    write_columnar(path, gappy.values, {'Rip_Current_Velocity': (np.delete(velocity, [10, 11, 30]), 'float32')})
+    read_times, read_series = read_columnar(path)
+    assert (read_times == gappy).all() and list(read_series) == ['Rip_Current_Velocity']
+
+
+def test_hourly_and_daily_summaries():
+    """Moyenne, max et niveau dominant par heure; niveau maximal et première heure atteinte par jour."""
+    times = pd.date_range('2025-07-01 22:00', periods=18, freq='10min')
+    values = np.array([0.1, 0.2, 0.9, 1.0, 0.3, 0.2,
+                       0.5, 0.5, 0.6, 0.6, 0.7, 0.4,
+                       np.nan, np.nan, np.nan, np.nan, np.nan, np.nan])
+    levels = np.array([0, 0, 2, 2, 1, 0,
+                       1, 1, 1, 2, 2, 2,
+                       np.nan, np.nan, np.nan, np.nan, np.nan, np.nan])
+
+    hourly = hourly_summary(times, values, levels)
+    assert list(hourly['Datetime']) == list(pd.date_range('2025-07-01 22:00', periods=3, freq='h'))
+    np.testing.assert_allclose(hourly['Mean'][:2], [values[:6].mean(), values[6:12].mean()])
+    np.testing.assert_allclose(hourly['Max'][:2], [1.0, 0.7])
+    # 22h : trois 0 contre deux 2; 23h : égalité trois 1 / trois 2, le plus élevé l'emporte
+    assert list(hourly['Dominant_Level'][:2]) == [0, 2]
+    assert hourly['Mean'].isna()[2] and hourly['Dominant_Level'].isna()[2]
+
+    # Moyennes exactement à .5 : arrondi au demi supérieur (Math.round du client), niveau inférieur pair ou impair
+    half = hourly_summary(pd.date_range('2025-07-01 10:00', periods=12, freq='10min'), np.zeros(12),
+                          np.array([2, 2, 2, 3, 3, 3, 0, 0, 0, 1, 1, 1]))
+    assert list(half['Mean_Level']) == [3, 1] and half['Mean_Level'].dtype == 'Int64'
+
+    daily = daily_summary(times, values, levels)
+    assert daily['Peak_Level'][0] == 2 and daily['Peak_Level'].isna()[1]
+    assert daily['Peak_Time'][0] == '22:20' and np.isclose(daily['Max'][0], 1.0)
+
+
+def test_incremental_changed_rows_and_splice(tmp_path):
+    """Seules les lignes nouvelles ou modifiées sont recalculées, les autres reprises de l'état."""
+    times = pd.date_range('2025-07-01', periods=6, freq='10min')
+    inputs = pd.DataFrame({'Datetime': times, 'Hs': [1.0, 1.1, 1.2, 1.3, 1.4, 1.5]})
+    fingerprints = incremental.row_fingerprints(inputs, ['Datetime', 'Hs'])
+    changed = incremental.changed_rows(times.values, fingerprints, None)
+    rows = incremental.splice(times.values, fingerprints, changed, {'U': inputs['Hs'] * 2}, None, ['U'])
+    path = str(tmp_path / 'state.pkl')
+    incremental.save_state(path, 'key', rows)
+    assert incremental.load_state(path, 'other key') is None
+
+    # Nouvelle exécution : décalée d'un pas, avec une valeur modifiée
+    later = pd.date_range('2025-07-01 00:10', periods=6, freq='10min')
+    inputs = pd.DataFrame({'Datetime': later, 'Hs': [1.1, 1.2, 9.9, 1.4, 1.5, 1.6]})
+    fingerprints = incremental.row_fingerprints(inputs, ['Datetime', 'Hs'])
+    previous = incremental.load_state(path, 'key')
+    changed = incremental.changed_rows(later.values, fingerprints, previous)
+    assert list(changed) == [False, False, True, False, False, True]
+
+    rows = incremental.splice(later.values, fingerprints, changed, {'U': inputs['Hs'][changed] * 2}, previous, ['U'])
+    np.testing.assert_allclose(rows['U'], inputs['Hs'] * 2)
+
+
+def test_site_registry_matches_biscarrosse_defaults():
+    """Le site biscarrosse du registre reprend les URLs et paramètres de model_prediction."""
+    import model_prediction as mp
+    from sites import forecast_urls, load_sites
+
+    site = load_sites(site_ids=['biscarrosse'])['biscarrosse']
+    assert forecast_urls(site) == (mp.URL_GET_WAVE, mp.URL_GET_WEATHER)
+    assert site['attendance'] == {'max_crowd': mp.max_crowd, 'thresholds': [mp.S1, mp.S2, mp.S3, mp.S4]}
+    assert site['rip_current'] == {'gamma': mp.gamma, 'z_bar': mp.z_bar, 'd': mp.d, 'theta_c': mp.theta_c,
+                                   'thresholds': [mp.SR1, mp.SR2, mp.SR3, mp.SR4]}
+    assert site['shore_break'] == {'gamma_s': mp.gamma_s, 'b': mp.b, 'c': mp.c, 'Zl': mp.Zl, 'e': mp.e,
+                                   'dx': mp.dx, 'thresholds': [mp.SS1, mp.SS2, mp.SS3, mp.SS4]}
+
+
+def test_hazards_from_arrays_matches_per_site():
+    """Physique empilée (site x temps) identique au calcul site par site, longueurs et paramètres différents."""
+    from batch_forecast import hazards_from_arrays
+    from sites import load_sites
+
+    rng = np.random.default_rng(3)
+    site_a = load_sites()['biscarrosse']
+    site_b = copy.deepcopy(site_a)
+    site_b['rip_current'].update(theta_c=270.0, z_bar=-2.5, thresholds=[0.2, 0.6, 1.0, 1.5])
+    site_b['shore_break'].update(b=-2.5, c=0.32, Zl=-1.5, thresholds=[1.0, 2.0, 4.0, 7.0])
+
+    frames = []
+    for n in (40, 25):
+        frames.append(pd.DataFrame({
+            'Datetime': pd.date_range('2025-07-01', periods=n, freq='10min'),
+            'Hs': rng.uniform(0.3, 3.0, n), 'Tp': rng.uniform(6, 14, n),
+            'Dir': rng.uniform(250, 320, n), 'Eta': rng.uniform(-2.5, 2.0, n)}))
+
+    # Lignes complétées par des NaN jusqu'à la plus longue, comme dans forecast_rows
+    stacked = []
+    for column in ('Hs', 'Tp', 'Dir', 'Eta'):
+        values = np.full((2, 40), np.nan)
+        for i, frame in enumerate(frames):
+            values[i, :len(frame)] = frame[column]
+        stacked.append(values)
+    U_all, Uh_all, index_all, levels_all = hazards_from_arrays(*stacked, [site_a, site_b], cache_dir=None)
+
+    for i, (frame, site) in enumerate(zip(frames, [site_a, site_b])):
+        n = len(frame)
+        result = {'U': U_all[i, :n], 'Uh': Uh_all[i, :n], 'ShoreBreak_Index': index_all[i, :n],
+                  'levels': levels_all[i, :n]}
+        rip, sb = site['rip_current'], site['shore_break']
+        H0b, _, _ = compute_refraction(frame['Hs'].values, frame['Tp'].values, frame['Dir'].values - rip['theta_c'])
+        U, Uh = rip_current_hazard(frame['Eta'].values, frame['Hs'].values, frame['Tp'].values, frame['Dir'].values,
+                                   rip['gamma'], rip['z_bar'], rip['d'], rip['theta_c'], rip['thresholds'], H0b=H0b)
+        index, levels = shore_break_hazard(frame['Eta'].values, H0b, frame['Tp'].values,
+                                           shore_break_profile(sb['b'], sb['c'], sb['dx']),
+                                           sb['gamma_s'], sb['Zl'], sb['e'], sb['thresholds'])
+        np.testing.assert_allclose(result['U'], U, rtol=1e-12)
+        np.testing.assert_array_equal(result['Uh'], Uh)
+        np.testing.assert_allclose(result['ShoreBreak_Index'], index, rtol=1e-12, equal_nan=True)
+        np.testing.assert_array_equal(result['levels'], levels)
+
+
+def test_forecast_rows_process_pool_matches_in_process(tmp_path):
+    """Lots répartis sur un pool de processus : mêmes résultats que dans le processus courant."""
+    from batch_forecast import forecast_rows
+    from model_prediction import Input_Vars
+    from sites import load_sites
+
+    rng = np.random.default_rng(5)
+    site = load_sites()['biscarrosse']
+    frames = []
+    for n in (30, 18, 24):
+        times = pd.date_range('2025-07-01 06:00', periods=n, freq='30min')
+        frame = pd.DataFrame({v: rng.uniform(0, 20, n) for v in Input_Vars}, index=times)
+        frame['Hour'] = times.hour + times.minute / 60
+        frame['Datetime'] = times
+        frame[['Hs', 'Tp', 'Dir', 'Eta']] = np.column_stack([rng.uniform(0.3, 3, n), rng.uniform(6, 14, n),
+                                                             rng.uniform(250, 320, n), rng.uniform(-2, 2, n)])
+        frames.append(frame)
+
+    serial = forecast_rows(frames, [site] * 3, workers=1, cache_dir=None)
+    pooled = forecast_rows(frames, [site] * 3, workers=2, cache_dir=None)
+    for (a_att, a_haz), (b_att, b_haz) in zip(zip(*serial), zip(*pooled)):
+        pd.testing.assert_series_equal(a_att[0], b_att[0])
+        pd.testing.assert_series_equal(a_att[1], b_att[1])
+        assert a_att[3]['source'] == b_att[3]['source'] == 'model' and a_att[3]['rows'] == len(a_att[0])
+        for key in ('U', 'Uh', 'ShoreBreak_Index', 'levels'):
+            np.testing.assert_array_equal(a_haz[key], b_haz[key])
+    assert len(serial[1][1]['U']) == 18 and serial[0][1][0].index.equals(frames[1].index)
+
+    # Avec le cache : dernières prédictions de repli et vérification du modèle conservées par site
+    forecast_rows(frames[:2], [site] * 2, workers=2, cache_dir=str(tmp_path), site_ids=['a', 'b'])
+    assert sorted(p.name for p in (tmp_path / 'attendance').iterdir()) == ['last_predictions_a.pkl',
+                                                                           'last_predictions_b.pkl']
+    assert (tmp_path / 'model_health.json').exists()
+
+
+def test_ensemble_members_and_level_probabilities():
+    """Membre 0 = contrôle, n_members membres Monte Carlo, probabilités des niveaux sommant à 1."""
+    from ensemble_forecast import ensemble_hazards, ensemble_inputs, level_probabilities, monte_carlo_members
+    from sites import load_sites
+
+    rng = np.random.default_rng(11)
+    n = 36
+    times = pd.date_range('2025-07-01', periods=n, freq='10min')
+    combined = pd.DataFrame({'Datetime': times, 'Hs': rng.uniform(0.5, 2.5, n), 'Tp': rng.uniform(7, 13, n),
+                             'Dir': rng.uniform(260, 310, n), 'Eta': rng.uniform(-1.5, 1.5, n)})
+
+    members = monte_carlo_members(combined, 20, seed=0)
+    assert members['Hs'].shape == (20, n) and (members['Hs'] > 0).all()
+    np.testing.assert_array_equal(members['Dir'][0], combined['Dir'])
+
+    site = load_sites()['biscarrosse']
+    serial = ensemble_hazards(members, site, workers=1)
+    pooled = ensemble_hazards(members, site, workers=2)
+    for a, b in zip(serial, pooled):
+        np.testing.assert_array_equal(a, b)
+    probabilities = level_probabilities(serial[1])
+    assert probabilities.shape == (5, n)
+    np.testing.assert_allclose(probabilities.sum(axis=0), 1)
+    np.testing.assert_allclose(probabilities[:, 0], [(serial[1][:, 0] == k).mean() for k in range(5)])
+
+    # Ensemble Monte Carlo seul : n_members membres, reproductibles à graine fixée
+    members = ensemble_inputs(combined, n_members=7, seed=0)
+    assert all(members[var].shape == (7, n) for var in ('Hs', 'Tp', 'Dir', 'Eta'))
+    np.testing.assert_array_equal(members['Hs'], monte_carlo_members(combined, 7, seed=0)['Hs'])
+
+
+def test_attendance_service_matches_local_prediction():
+    """Service de fréquentation (modèle gardé en mémoire) : mêmes prédictions que predict_attendance."""
+    from attendance_service import AttendanceClient, serve
+    from model_prediction import Input_Vars, load_attendance_model, predict_attendance
+
+    rng = np.random.default_rng(13)
+    times = pd.date_range('2025-07-01 06:00', periods=40, freq='30min')
+    frame = pd.DataFrame({v: rng.uniform(0, 20, len(times)) for v in Input_Vars}, index=times)
+    frame['Hour'] = times.hour + times.minute / 60
+    frame['Datetime'] = times
+
+    server = serve('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = AttendanceClient(f"http://127.0.0.1:{server.server_port}")
+        remote = client.predict(frame)
+        health = client.health()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    expected = predict_attendance(frame, *load_attendance_model())
+    pd.testing.assert_series_equal(remote[0], expected[0], check_names=False)
+    pd.testing.assert_series_equal(remote[1], expected[1], check_names=False, check_dtype=False)
+    assert health['requests'] == 1 and health['input_vars'] == list(Input_Vars)
+
+
+def test_attendance_service_unexpected_payload_returns_json_error():
+    """Erreur inattendue du service (JSON qui n'est pas un objet) : réponse 500 JSON, service toujours disponible."""
+    import requests
+    from attendance_service import serve
+
+    server = serve('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        response = requests.post(f"{url}/predict", data=json.dumps([1, 2]), timeout=10)
+        health = requests.get(f"{url}/health", timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response.status_code == 500 and "Erreur interne" in response.json()['error']
+    assert health.status_code == 200
+
+
+def test_normalize_data_uses_training_parameters():
+    """Bloc float32 normalisé avec X_mean/X_std du modèle, 0 pour une variable manquante."""
+    from model_prediction import Input_Vars, load_attendance_model, normalization_vectors, normalize_data
+
+    _, norm_params = load_attendance_model()
+    mean, std = normalization_vectors(norm_params)
+    np.testing.assert_allclose(mean, norm_params['X_mean'], rtol=1e-6)
+
+    rng = np.random.default_rng(17)
+    frame = pd.DataFrame({v: rng.uniform(0, 30, 12) for v in Input_Vars})
+    block = normalize_data(frame, Input_Vars, mean, std)
+    assert block.dtype == np.float32 and block.flags['C_CONTIGUOUS']
+    expected = (frame[Input_Vars].to_numpy() - norm_params['X_mean']) / norm_params['X_std']
+    np.testing.assert_allclose(block, expected, rtol=1e-5, atol=1e-5)
+
+    partial = normalize_data(frame.drop(columns='T_dm'), Input_Vars, mean, std)
+    assert (partial[:, Input_Vars.index('T_dm')] == 0).all()
+    np.testing.assert_array_equal(np.delete(partial, Input_Vars.index('T_dm'), axis=1),
+                                  np.delete(block, Input_Vars.index('T_dm'), axis=1))
+
+
+def test_benchmark_inplace_predict_matches_dmatrix():
+    """Banc d'essai : inplace_predict donne les mêmes prédictions que DMatrix (vérifié par benchmark)."""
+    from benchmark_attendance import benchmark
+    from model_prediction import load_attendance_model
+
+    model, norm_params = load_attendance_model(nthread=1)
+    results = benchmark(model, norm_params, horizons=(1, 2), repeat=1)
+    assert results['Rows'].tolist() == [144, 288]
+    assert (results[['Build_ms', 'DMatrix_ms', 'Inplace_ms']] > 0).all().all()
+
+
+def test_attendance_predictor_falls_back_to_cache_and_climatology(tmp_path):
+    """Modèle modifié : repli sur les dernières prédictions puis la climatologie, sources indiquées."""
+    import shutil
+    from attendance_lookup import LOOKUP_FILE
+    from model_prediction import DEFAULT_MODEL_DIR, AttendancePredictor, Input_Vars, model_filename
+
+    model_dir = tmp_path / 'Models'
+    shutil.copytree(DEFAULT_MODEL_DIR, model_dir)
+    (model_dir / LOOKUP_FILE).unlink()
+    cache_dir = tmp_path / 'Cache'
+    rng = np.random.default_rng(19)
+    times = pd.date_range('2025-07-01', periods=288, freq='10min')
+    frame = pd.DataFrame({v: rng.uniform(0, 20, len(times)) for v in Input_Vars})
+    frame['Datetime'] = times
+
+    healthy = AttendancePredictor(str(model_dir), cache_dir=str(cache_dir))
+    expected, _, sources = healthy(frame.iloc[:144])
+    assert (sources == 0).all() and healthy.status['source'] == 'model' and healthy.status['latency_ms'] > 0
+    assert (cache_dir / 'model_health.json').exists()
+
+    with open(model_dir / model_filename, 'a') as f:
+        f.write(' ')
+    broken = AttendancePredictor(str(model_dir), cache_dir=str(cache_dir))
+    assert 'manifeste' in broken.status['errors'][0]
+    predictions, classes, sources = broken(frame)
+    assert (sources[:144] == 1).all() and (sources[144:] == 2).all()
+    assert broken.status['source'] == 'cache+climatology'
+    pd.testing.assert_series_equal(predictions.iloc[:144], expected)
+    assert predictions.iloc[144:].notna().sum() == 13 * 6
+    pd.testing.assert_series_equal(broken(frame)[0], predictions)
+    assert len(broken.status['errors']) == 1
+
+    # Prédicteur partagé entre sites (batch) : dernières prédictions propres à chaque site
+    _, _, sources = broken(frame, site_id='autre')
+    assert (sources == 2).all() and broken.status['source'] == 'climatology'
+
+
+def test_attendance_lookup_interpolates_model_and_serves_without_xgboost(monkeypatch):
+    """Table précalculée : exacte aux nœuds, linéaire entre eux, utilisée en repli sans xgboost."""
+    import model_prediction
+    from attendance_lookup import build_lookup, lookup_attendance
+    from model_prediction import AttendancePredictor, Input_Vars, denormalize_target, load_attendance_model, normalize_data
+
+    model, norm_params = load_attendance_model()
+    axes = {'RR1_dm': [0.0, 0.2], 'T_dm': [20.0, 26.0, 32.0], 'FF_dm': [2.0, 6.0], 'DD_dm': [200.0, 300.0],
+            'INS_dm': [10.0, 50.0], 'Day': [1, 7], 'Month': [7, 8], 'Hour': [10.0, 14.0, 18.0]}
+    lookup = build_lookup(model, norm_params, axes)
+    assert lookup['values'].shape == (2, 3, 2, 2, 2, 2, 2, 3)
+
+    def model_attendance(frame):
+        block = normalize_data(frame, Input_Vars, *norm_params['normalization'])
+        return np.clip(denormalize_target(model.inplace_predict(block), norm_params['y_mean'], norm_params['y_std']), 0, None)
+
+    nodes = pd.DataFrame({'RR1_dm': [0.0, 0.2], 'T_dm': [26.0, 32.0], 'FF_dm': [2.0, 6.0], 'DD_dm': [300.0, 200.0],
+                          'INS_dm': [50.0, 10.0], 'Day': [7, 1], 'Month': [8, 7], 'Hour': [14.0, 18.0]})
+    np.testing.assert_allclose(lookup_attendance(lookup, nodes), model_attendance(nodes), rtol=1e-6)
+    between = nodes.iloc[[0]].assign(Hour=15.0)
+    edges = pd.concat([nodes.iloc[[0]], nodes.iloc[[0]].assign(Hour=18.0)])
+    np.testing.assert_allclose(lookup_attendance(lookup, between), 0.75 * model_attendance(edges)[0] +
+                               0.25 * model_attendance(edges)[1], rtol=1e-6)
+
+    # Sans axe, Day et Month sont fixés à leur moyenne d'entraînement
+    calendar_free = build_lookup(model, norm_params, {k: v for k, v in axes.items() if k not in ('Day', 'Month')})
+    assert calendar_free['values'].shape == (2, 3, 2, 2, 2, 3) and set(calendar_free['fixed']) == {'Day', 'Month'}
+    np.testing.assert_allclose(lookup_attendance(calendar_free, nodes),
+                               model_attendance(nodes.assign(**calendar_free['fixed'])), rtol=1e-6)
+
+    monkeypatch.setattr(model_prediction, 'xgb', None)
+    times = pd.date_range('2025-07-14', periods=144, freq='10min')
+    frame = pd.DataFrame({v: nodes.iloc[0][v] for v in Input_Vars}, index=times)
+    frame['Datetime'] = times
+    predictor = AttendancePredictor()
+    predictions, _, sources = predictor(frame)
+    assert "xgboost" in predictor.status['errors'][0] and predictor.status['source'] == 'lookup'
+    assert (sources == 3).all() and predictions.notna().sum() == 13 * 6
+
+
+def test_attendance_lookup_report_without_table(tmp_path):
+    """Rapport demandé sans table : arrêt avec un message invitant à lancer build."""
+    import pytest
+    from attendance_lookup import main
+
+    with pytest.raises(SystemExit, match="attendance_lookup.py build"):
+        main(['report', '--model-dir', str(tmp_path)])
+
+
+def test_incremental_run_keeps_unchanged_rows_in_fallback_cache(tmp_path):
+    """Mode incrémental : les dernières prédictions gardent les pas de temps non recalculés."""
+    import shutil
+    from attendance_lookup import LOOKUP_FILE
+    from model_prediction import (DEFAULT_MODEL_DIR, AttendancePredictor, Input_Vars, incremental_forecast,
+                                  model_filename)
+
+    model_dir = tmp_path / 'Models'
+    shutil.copytree(DEFAULT_MODEL_DIR, model_dir)
+    (model_dir / LOOKUP_FILE).unlink()
+    cache_dir = str(tmp_path / 'Cache')
+    rng = np.random.default_rng(23)
+    times = pd.date_range('2025-07-01 08:00', periods=60, freq='10min')
+    frame = pd.DataFrame({v: rng.uniform(0, 20, len(times)) for v in Input_Vars}, index=times)
+    frame['Datetime'] = times
+    frame[['Hs', 'Tp', 'Dir', 'Eta']] = np.column_stack([rng.uniform(0.3, 3, 60), rng.uniform(6, 14, 60),
+                                                         rng.uniform(250, 320, 60), rng.uniform(-2, 2, 60)])
+
+    predictor = AttendancePredictor(str(model_dir), cache_dir=cache_dir)
+    incremental_forecast(frame, predictor, Input_Vars, str(model_dir), cache_dir)
+    frame.iloc[10, frame.columns.get_loc('T_dm')] += 1
+    expected = incremental_forecast(frame, predictor, Input_Vars, str(model_dir), cache_dir)[0]
+    assert predictor.status['rows'] == 60 and predictor.status['source'] == 'model'
+
+    with open(model_dir / model_filename, 'a') as f:
+        f.write(' ')
+    predictions, _, sources = AttendancePredictor(str(model_dir), cache_dir=cache_dir)(frame)
+    assert (sources == 1).all()
+    pd.testing.assert_series_equal(predictions, expected)
+
+
+def test_incremental_run_with_missing_model_falls_back(tmp_path):
+    """Mode incrémental sans fichier du modèle : pas d'arrêt, repli sur la table puis recalcul au retour du modèle."""
+    import shutil
+    from model_prediction import (DEFAULT_MODEL_DIR, AttendancePredictor, Input_Vars, incremental_forecast,
+                                  model_filename)
+
+    model_dir = tmp_path / 'Models'
+    shutil.copytree(DEFAULT_MODEL_DIR, model_dir)
+    (model_dir / model_filename).rename(tmp_path / model_filename)
+    cache_dir = str(tmp_path / 'Cache')
+    times = pd.date_range('2025-07-01 08:00', periods=30, freq='10min')
+    frame = pd.DataFrame({v: 10.0 for v in Input_Vars}, index=times)
+    frame['Datetime'] = times
+    frame[['Hs', 'Tp', 'Dir', 'Eta']] = [1.5, 10.0, 290.0, 0.5]
+
+    sources = incremental_forecast(frame, AttendancePredictor(str(model_dir), cache_dir=cache_dir), Input_Vars,
+                                   str(model_dir), cache_dir)[2]
+    assert (sources == 3).all()
+
+    (tmp_path / model_filename).rename(model_dir / model_filename)
+    sources = incremental_forecast(frame, AttendancePredictor(str(model_dir), cache_dir=cache_dir), Input_Vars,
+                                   str(model_dir), cache_dir)[2]
+    assert (sources == 0).all()
+
+
+def test_incremental_rerun_without_changes_reports_model_source(tmp_path, capsys):
+    """Relance incrémentale sans changement : l'état publié décrit toute la série, issue du modèle."""
+    from model_prediction import run_pipeline
+
+    data = _open_meteo_responses()
+    for _ in range(2):
+        results = run_pipeline(output_dir=str(tmp_path / 'out'), cache_dir=str(tmp_path / 'cache'),
+                               data=copy.deepcopy(data), incremental_mode=True)
+    out = capsys.readouterr().out
+    assert "Mode incrémental: 0 pas de temps sur" in out and "ATTENTION" not in out
+
+    status = json.loads((tmp_path / 'out' / 'attendance_status.json').read_text())
+    assert status['source'] == 'model' and status['rows'] == len(results['combined_data'])
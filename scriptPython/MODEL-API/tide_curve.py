@@ -0,0 +1,71 @@
+""" Courbe de marée continue à partir des points de pleine et basse mer """
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+
+def _as_float(t):
+    """Temps (datetime64 ou numériques) convertis en flottants comparables."""
+    t = np.asarray(t)
+    if np.issubdtype(t.dtype, np.datetime64):
+        return t.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return t.astype(float)
+
+
+def cosine_interpolation(grid, event_times, event_heights):
+    """
+    Interpolation sinusoïdale entre pleines et basses mers, pour toute la grille
+    en une fois : np.searchsorted trouve pour chaque point les deux extrêmes qui
+    l'encadrent. Avant le premier extrême (resp. après le dernier) la hauteur
+    reste celle du premier (resp. du dernier).
+
+    Args:
+        grid (array_like): Temps de la courbe (datetime64 ou numériques)
+        event_times (array_like): Temps des extrêmes, triés
+        event_heights (array_like): Hauteurs des extrêmes
+
+    Returns:
+        np.ndarray: Hauteurs sur la grille
+    """
+    t = _as_float(grid)
+    t_events = _as_float(event_times)
+    h_events = np.asarray(event_heights, dtype=float)
+
+    if len(t_events) == 1:
+        return np.full(t.shape, h_events[0])
+
+    # event_times[i] <= t < event_times[i+1]
+    i = np.clip(np.searchsorted(t_events, t, side='right') - 1, 0, len(t_events) - 2)
+    t0, t1 = t_events[i], t_events[i + 1]
+    h0, h1 = h_events[i], h_events[i + 1]
+
+    position_relative = (t - t0) / (t1 - t0)
+    heights = h0 + (h1 - h0) * (1 - np.cos(np.pi * position_relative)) / 2
+
+    heights = np.where(t < t_events[0], h_events[0], heights)
+    heights = np.where(t >= t_events[-1], h_events[-1], heights)
+    return heights
+
+
+def cubic_interpolation(grid, event_times, event_heights):
+    """
+    Spline cubique passant par les extrêmes (équivalent de
+    DataFrame.interpolate(method='cubic')); NaN hors de l'intervalle couvert.
+    """
+    spline = interp1d(_as_float(event_times), np.asarray(event_heights, dtype=float),
+                      kind='cubic', bounds_error=False, fill_value=np.nan)
+    return spline(_as_float(grid))
+
+
+def interpolate_tide(grid, event_times, event_heights, method='cubic'):
+    """
+    Hauteurs de marée sur grid à partir des extrêmes triés.
+
+    Args:
+        method (str): 'cubic' (spline) ou 'cosine' (sinusoïde entre extrêmes, comme plot_tide.py)
+    """
+    if method == 'cosine':
+        return cosine_interpolation(grid, event_times, event_heights)
+    if method == 'cubic':
+        return cubic_interpolation(grid, event_times, event_heights)
+    raise ValueError(f"Méthode d'interpolation inconnue: {method}")
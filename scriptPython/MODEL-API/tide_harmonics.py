@@ -0,0 +1,247 @@
+""" Prédiction harmonique de la marée à partir de constituantes ajustées par site """
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HARMONICS_DIR = os.path.join(BASE_DIR, 'Maree')
+DEFAULT_ETA_COLUMN = 'Hauteur relative à 2.4m'
+
+# Vitesses angulaires des constituantes (degrés par heure)
+CONSTITUENTS = {
+    'M2': 28.9841042,
+    'S2': 30.0000000,
+    'N2': 28.4397295,
+    'K2': 30.0821373,
+    'K1': 15.0410686,
+    'O1': 13.9430356,
+    'P1': 14.9589314,
+    'Q1': 13.3986609,
+    'M4': 57.9682084,
+    'MS4': 58.9841042,
+    'MN4': 57.4238337,
+    'M6': 86.9523127,
+}
+# Par ordre de priorité : en cas de conflit (critère de Rayleigh) la première est gardée
+DEFAULT_CONSTITUENTS = ('M2', 'S2', 'K1', 'O1', 'N2', 'M4', 'K2', 'P1', 'Q1', 'MS4', 'MN4', 'M6')
+
+# Origine des phases (UTC)
+EPOCH = np.datetime64('2000-01-01T00:00:00', 'ns')
+
+# Fuseau des séries de marée et de la grille de prévision (Open-Meteo
+# timezone=auto) : heure légale, avec les changements d'heure d'été
+DEFAULT_TIMEZONE = 'Europe/Paris'
+
+
+def to_utc(times, timezone=DEFAULT_TIMEZONE, ambiguous='NaT', nonexistent='NaT'):
+    """
+    Temps naïfs en heure légale de timezone (ou temps avec fuseau) convertis
+    en datetime64 UTC naïfs. Avec timezone None, les temps naïfs sont rendus
+    tels quels. ambiguous et nonexistent : voir pd.DatetimeIndex.tz_localize.
+    """
+    times = pd.DatetimeIndex(times)
+    if times.tz is None:
+        if timezone is None:
+            return times.values
+        times = times.tz_localize(timezone, ambiguous=ambiguous, nonexistent=nonexistent)
+    return times.tz_convert('UTC').tz_localize(None).values
+
+
+def _hours_since_epoch(times):
+    """Temps UTC (datetime64 ou datetime) convertis en heures depuis EPOCH."""
+    times = np.asarray(times, dtype='datetime64[ns]')
+    return (times - EPOCH) / np.timedelta64(1, 'h')
+
+
+def resolvable_constituents(names, duration_hours, rayleigh=1.0):
+    """
+    Constituantes séparables sur un enregistrement de duration_hours heures
+    (critère de Rayleigh : |ω1 - ω2| * durée >= 360° * rayleigh). Les
+    constituantes trop proches d'une constituante déjà retenue sont écartées.
+    """
+    kept = []
+    for name in names:
+        speed = CONSTITUENTS[name]
+        if speed * duration_hours < 360 * rayleigh:
+            continue
+        if all(abs(speed - CONSTITUENTS[k]) * duration_hours >= 360 * rayleigh for k in kept):
+            kept.append(name)
+    return kept
+
+
+def _design_matrix(hours, names):
+    omega = np.radians([CONSTITUENTS[n] for n in names])
+    phase = np.outer(hours, omega)
+    return np.hstack([np.ones((len(hours), 1)), np.cos(phase), np.sin(phase)])
+
+
+def fit_harmonics(times, heights, constituents=DEFAULT_CONSTITUENTS, site=None, rayleigh=1.0,
+                  timezone=DEFAULT_TIMEZONE):
+    """
+    Ajuste par moindres carrés le modèle
+        eta(t) = Z0 + Σ A_i cos(ω_i t - φ_i)
+    sur une série historique, t étant compté en temps UTC pour que le
+    passage à l'heure d'été ne décale pas la série. Les corrections nodales
+    ne sont pas appliquées : le modèle est à réajuster chaque année à partir
+    des données récentes.
+
+    Args:
+        times (array_like): Temps de la série (datetime64 ou datetime)
+        heights (array_like): Hauteurs observées (les NaN sont ignorés)
+        constituents (sequence): Constituantes candidates, par ordre de priorité
+        site (str): Nom du site
+        rayleigh (float): Facteur du critère de Rayleigh
+        timezone (str): Fuseau des temps naïfs (None : temps déjà en UTC); les
+            heures ambiguës ou inexistantes du changement d'heure sont ignorées
+
+    Returns:
+        dict: Constituantes (amplitude en m, phase en degrés par rapport à EPOCH)
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    hours = _hours_since_epoch(to_utc(times, timezone))
+    heights = np.asarray(heights, dtype=float)
+    valid = np.isfinite(hours) & np.isfinite(heights)
+    times, hours, heights = times[valid], hours[valid], heights[valid]
+
+    duration = hours.max() - hours.min()
+    names = resolvable_constituents(constituents, duration, rayleigh)
+    dropped = [n for n in constituents if n not in names]
+    if dropped:
+        print(f"Constituantes non séparables sur {duration / 24:.1f} jours, ignorées: {', '.join(dropped)}")
+
+    coefs, _, _, _ = np.linalg.lstsq(_design_matrix(hours, names), heights, rcond=None)
+    a, b = coefs[1:1 + len(names)], coefs[1 + len(names):]
+
+    residual = heights - _design_matrix(hours, names) @ coefs
+    return {
+        'site': site,
+        'epoch': str(EPOCH.astype('datetime64[s]')),
+        'timezone': timezone or 'UTC',
+        'start': str(times.min().astype('datetime64[s]')),
+        'duration_days': round(float(duration / 24), 3),
+        'z0': float(coefs[0]),
+        'rms_residual': float(np.sqrt(np.mean(residual**2))),
+        'constituents': {
+            name: {'speed': CONSTITUENTS[name],
+                   'amplitude': float(np.hypot(a[i], b[i])),
+                   'phase': float(np.degrees(np.arctan2(b[i], a[i])) % 360)}
+            for i, name in enumerate(names)
+        },
+    }
+
+
+def predict_tide(harmonics, times):
+    """
+    Hauteurs de marée aux temps demandés, calculées en une seule opération
+    matricielle (temps × constituantes).
+
+    Args:
+        harmonics (dict): Résultat de fit_harmonics ou load_harmonics
+        times (array_like): Temps (datetime64, datetime ou pd.DatetimeIndex),
+            naïfs dans le fuseau de harmonics (temps pris tels quels pour les
+            constituantes sans fuseau, ajustées avant sa prise en compte)
+
+    Returns:
+        np.ndarray: Hauteurs de marée, dans l'ordre de times
+    """
+    # Heure répétée du passage à l'heure d'hiver : heure d'hiver; heure sautée
+    # au passage à l'heure d'été : décalée à 03h00
+    times = pd.DatetimeIndex(times)
+    hours = _hours_since_epoch(to_utc(times, harmonics.get('timezone'), ambiguous=np.zeros(len(times), dtype=bool),
+                                      nonexistent='shift_forward'))
+    constituents = harmonics['constituents'].values()
+    omega = np.radians([c['speed'] for c in constituents])
+    amplitude = np.array([c['amplitude'] for c in constituents])
+    phase = np.radians([c['phase'] for c in constituents])
+
+    return harmonics['z0'] + np.cos(np.outer(hours, omega) - phase) @ amplitude
+
+
+def harmonics_path(site, directory=DEFAULT_HARMONICS_DIR):
+    """Fichier des constituantes d'un site, ex. Maree/harmonics_biscarrosse.json."""
+    slug = site.lower().replace(' ', '_')
+    return os.path.join(directory, f"harmonics_{slug}.json")
+
+
+def save_harmonics(harmonics, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(harmonics, f, indent=2, ensure_ascii=False)
+    print(f"Constituantes enregistrées dans '{path}'")
+
+
+def load_harmonics(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def read_tide_series(csv_files, eta_column=DEFAULT_ETA_COLUMN):
+    """
+    Lit une ou plusieurs séries de marée au format de plot_tide.py
+    (colonnes Date, Heure et hauteurs avec virgule décimale).
+
+    Returns:
+        pd.Series: Hauteurs indexées par date, triées et sans doublon
+    """
+    frames = []
+    for csv_file in csv_files:
+        df = pd.read_csv(csv_file, sep=',')
+        eta = df[eta_column].astype(str).str.replace(',', '.').astype(float)
+        index = pd.to_datetime(df['Date'] + ' ' + df['Heure'], format='%Y-%m-%d %H:%M')
+        frames.append(pd.Series(eta.values, index=index))
+    series = pd.concat(frames).sort_index()
+    return series[~series.index.duplicated(keep='last')]
+
+
+def write_tide_csv(times, eta, path, eta_column=DEFAULT_ETA_COLUMN):
+    """Écrit une série prédite au format lu par create_tide_dataframe_from_csv."""
+    times = pd.DatetimeIndex(times)
+    df = pd.DataFrame({
+        'Date': times.strftime('%Y-%m-%d'),
+        'Heure': times.strftime('%H:%M'),
+        eta_column: [f"{h:.2f}".replace('.', ',') for h in eta],
+    })
+    df.to_csv(path, index=False)
+    print(f"Marée prédite enregistrée dans '{path}'")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ajustement et prédiction harmonique de la marée.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fit = sub.add_parser('fit', help="Ajuster les constituantes d'un site sur des séries historiques")
+    fit.add_argument('csv', nargs='+', help="Séries de marée (format de plot_tide.py)")
+    fit.add_argument('--site', default='Biscarrosse')
+    fit.add_argument('--eta-column', default=DEFAULT_ETA_COLUMN)
+    fit.add_argument('--timezone', default=DEFAULT_TIMEZONE, help="Fuseau (heure légale) des séries de marée")
+    fit.add_argument('--output', default=None, help="Fichier des constituantes (Maree/harmonics_<site>.json par défaut)")
+
+    predict = sub.add_parser('predict', help="Prédire la marée sur une période")
+    predict.add_argument('--site', default='Biscarrosse')
+    predict.add_argument('--harmonics', default=None, help="Fichier des constituantes (Maree/harmonics_<site>.json par défaut)")
+    predict.add_argument('--start', required=True, help="Début (YYYY-MM-DD)")
+    predict.add_argument('--end', required=True, help="Fin (YYYY-MM-DD HH:MM)")
+    predict.add_argument('--freq', default='10min')
+    predict.add_argument('--output', required=True, help="CSV de sortie, utilisable avec --tide-csv")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'fit':
+        series = read_tide_series(args.csv, args.eta_column)
+        harmonics = fit_harmonics(series.index.values, series.values, site=args.site, timezone=args.timezone)
+        print(f"Résidu RMS: {harmonics['rms_residual']:.3f} m")
+        save_harmonics(harmonics, args.output or harmonics_path(args.site))
+    else:
+        harmonics = load_harmonics(args.harmonics or harmonics_path(args.site))
+        times = pd.date_range(start=args.start, end=args.end, freq=args.freq)
+        write_tide_csv(times, predict_tide(harmonics, times.values), args.output)
+
+
+if __name__ == "__main__":
+    main()